@@ -5,7 +5,8 @@
 BUTTON_PINS = {
     'schedule': 17,  # Example GPIO pin
     'manual': 27,
-    'reset': 22
+    'reset': 22,
+    'select': 24  # MENU_SELECT_BUTTON_PIN in PINS_CONFIG.py; pauses/resumes sprays
 }
 
 import RPi.GPIO as GPIO
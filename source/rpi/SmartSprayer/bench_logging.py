@@ -0,0 +1,108 @@
+# bench_logging.py
+# Microbenchmark: what logger helper calls cost the calling thread at DEBUG vs INFO
+
+import argparse
+import contextlib
+import io
+import logging
+import shutil
+import sys
+import os
+import tempfile
+import time
+
+# Add current directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.logger import SmartSprayerLogger
+
+
+# Messages built before the level check, as the helpers used to, for comparison
+# (text log only, no event log record)
+def _eager_hardware_action(logger, action, component):
+    msg = f"HARDWARE ACTION - {component}: {action}"
+    logger.log_debug(msg)
+
+
+def _eager_auto_adjust(logger, affected_schedules):
+    msg = f"AUTO-ADJUST triggered - {len(affected_schedules)} schedule(s) adjusted"
+    logger.log_info(msg)
+    for sched in affected_schedules:
+        logger.log_debug(f"  - Schedule {sched['id']} moved from {sched['old_date']} to {sched['new_date']}")
+
+
+def _time_calls(logger, func, calls, batch):
+    """
+    Microseconds per call spent in the calling thread
+    
+    The log queue is drained between batches, outside the timing, so no
+    record is dropped. The writer thread still runs during a batch and
+    shares the GIL, so part of its formatting and I/O is included.
+    """
+    total = 0.0
+    done = 0
+    while done < calls:
+        count = min(batch, calls - done)
+        began = time.perf_counter()
+        for _ in range(count):
+            func()
+        total += time.perf_counter() - began
+        logger.flush()
+        done += count
+    return total / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Sprayer logging microbenchmark")
+    parser.add_argument('--calls', type=int, default=20000, help="Calls per case")
+    parser.add_argument('--adjusted', type=int, default=20,
+                        help="Schedules per auto-adjust call")
+    args = parser.parse_args()
+    
+    affected = [
+        {'id': f"SCH_{i:03d}", 'old_date': '2025-03-01', 'new_date': '2025-03-02'}
+        for i in range(args.adjusted)
+    ]
+    schedule = {'id': 'SCH_001', 'date': '2025-03-01', 'time': '06:00',
+                'spray_type': 'Fertilizer', 'container': 'Container 1'}
+    
+    log_dir = tempfile.mkdtemp(prefix="smartsprayer-bench-")
+    # The console handler writes to stderr; keep its output out of the report
+    with contextlib.redirect_stderr(io.StringIO()):
+        logger = SmartSprayerLogger(log_dir=log_dir)
+    
+    cases = [
+        ("log_hardware_action", lambda: logger.log_hardware_action("ON", "Relay 1"), 1),
+        ("  old: eager f-string", lambda: _eager_hardware_action(logger, "ON", "Relay 1"), 1),
+        ("log_tank_level", lambda: logger.log_tank_level(1, 75.0), 1),
+        ("log_spray_executed", lambda: logger.log_spray_executed(schedule), 1),
+        (f"log_auto_adjust ({args.adjusted})", lambda: logger.log_auto_adjust(affected),
+         args.adjusted + 1),
+        ("  old: eager f-strings", lambda: _eager_auto_adjust(logger, affected), args.adjusted + 1),
+    ]
+    
+    results = {}
+    try:
+        for level in (logging.DEBUG, logging.INFO):
+            logger.set_level(level)
+            for name, func, records in cases:
+                batch = max(1, SmartSprayerLogger.QUEUE_SIZE // (2 * records))
+                results[name, level] = _time_calls(logger, func, args.calls, batch)
+        stats = logger.get_stats()
+    finally:
+        logger.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    
+    print("=" * 60)
+    print(f"LOGGING: {args.calls} calls per case, microseconds per call")
+    print("=" * 60)
+    print(f"{'helper':<28}{'DEBUG':>12}{'INFO':>12}")
+    for name, _, _ in cases:
+        print(f"{name:<28}{results[name, logging.DEBUG]:>12.2f}{results[name, logging.INFO]:>12.2f}")
+    print("-" * 60)
+    print(f"Records queued: {stats['queued']}, dropped: {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
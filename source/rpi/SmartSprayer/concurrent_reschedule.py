@@ -0,0 +1,282 @@
+# concurrent_reschedule.py
+# Concurrency check for RescheduleManager: several processes reschedule the
+# same spray at once through one data directory, and no update may be lost.
+# Also checks that a new spray whose commit is retried after another process
+# took its slot is refused rather than stored twice.
+
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+# Add current directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.clock import VirtualClock
+from core.data_store import DataStore, StaleDataError
+from core.reschedule_logic import RescheduleManager
+from core.scheduler import Scheduler
+
+START = datetime(2025, 3, 1)
+
+SEED_DATE = '2025-03-10'
+SEED_TIME = '06:00'
+
+
+def _open_store(data_dir):
+    """Store that writes every commit through, on a fixed clock"""
+    # Retry warnings are expected here; the report below counts them
+    logging.getLogger("SmartSprayer").disabled = True
+    return DataStore(data_dir, flush_interval=0, clock=VirtualClock(START))
+
+
+def _seed(data_dir):
+    store = _open_store(data_dir)
+    schedule = store.add_schedule({
+        'date': SEED_DATE,
+        'time': SEED_TIME,
+        'spray_type': 'Fertilizer',
+        'container': 'Container 1',
+        'duration': 30,
+        'status': 'scheduled'
+    })
+    store.close()
+    return schedule['id']
+
+
+def _reschedule_worker(data_dir, schedule_id, worker, rounds, max_reschedules, start, results):
+    """
+    Child process: reschedule schedule_id `rounds` times, each time to a new
+    day, and report (successes, stale conflicts seen, errors)
+    """
+    store = _open_store(data_dir)
+    manager = RescheduleManager(store, VirtualClock(START))
+    manager.MAX_RESCHEDULES = max_reschedules
+    
+    # Count the commits refused because the other process wrote first
+    stale = 0
+    take_lease = store._take_lease
+    
+    def counting_lease():
+        nonlocal stale
+        try:
+            take_lease()
+        except StaleDataError:
+            stale += 1
+            raise
+    
+    store._take_lease = counting_lease
+    
+    successes = 0
+    errors = 0
+    start.wait()
+    for round_num in range(rounds):
+        new_date = f"2025-04-{round_num % 28 + 1:02d}"
+        new_time = f"{7 + worker:02d}:00"
+        try:
+            success, _, _ = manager.reschedule(schedule_id, new_date, new_time)
+        except StaleDataError:
+            # Lost the race more than STALE_RETRIES times; nothing was written
+            errors += 1
+            continue
+        successes += success
+    
+    store.close()
+    results.put((successes, stale, errors))
+
+
+def run_race(work_dir, name, workers, rounds, max_reschedules, context):
+    """Race `workers` processes; returns (final schedule, successes, stale, errors)"""
+    data_dir = os.path.join(work_dir, name)
+    schedule_id = _seed(data_dir)
+    
+    start = context.Event()
+    results = context.Queue()
+    children = [
+        context.Process(target=_reschedule_worker,
+                        args=(data_dir, schedule_id, worker, rounds, max_reschedules,
+                              start, results))
+        for worker in range(workers)
+    ]
+    for child in children:
+        child.start()
+    start.set()
+    reports = [results.get() for _ in children]
+    for child in children:
+        child.join()
+    
+    store = _open_store(data_dir)
+    try:
+        schedule = store.get_schedule_by_id(schedule_id)
+    finally:
+        store.close()
+    
+    successes, stale, errors = (sum(column) for column in zip(*reports))
+    return schedule, successes, stale, errors
+
+
+def _create_worker(data_dir, go, done, results):
+    """
+    Child process: create a spray in the seed slot, letting the rival
+    process commit to the same slot while the transaction is open
+    """
+    store = _open_store(data_dir)
+    scheduler = Scheduler(None, data_store=store, clock=VirtualClock(START))
+    
+    # The conflict check is the first read of the transaction
+    find_overlapping = store.find_overlapping
+    
+    def interrupted(*args, **kwargs):
+        if not go.is_set():
+            go.set()
+            done.wait()
+        return find_overlapping(*args, **kwargs)
+    
+    store.find_overlapping = interrupted
+    
+    try:
+        scheduler.create_schedule(SEED_DATE, SEED_TIME, 'Pesticide', 'Container 1')
+        outcome = 'created'
+    except ValueError:
+        outcome = 'refused'
+    store.close()
+    results.put(outcome)
+
+
+def _rival_worker(data_dir, go, done):
+    """Child process: once told to, commit a spray in the seed slot"""
+    store = _open_store(data_dir)
+    go.wait()
+    store.add_schedule({
+        'date': SEED_DATE,
+        'time': SEED_TIME,
+        'spray_type': 'Fertilizer',
+        'container': 'Container 1',
+        'duration': 30,
+        'status': 'scheduled'
+    })
+    store.close()
+    done.set()
+
+
+def run_create_retry(work_dir, context):
+    """Returns (create outcome, stored schedules)"""
+    data_dir = os.path.join(work_dir, 'create')
+    _open_store(data_dir).close()
+    
+    go = context.Event()
+    done = context.Event()
+    results = context.Queue()
+    children = [
+        context.Process(target=_create_worker, args=(data_dir, go, done, results)),
+        context.Process(target=_rival_worker, args=(data_dir, go, done)),
+    ]
+    for child in children:
+        child.start()
+    outcome = results.get()
+    for child in children:
+        child.join()
+    
+    store = _open_store(data_dir)
+    try:
+        schedules = store.get_all_schedules()
+    finally:
+        store.close()
+    return outcome, schedules
+
+
+def check_create_retry(outcome, schedules):
+    """The retried create sees the rival's spray and is refused"""
+    failures = []
+    ids = [s['id'] for s in schedules]
+    if len(set(ids)) != len(ids):
+        failures.append(f"duplicate schedule IDs {sorted(ids)}")
+    if outcome != 'refused':
+        failures.append(f"create was {outcome} although the slot was taken")
+    if len(schedules) != 1:
+        failures.append(f"{len(schedules)} sprays stored in one slot")
+    return failures
+
+
+def check_unlimited(schedule, successes):
+    """Every successful reschedule must be counted once"""
+    failures = []
+    if schedule['reschedule_count'] != successes:
+        failures.append(f"reschedule_count is {schedule['reschedule_count']} "
+                        f"after {successes} successful reschedules")
+    if (schedule.get('original_date'), schedule.get('original_time')) != (SEED_DATE, SEED_TIME):
+        failures.append(f"original slot is {schedule.get('original_date')} "
+                        f"{schedule.get('original_time')}, not {SEED_DATE} {SEED_TIME}")
+    if schedule['status'] != 'rescheduled':
+        failures.append(f"status is {schedule['status']}")
+    return failures
+
+
+def check_limited(schedule, successes):
+    """Exactly MAX_RESCHEDULES reschedules go through, then the spray is cancelled"""
+    failures = []
+    limit = RescheduleManager.MAX_RESCHEDULES
+    if successes != limit:
+        failures.append(f"{successes} reschedules succeeded, limit is {limit}")
+    if schedule['reschedule_count'] != limit:
+        failures.append(f"reschedule_count is {schedule['reschedule_count']}, limit is {limit}")
+    if schedule['status'] != 'cancelled':
+        failures.append(f"status is {schedule['status']} after the limit was reached")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent reschedule check")
+    parser.add_argument('--workers', type=int, default=2, help="Processes rescheduling at once")
+    parser.add_argument('--rounds', type=int, default=50, help="Reschedules per process")
+    args = parser.parse_args()
+    
+    context = multiprocessing.get_context('spawn')
+    
+    work_dir = tempfile.mkdtemp(prefix="smartsprayer-race-")
+    # Logs of the stores under test go to the work directory too
+    os.chdir(work_dir)
+    try:
+        schedule, successes, stale, errors = run_race(
+            work_dir, 'unlimited', args.workers, args.rounds,
+            args.workers * args.rounds + 1, context
+        )
+        failures = check_unlimited(schedule, successes)
+        
+        limited, limited_successes, _, _ = run_race(
+            work_dir, 'limited', args.workers, RescheduleManager.MAX_RESCHEDULES,
+            RescheduleManager.MAX_RESCHEDULES, context
+        )
+        failures += check_limited(limited, limited_successes)
+        
+        outcome, created = run_create_retry(work_dir, context)
+        failures += check_create_retry(outcome, created)
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print("=" * 60)
+    print(f"CONCURRENT RESCHEDULE: {args.workers} processes, {args.rounds} rounds each")
+    print("=" * 60)
+    print(f"Reschedules:  {successes} succeeded, {errors} gave up after retries; "
+          f"reschedule_count {schedule['reschedule_count']}")
+    print(f"Conflicts:    {stale} commits retried on fresh data")
+    print(f"Limit:        {limited_successes} of {args.workers * RescheduleManager.MAX_RESCHEDULES} "
+          f"attempts succeeded, final status {limited['status']}")
+    print(f"Create retry: slot taken mid-transaction; create {outcome}, "
+          f"{len(created)} spray(s) stored")
+    
+    for reason in failures:
+        print(f"FAILED: {reason}")
+    if failures:
+        sys.exit(1)
+    print("No reschedule was lost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# clock.py
+# Time source for the scheduler, spray engine and data store
+
+import threading
+import time
+from datetime import datetime
+
+
+class Clock:
+    """Real time; the default for every component"""
+    
+    def time(self) -> float:
+        """Wall-clock epoch seconds"""
+        return time.time()
+    
+    def now(self) -> datetime:
+        """Wall-clock local datetime"""
+        return datetime.now()
+    
+    def monotonic(self) -> float:
+        """Seconds for measuring intervals; never jumps"""
+        return time.monotonic()
+    
+    def wait(self, cond: threading.Condition, timeout=None) -> bool:
+        """Wait on a held condition for up to `timeout` seconds"""
+        return cond.wait(timeout)
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time that only moves when told to
+    
+    wait() does not block: it advances the clock by the timeout and
+    returns as if the wait timed out, so timed loops (spray timing,
+    buzzer beeps) finish instantly in simulated time. Meant for the
+    single-threaded simulation runner.
+    """
+    
+    def __init__(self, start=None):
+        if start is None:
+            start = time.time()
+        elif isinstance(start, datetime):
+            start = start.timestamp()
+        self._now = float(start)
+    
+    def time(self) -> float:
+        return self._now
+    
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._now)
+    
+    def monotonic(self) -> float:
+        return self._now
+    
+    def wait(self, cond: threading.Condition, timeout=None) -> bool:
+        if timeout is None:
+            raise RuntimeError("Untimed wait on a virtual clock would never return")
+        self.advance(timeout)
+        return False
+    
+    def sleep(self, seconds: float):
+        """Let simulated time pass"""
+        self.advance(seconds)
+    
+    def advance(self, seconds: float):
+        """Move time forward"""
+        if seconds > 0:
+            self._now += seconds
+    
+    def set(self, timestamp: float):
+        """Jump to an epoch timestamp (the runner may step back to start
+        a spray on another relay at the time it was due)"""
+        self._now = float(timestamp)
+
+
+# Global real clock
+_clock_instance = None
+
+def get_clock():
+    """Get global clock instance"""
+    global _clock_instance
+    if _clock_instance is None:
+        _clock_instance = Clock()
+    return _clock_instance
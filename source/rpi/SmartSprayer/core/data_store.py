@@ -1,32 +1,159 @@
 # data_store.py
 # Data persistence for schedules and spray history
 
+import atexit
+import functools
 import json
 import os
-from datetime import datetime
+import queue
+import struct
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
+from core.clock import get_clock
+from core.intervals import SprayIntervalIndex
+from core.logger import get_logger
+from core.models import Schedule, HistoryRecord
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# History index entries: byte offset of each record in history.jsonl
+HISTORY_OFFSET = struct.Struct('>Q')
+
+
+class StaleDataError(Exception):
+    """Another process wrote to the store after the transaction read it"""
+
+
+class StoreLockedError(Exception):
+    """Another process held the data directory lock for too long"""
+
+
+def retry_if_stale(method):
+    """Run a DataStore method through run_transaction so stale commits are retried"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.run_transaction(method, self, *args, **kwargs)
+    return wrapper
+
 
 class DataStore:
-    """Manages persistent storage of schedules and history"""
+    """
+    Manages persistent storage of schedules and history
+    
+    Safe to share between threads. Mutations run under one lock and all
+    disk writes happen on a single writer thread; readers get the last
+    committed snapshot without locking or touching the disk. Several
+    processes may share one data directory (see Process Lock).
+    """
     
-    def __init__(self, data_dir="data"):
+    # Seconds between checks for changes written by another DataStore
+    POLL_INTERVAL = 1.0
+    
+    # Seconds to wait for another process to release the data directory
+    LOCK_TIMEOUT = 10.0
+    
+    # Times run_transaction re-runs a transaction that read stale data
+    STALE_RETRIES = 3
+    
+    # Change kinds reported to subscribers (see Change Feed)
+    CHANGE_KINDS = ('schedule', 'history')
+    
+    def __init__(self, data_dir="data", flush_interval=2.0, clock=None):
         self.data_dir = Path(data_dir)
+        
+        # Source of created_at/updated_at/completed_at (see core/clock.py)
+        self.clock = clock or get_clock()
         self.data_dir.mkdir(exist_ok=True)
         
         self.schedules_file = self.data_dir / "schedules.json"
-        self.history_file = self.data_dir / "history.json"
+        self.history_file = self.data_dir / "history.json"  # Legacy format
+        self.history_log = self.data_dir / "history.jsonl"
+        self.history_index = self.data_dir / "history.idx"
+        self.journal_file = self.data_dir / "journal.jsonl"
+        self.lock_file = self.data_dir / "store.lock"
+        
+        # In-memory schedule cache of Schedule models (see Schedule Cache)
+        self._schedules = None
+        self._schedule_index = {}
+        self._cache_signature = None
+        self._view = ((), {})
+        
+        # Spray slots of self._intervals_source, kept up to date by
+        # _stage_schedules and rebuilt when the list is replaced otherwise
+        self._intervals = SprayIntervalIndex()
+        self._intervals_source = None
+        
+        # Transaction state (see transaction)
+        self._lock = threading.RLock()
+        self._txn_depth = 0
+        self._txn_owner = None
+        self._pending_ops = []
+        self._pending_history = []
+        
+        # Write-behind buffer (see flush); flush_interval <= 0 writes through
+        self.flush_interval = flush_interval
+        self._dirty_ops = []
+        self._dirty_history = []
+        self._dirty_since = None
+        self._inflight_history = []
+        self._history_records = 0
+        self._flushing = False
+        self._flush_requests = 0
+        self._flushes_done = 0
+        self._writer_cond = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._writer_thread = None
+        self._closed = False
+        self.logical_writes = 0
+        self.physical_writes = 0
+        
+        # Cross-process lock and store version (see Process Lock)
+        self._lock_fd = None
+        self._flock_holds = 0
+        self._lease = False
+        self._version = 0
+        
+        # Change feed (see subscribe)
+        self._subscribers = {}
+        self._subscriber_seq = 0
+        self._change_queue = queue.Queue()
+        self._dispatch_thread = None
         
         # Initialize files if they don't exist
         self._init_files()
+        self._history_records = self._history_count()
+        
+        with self._lock:
+            self._refresh_from_disk()
+        
+        self._start_writer_thread()
+        atexit.register(self.close)
     
     def _init_files(self):
         """Initialize data files"""
-        if not self.schedules_file.exists():
-            self._save_json(self.schedules_file, [])
+        self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
         
-        if not self.history_file.exists():
-            self._save_json(self.history_file, [])
+        # Recovery must not run while another process is writing
+        with self._process_lock():
+            if not self.schedules_file.exists():
+                if any(p.exists() for p in self._schedules_fallbacks()):
+                    # Interrupted save: restore instead of starting empty
+                    self._load_schedules_file()
+                else:
+                    self._save_json(self.schedules_file, [])
+            
+            if not self.history_log.exists():
+                self._migrate_legacy_history()
+            elif not self._history_index_valid():
+                self._rebuild_history_index()
+            
+            self._replay_journal()
     
     def _load_json(self, file_path):
         """Load JSON from file"""
@@ -37,131 +164,991 @@ class DataStore:
             return []
     
     def _save_json(self, file_path, data):
-        """Save data to JSON file"""
-        with open(file_path, 'w', encoding='utf-8') as f:
+        """
+        Atomically replace file_path with data
+        
+        The data is written to a temp file and fsynced before being renamed
+        over the target, so a power cut leaves either the old or the new
+        version. The previous version is kept as <name>.bak.
+        """
+        file_path = Path(file_path)
+        tmp_path = file_path.with_name(file_path.name + '.tmp')
+        bak_path = file_path.with_name(file_path.name + '.bak')
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if file_path.exists():
+            os.replace(file_path, bak_path)
+        os.replace(tmp_path, file_path)
+        self._fsync_dir()
+    
+    def _fsync_dir(self):
+        """Make renames in the data directory durable (no-op on Windows)"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self.data_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _read_json_list(self, file_path) -> Optional[List]:
+        """Load a JSON list, or None if the file is missing or damaged"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, UnicodeDecodeError, json.JSONDecodeError):
+            return None
+        return data if isinstance(data, list) else None
+    
+    def _schedules_fallbacks(self):
+        """Copies left by _save_json, newest first: interrupted temp file, previous version"""
+        name = self.schedules_file.name
+        return [self.schedules_file.with_name(name + '.tmp'),
+                self.schedules_file.with_name(name + '.bak')]
+    
+    def _load_schedules_file(self) -> List[Dict]:
+        """
+        Load schedules.json, recovering the last good generation if needed
+        
+        A missing or damaged file is never read as "no schedules": the
+        completed temp file of an interrupted save is used if present,
+        otherwise the .bak copy of the previous generation.
+        """
+        schedules = self._read_json_list(self.schedules_file)
+        if schedules is not None:
+            return schedules
+        
+        # A writer in another process may be between renames; wait for it
+        with self._process_lock():
+            schedules = self._read_json_list(self.schedules_file)
+            if schedules is not None:
+                return schedules
+            
+            logger = get_logger()
+            
+            if self.schedules_file.exists():
+                corrupt_path = self.schedules_file.with_name(self.schedules_file.name + '.corrupt')
+                os.replace(self.schedules_file, corrupt_path)
+                logger.log_error(f"{self.schedules_file} is damaged; moved to {corrupt_path}")
+            
+            for candidate in self._schedules_fallbacks():
+                schedules = self._read_json_list(candidate)
+                if schedules is not None:
+                    logger.log_warning(f"Restored schedules from {candidate}")
+                    self._save_json(self.schedules_file, schedules)
+                    return schedules
+            
+            logger.log_error("No intact schedules file found; starting empty")
+            return []
+    
+    # Write-ahead Journal
+    #
+    # Each commit appends one record (schedule ops + history records) to
+    # journal.jsonl and fsyncs it before schedules.json is replaced, then
+    # truncates the journal. Ops are idempotent so a record that was
+    # already applied can safely be replayed after a crash.
+    def _write_journal(self, ops: List[Dict], history: List[Dict]):
+        """Durably append one commit record to the journal"""
+        record = json.dumps({'ops': ops, 'history': history}, ensure_ascii=False)
+        with open(self.journal_file, 'ab') as f:
+            f.write((record + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _clear_journal(self):
+        """Drop journal records once their commit is fully on disk"""
+        open(self.journal_file, 'wb').close()
+    
+    def _read_journal(self) -> List[Dict]:
+        """Complete journal records; a torn final record was never committed"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        
+        records = []
+        for line in data.split(b'\n')[:-1]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+        return records
+    
+    def _apply_ops(self, schedules: List[Dict], ops: List[Dict]) -> List[Dict]:
+        """Apply journal ops to a schedule list"""
+        schedules = list(schedules)
+        positions = {s.get('id'): i for i, s in enumerate(schedules)}
+        
+        for op in ops:
+            if op['op'] == 'put':
+                sched = op['schedule']
+                if sched['id'] in positions:
+                    schedules[positions[sched['id']]] = sched
+                else:
+                    positions[sched['id']] = len(schedules)
+                    schedules.append(sched)
+            elif op['op'] == 'delete':
+                schedules = [s for s in schedules if s.get('id') != op['id']]
+                positions = {s.get('id'): i for i, s in enumerate(schedules)}
+            elif op['op'] == 'clear':
+                schedules = []
+                positions = {}
+        
+        return schedules
+    
+    def _replay_journal(self):
+        """Finish commits interrupted by a crash"""
+        records = self._read_journal()
+        
+        if records:
+            schedules = self._load_schedules_file()
+            history = []
+            for record in records:
+                schedules = self._apply_ops(schedules, record.get('ops', []))
+                history.extend(record.get('history', []))
+            
+            self._save_json(self.schedules_file, schedules)
+            
+            # Skip history records that reached the log before the crash
+            self._history_records = self._history_count()
+            for done in range(min(len(history), self._history_count()), 0, -1):
+                if self.get_history(limit=done) == history[:done]:
+                    history = history[done:]
+                    break
+            if history:
+                self._append_history(history)
+            
+            self._bump_version()
+            get_logger().log_warning(f"Replayed {len(records)} journal record(s)")
+        
+        self._clear_journal()
+    
+    # Process Lock
+    #
+    # Other processes (a scheduler daemon, the GUI, sample_data_generator.py)
+    # may use the same data directory. Writers serialize on an flock of
+    # store.lock, which also holds the store version: a counter bumped by
+    # every write. A commit checks the version to detect that another
+    # process wrote since the data was read (see run_transaction), and the
+    # writer thread polls it to pick up other processes' changes. A process
+    # keeps the lock from its first commit until the buffered changes are
+    # flushed, so nobody else can write in between; the kernel releases it
+    # if the process dies.
+    @contextmanager
+    def _process_lock(self):
+        """Hold the data directory lock for the duration of the block"""
+        self._acquire_process_lock()
+        try:
+            yield
+        finally:
+            self._release_process_lock()
+    
+    def _acquire_process_lock(self):
+        """Take the data directory lock, or count another hold if it's already ours"""
+        if not self._flock_holds and fcntl is not None and self._lock_fd is not None:
+            deadline = time.monotonic() + self.LOCK_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise StoreLockedError(
+                            f"{self.data_dir} is locked by another process"
+                        )
+                    time.sleep(0.05)
+        
+        self._flock_holds += 1
+    
+    def _release_process_lock(self):
+        """Drop one hold; the lock is released with the last one"""
+        self._flock_holds -= 1
+        if not self._flock_holds and fcntl is not None and self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+    
+    def _take_lease(self):
+        """
+        Hold the process lock until buffered changes are flushed
+        
+        Raises StaleDataError if another process wrote since this one
+        last loaded the store.
+        """
+        if self._lease:
+            return
+        
+        self._acquire_process_lock()
+        if self._read_version() != self._version:
+            self._release_process_lock()
+            raise StaleDataError(f"{self.data_dir} was changed by another process")
+        self._lease = True
+    
+    def _end_lease(self):
+        """Release the process lock once nothing is left to flush"""
+        if self._lease and not self._dirty_ops and not self._dirty_history:
+            self._lease = False
+            self._release_process_lock()
+    
+    def _read_version(self) -> int:
+        """Store version on disk"""
+        try:
+            return int(self.lock_file.read_bytes() or 0)
+        except (FileNotFoundError, ValueError):
+            # Torn read of a concurrent update; differs from any real version
+            return -1
+    
+    def _bump_version(self):
+        """Advance the store version (callers hold the process lock)"""
+        self._version = self._read_version() + 1
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, b'%20d\n' % self._version)
+    
+    def get_version(self) -> int:
+        """Store version; increases with every write by any process"""
+        return self._read_version()
+    
+    # Schedule Cache
+    def _file_signature(self, file_path):
+        """Identify the current contents of a file without reading it"""
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _cache_key(self):
+        """Current (schedules file signature, store version)"""
+        return (self._file_signature(self.schedules_file), self._read_version())
+    
+    def _cached_schedules(self) -> List[Schedule]:
+        """Writer-side schedule list, including staged changes (callers hold self._lock)"""
+        return self._schedules
+    
+    def _refresh_from_disk(self):
+        """Reload the store if it was changed by someone else (callers hold self._lock)"""
+        if self._txn_depth or self._dirty_ops or self._dirty_history or self._flushing:
+            # Local changes not yet on disk take precedence
+            return
+        
+        key = self._cache_key()
+        
+        if self._schedules is None or key != self._cache_signature:
+            loaded = self._schedules is not None
+            old_index, old_count = self._view[1], self._history_records
+            
+            self._version = key[1]
+            self._schedules = [Schedule.from_dict(s) for s in self._load_schedules_file()]
+            self._schedule_index = {s.id: s for s in self._schedules if s.id is not None}
+            self._history_records = self._history_count()
+            self._cache_signature = key
+            self._publish()
+            
+            if loaded and self._subscribers:
+                self._emit(
+                    self._diff_schedules(old_index, self._schedule_index)
+                    + self._diff_history(old_count, self._history_records)
+                )
+    
+    def _publish(self):
+        """Make the writer-side schedules the snapshot readers see"""
+        self._view = (tuple(self._schedules), self._schedule_index)
+    
+    def _read_view(self):
+        """
+        (schedules, index) for the calling thread
+        
+        Inside its own transaction a thread sees its staged changes; every
+        other reader gets the last published snapshot. Swapping self._view
+        is atomic, so no lock is needed.
+        """
+        if self._txn_depth and self._txn_owner == threading.get_ident():
+            return self._schedules, self._schedule_index
+        return self._view
+    
+    def _stage_schedules(self, schedules: List[Schedule], ops: List[Dict]):
+        """Replace the cached schedule list; ops are journaled and written on commit"""
+        incremental = self._intervals_source is self._schedules is not None
+        
+        self._schedules = schedules
+        self._schedule_index = {s.id: s for s in schedules if s.id is not None}
+        self._pending_ops.extend(ops)
+        
+        if incremental:
+            for op in ops:
+                if op['op'] == 'put':
+                    self._intervals.update(self._schedule_index[op['schedule']['id']])
+                elif op['op'] == 'delete':
+                    self._intervals.remove(op['id'])
+                elif op['op'] == 'clear':
+                    self._intervals.clear()
+            self._intervals_source = schedules
+    
+    # Transactions
+    @contextmanager
+    def transaction(self):
+        """
+        Group mutations so they are written to disk once, on exit
+        
+        Nested transactions act as savepoints: an exception restores the
+        state from when that block was entered and is re-raised. Every
+        mutation method runs in its own transaction when called outside one.
+        Other threads wait for the transaction to finish before mutating,
+        and don't see its changes until it commits.
+        
+        The commit raises StaleDataError, discarding the changes, if another
+        process wrote to the store during the transaction; use
+        run_transaction to retry automatically.
+        """
+        with self._lock:
+            outermost = not self._txn_depth
+            if outermost:
+                self._refresh_from_disk()
+                self._txn_owner = threading.get_ident()
+            
+            savepoint = (self._schedules, self._schedule_index,
+                         len(self._pending_ops), len(self._pending_history))
+            self._txn_depth += 1
+            try:
+                try:
+                    yield self
+                finally:
+                    self._txn_depth -= 1
+                    if outermost:
+                        self._txn_owner = None
+                
+                if outermost:
+                    self._commit()
+            except BaseException:
+                (self._schedules, self._schedule_index,
+                 ops_len, history_len) = savepoint
+                del self._pending_ops[ops_len:]
+                del self._pending_history[history_len:]
+                raise
+    
+    def run_transaction(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) in a transaction and return its result
+        
+        If another process wrote to the store while func ran, its changes
+        are discarded and func runs again on fresh data, up to
+        STALE_RETRIES times. Inside an enclosing transaction func simply
+        joins it; the outermost run_transaction does the retrying.
+        """
+        nested = self._txn_depth and self._txn_owner == threading.get_ident()
+        retries = 0 if nested else self.STALE_RETRIES
+        
+        for attempt in range(retries + 1):
+            try:
+                with self.transaction():
+                    return func(*args, **kwargs)
+            except StaleDataError:
+                if attempt == retries:
+                    raise
+                get_logger().log_warning(
+                    f"Data changed by another process; retrying ({attempt + 1}/{retries})"
+                )
+    
+    def _commit(self):
+        """Publish committed changes and hand them to the writer thread"""
+        if not self._pending_ops and not self._pending_history:
+            return
+        
+        self._take_lease()
+        
+        ops, self._pending_ops = self._pending_ops, []
+        history, self._pending_history = self._pending_history, []
+        
+        if ops:
+            old_index = self._view[1]
+            self._publish()
+        
+        if self._subscribers:
+            changes = self._diff_history(0, len(history))
+            if ops:
+                changes = self._diff_schedules(old_index, self._schedule_index) + changes
+            self._emit(changes)
+        
+        self.logical_writes += 1
+        self._dirty_ops.extend(ops)
+        self._dirty_history.extend(history)
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._writer_cond.notify_all()
+    
+    # Write-behind
+    #
+    # Commits only update the cache and mark it dirty. Everything
+    # committed since the last flush is then written together by the
+    # writer thread, at most flush_interval seconds later: one journal
+    # record, one schedules.json replace and one history append, instead
+    # of one full rewrite per change.
+    def flush(self):
+        """Write all committed changes to disk and wait until they are written"""
+        with self._lock:
+            if self._txn_depth and self._txn_owner == threading.get_ident():
+                # Waiting here would let other threads into our transaction
+                self._writer_cond.notify_all()
+                return
+            
+            writer = self._writer_thread
+            if writer is not None and writer.is_alive() and not self._closed:
+                self._flush_requests += 1
+                target = self._flush_requests
+                self._writer_cond.notify_all()
+                
+                while (self._flushes_done < target and not self._closed
+                       and writer.is_alive()):
+                    self._writer_cond.wait(self.POLL_INTERVAL)
+                
+                if self._flushes_done >= target:
+                    return
+            
+            # No running writer thread: write from this thread instead
+            self._write_dirty(release_lock=False)
+    
+    def close(self):
+        """Flush buffered changes and stop the writer thread"""
+        with self._lock:
+            self._closed = True
+            self._writer_cond.notify_all()
+            self._change_queue.put(None)
+        
+        if self._writer_thread and self._writer_thread is not threading.current_thread():
+            self._writer_thread.join(timeout=5)
+        
+        with self._lock:
+            self._write_dirty(release_lock=False)
+    
+    def get_write_stats(self) -> Dict:
+        """Logical writes (commits) vs physical writes (files written)"""
+        with self._lock:
+            return {
+                'logical_writes': self.logical_writes,
+                'physical_writes': self.physical_writes,
+                'pending_ops': len(self._dirty_ops),
+                'pending_history': len(self._dirty_history)
+            }
+    
+    def _start_writer_thread(self):
+        """Start the single writer thread"""
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+    
+    def _writer_loop(self):
+        """Flush dirty data when due or requested, and watch for external changes"""
+        next_poll = time.monotonic() + self.POLL_INTERVAL
+        
+        with self._lock:
+            while not self._closed:
+                now = time.monotonic()
+                requested = self._flush_requests
+                
+                if self._dirty_since is not None and (
+                        requested > self._flushes_done
+                        or now >= self._dirty_since + self.flush_interval):
+                    try:
+                        self._write_dirty(release_lock=True)
+                    except Exception as e:
+                        get_logger().log_error(f"DataStore flush failed: {e}")
+                        # Back off before retrying
+                        self._writer_cond.wait(self.POLL_INTERVAL)
+                        continue
+                
+                if requested > self._flushes_done:
+                    self._flushes_done = requested
+                    self._writer_cond.notify_all()
+                    continue
+                
+                if now >= next_poll:
+                    try:
+                        self._refresh_from_disk()
+                    except Exception as e:
+                        get_logger().log_error(f"DataStore reload failed: {e}")
+                    next_poll = now + self.POLL_INTERVAL
+                
+                timeout = next_poll - now
+                if self._dirty_since is not None:
+                    timeout = min(timeout, self._dirty_since + self.flush_interval - now)
+                self._writer_cond.wait(max(timeout, 0))
+            
+            self._writer_cond.notify_all()
+    
+    def _write_dirty(self, release_lock: bool):
+        """
+        Write buffered changes (callers hold self._lock)
+        
+        The writer thread passes release_lock=True so mutators and history
+        readers aren't held up by disk I/O; buffers are restored if the
+        write fails so the next flush retries.
+        """
+        ops, history = self._dirty_ops, self._dirty_history
+        
+        if not ops and not history:
+            self._end_lease()
+            return
+        
+        schedules = self._view[0]
+        self._dirty_ops, self._dirty_history = [], []
+        self._dirty_since = None
+        self._inflight_history = history
+        self._flushing = True
+        
+        if release_lock:
+            self._lock.release()
+        try:
+            with self._io_lock:
+                self._write_journal(ops, history)
+                if ops:
+                    self._save_json(self.schedules_file, [s.to_dict() for s in schedules])
+                if history:
+                    self._append_history(history)
+                self._bump_version()
+                self._clear_journal()
+        except BaseException:
+            if release_lock:
+                self._lock.acquire()
+            self._dirty_ops = ops + self._dirty_ops
+            self._dirty_history = history + self._dirty_history
+            self._dirty_since = time.monotonic()
+            self._inflight_history = []
+            self._flushing = False
+            raise
+        if release_lock:
+            self._lock.acquire()
+        
+        self.physical_writes += 1 + bool(ops) + bool(history)
+        self._cache_signature = self._cache_key()
+        self._history_records = self._history_count()
+        self._inflight_history = []
+        self._flushing = False
+        self._end_lease()
+    
+    # Change Feed
+    #
+    # Subscribers are told what changed after each commit, whether it was
+    # made by this process or picked up from another one, so they don't
+    # need to poll. Each delivery is a list of deltas:
+    #   {'kind': 'schedule', 'action': 'added'|'updated'|'removed', 'ids': [...]}
+    #   {'kind': 'history', 'action': 'added', 'count': n}
+    #   {'kind': 'history', 'action': 'cleared'}
+    # Callbacks run in commit order on a dispatcher thread, never while
+    # the store is locked.
+    def subscribe(self, callback: Callable[[List[Dict]], None],
+                  kinds=CHANGE_KINDS) -> int:
+        """Call callback(changes) for changes of the given kinds; returns a token for unsubscribe()"""
+        with self._lock:
+            self._subscriber_seq += 1
+            token = self._subscriber_seq
+            
+            if not self._subscribers:
+                # Start from the current state so only new changes are reported
+                self._poll_changes()
+            self._subscribers[token] = (callback, frozenset(kinds))
+            
+            if self._dispatch_thread is None:
+                self._dispatch_thread = threading.Thread(
+                    target=self._dispatch_loop, daemon=True
+                )
+                self._dispatch_thread.start()
+        
+        return token
+    
+    def unsubscribe(self, token: int):
+        """Stop delivering changes to a subscriber"""
+        with self._lock:
+            self._subscribers.pop(token, None)
+    
+    def _emit(self, changes: List[Dict]):
+        """Queue deltas for delivery to subscribers"""
+        if changes and self._subscribers:
+            self._change_queue.put(changes)
+    
+    def _poll_changes(self) -> List[Dict]:
+        """Deltas not reported by _emit; the JSON store emits every change directly"""
+        return []
+    
+    def _dispatch_loop(self):
+        """Deliver queued changes to subscribers"""
+        while not self._closed:
+            try:
+                changes = self._change_queue.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                changes = None
+            
+            if changes is None:
+                changes = self._poll_changes()
+            
+            for callback, kinds in list(self._subscribers.values()):
+                relevant = [c for c in changes if c['kind'] in kinds]
+                if not relevant:
+                    continue
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    get_logger().log_error(f"Change subscriber failed: {e}")
+    
+    def _diff_schedules(self, old: Dict, new: Dict) -> List[Dict]:
+        """Schedule deltas between two {id: schedule} indexes"""
+        changes = []
+        for action, ids in (
+            ('added', [i for i in new if i not in old]),
+            ('updated', [i for i in new if i in old and new[i] is not old[i]
+                         and new[i] != old[i]]),
+            ('removed', [i for i in old if i not in new]),
+        ):
+            if ids:
+                changes.append({'kind': 'schedule', 'action': action, 'ids': ids})
+        return changes
+    
+    def _diff_history(self, old_count: int, new_count: int) -> List[Dict]:
+        """History deltas between two record counts"""
+        changes = []
+        if new_count < old_count:
+            changes.append({'kind': 'history', 'action': 'cleared'})
+            old_count = 0
+        if new_count > old_count:
+            changes.append({'kind': 'history', 'action': 'added', 'count': new_count - old_count})
+        return changes
     
     # Schedule Management
+    #
+    # The cache holds Schedule models (core.models) and schedule lists are
+    # replaced copy-on-write. Callers get fresh dicts, so they can't
+    # mutate the cache; get_schedule_models() hands out the shared models
+    # for hot paths that only read.
     def get_all_schedules(self) -> List[Dict]:
         """Get all schedules"""
-        return self._load_json(self.schedules_file)
+        return [s.to_dict() for s in self._read_view()[0]]
+    
+    def get_schedule_models(self, active_only: bool = False) -> List[Schedule]:
+        """Schedules as shared, read-only Schedule models"""
+        schedules = self._read_view()[0]
+        if active_only:
+            return [s for s in schedules if s.is_active]
+        return list(schedules)
+    
+    def get_schedule_model(self, schedule_id: str) -> Optional[Schedule]:
+        """Shared, read-only Schedule model by ID"""
+        return self._read_view()[1].get(schedule_id)
+    
+    def find_overlapping(self, relay_num: int, start: float, end: float,
+                         exclude=()) -> List[Schedule]:
+        """Active schedules whose spray on relay_num overlaps [start, end) (epoch seconds)"""
+        with self._lock:
+            if self._intervals_source is not self._schedules:
+                self._intervals = SprayIntervalIndex(self._schedules or ())
+                self._intervals_source = self._schedules
+            
+            return [
+                self._schedule_index[schedule_id]
+                for schedule_id in self._intervals.overlapping(relay_num, start, end, exclude)
+            ]
     
     def add_schedule(self, schedule: Dict) -> Dict:
         """Add new schedule"""
-        schedules = self.get_all_schedules()
-        
-        # Generate ID if not present
-        if 'id' not in schedule:
-            schedule['id'] = self._generate_schedule_id(schedules)
-        
-        # Add metadata
-        schedule['created_at'] = datetime.now().isoformat()
-        schedule['reschedule_count'] = schedule.get('reschedule_count', 0)
-        schedule['status'] = schedule.get('status', 'scheduled')
+        return self.add_schedules([schedule])[0]
+    
+    def add_schedules(self, new_schedules: List[Dict]) -> List[Dict]:
+        """Add several schedules with a single write; returns the stored copies"""
+        # The inputs are left as they are, so a retried attempt (or an
+        # enclosing transaction run again) picks fresh IDs
+        return self.run_transaction(self._stage_new_schedules, new_schedules)
+    
+    def _stage_new_schedules(self, new_schedules: List[Dict]) -> List[Dict]:
+        """Stage copies of new schedules with IDs and metadata filled in"""
+        schedules = list(self._cached_schedules())
+        added = []
         
-        schedules.append(schedule)
-        self._save_json(self.schedules_file, schedules)
+        for schedule in new_schedules:
+            schedule = dict(schedule)
+            
+            # Generate ID if not present
+            if 'id' not in schedule:
+                schedule['id'] = self._generate_schedule_id(schedules)
+            
+            # Add metadata
+            schedule['created_at'] = self.clock.now().isoformat()
+            schedule['reschedule_count'] = schedule.get('reschedule_count', 0)
+            schedule['status'] = schedule.get('status', 'scheduled')
+            
+            schedules.append(Schedule.from_dict(schedule))
+            added.append(schedule)
         
-        return schedule
+        self._stage_schedules(schedules, [
+            {'op': 'put', 'schedule': dict(s)} for s in added
+        ])
+        return added
     
     def update_schedule(self, schedule_id: str, updates: Dict) -> Optional[Dict]:
         """Update existing schedule"""
-        schedules = self.get_all_schedules()
+        updated = self.update_schedules({schedule_id: updates})
+        return updated[0] if updated else None
+    
+    @retry_if_stale
+    def update_schedules(self, updates_by_id: Dict[str, Dict]) -> List[Dict]:
+        """Apply {schedule_id: updates} with a single write; returns updated schedules"""
+        updated = []
         
-        for i, sched in enumerate(schedules):
-            if sched['id'] == schedule_id:
-                schedules[i].update(updates)
-                schedules[i]['updated_at'] = datetime.now().isoformat()
-                self._save_json(self.schedules_file, schedules)
-                return schedules[i]
+        with self.transaction():
+            schedules = list(self._cached_schedules())
+            now = self.clock.now().isoformat()
+            
+            for i, sched in enumerate(schedules):
+                updates = updates_by_id.get(sched.id)
+                if updates is not None:
+                    schedule = dict(sched.to_dict(), **updates)
+                    schedule['updated_at'] = now
+                    schedules[i] = Schedule.from_dict(schedule)
+                    updated.append(schedule)
+            
+            if updated:
+                self._stage_schedules(schedules, [
+                    {'op': 'put', 'schedule': dict(s)} for s in updated
+                ])
         
-        return None
+        return updated
     
+    @retry_if_stale
     def delete_schedule(self, schedule_id: str) -> bool:
         """Delete schedule"""
-        schedules = self.get_all_schedules()
-        original_count = len(schedules)
-        
-        schedules = [s for s in schedules if s['id'] != schedule_id]
-        
-        if len(schedules) < original_count:
-            self._save_json(self.schedules_file, schedules)
-            return True
+        with self.transaction():
+            schedules = self._cached_schedules()
+            original_count = len(schedules)
+            
+            schedules = [s for s in schedules if s.id != schedule_id]
+            
+            if len(schedules) < original_count:
+                self._stage_schedules(schedules, [{'op': 'delete', 'id': schedule_id}])
+                return True
         
         return False
     
     def get_schedule_by_id(self, schedule_id: str) -> Optional[Dict]:
         """Get schedule by ID"""
-        schedules = self.get_all_schedules()
-        
-        for sched in schedules:
-            if sched['id'] == schedule_id:
-                return sched
-        
-        return None
+        sched = self._read_view()[1].get(schedule_id)
+        return sched.to_dict() if sched else None
     
     def get_active_schedules(self) -> List[Dict]:
         """Get all active (not completed/cancelled) schedules"""
-        schedules = self.get_all_schedules()
-        return [s for s in schedules if s['status'] in ['scheduled', 'rescheduled']]
+        schedules = self._read_view()[0]
+        return [s.to_dict() for s in schedules if s.is_active]
     
+    @retry_if_stale
     def clear_all_schedules(self):
         """Clear all schedules"""
-        self._save_json(self.schedules_file, [])
+        with self.transaction():
+            self._stage_schedules([], [{'op': 'clear'}])
     
     # History Management
+    #
+    # History is an append-only log with one JSON record per line
+    # (history.jsonl) plus an index of fixed-size record offsets
+    # (history.idx), so appends and tail reads never touch older records.
     def get_history(self, limit: Optional[int] = None) -> List[Dict]:
         """Get spray history"""
-        history = self._load_json(self.history_file)
+        with self._lock:
+            on_disk = self._history_records
+            # Records not yet (fully) written to the log
+            buffered = self._inflight_history + self._dirty_history
+        
+        if limit and limit <= len(buffered):
+            return buffered[len(buffered) - limit:]
         
+        first = 0
         if limit:
-            return history[-limit:]
-        return history
+            first = max(on_disk - (limit - len(buffered)), 0)
+        
+        return self._read_history_range(first, on_disk) + buffered
+    
+    def get_history_records(self, limit: Optional[int] = None) -> List[HistoryRecord]:
+        """Spray history as HistoryRecord models"""
+        return [HistoryRecord.from_dict(r) for r in self.get_history(limit)]
     
+    @retry_if_stale
     def add_to_history(self, spray_data: Dict):
         """Add completed spray to history"""
-        history = self.get_history()
-        
-        spray_data['completed_at'] = datetime.now().isoformat()
-        history.append(spray_data)
+        spray_data['completed_at'] = self.clock.now().isoformat()
         
-        self._save_json(self.history_file, history)
+        with self.transaction():
+            self._pending_history.append(spray_data)
     
     def clear_history(self):
         """Clear history"""
-        self._save_json(self.history_file, [])
+        with self._lock, self._io_lock, self._process_lock():
+            self._dirty_history = []
+            open(self.history_log, 'wb').close()
+            open(self.history_index, 'wb').close()
+            self._history_records = 0
+            self._bump_version()
+            self._emit([{'kind': 'history', 'action': 'cleared'}])
+    
+    def _append_history(self, records: List[Dict]):
+        """Append records to the history log and its offset index"""
+        offsets = []
+        with open(self.history_log, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                f.write(line)
+                offsets.append(HISTORY_OFFSET.pack(offset))
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Index is written after the log so it never points past the data
+        with open(self.history_index, 'ab') as f:
+            f.write(b''.join(offsets))
+    
+    def _history_count(self) -> int:
+        """Number of records in the history log"""
+        try:
+            return self.history_index.stat().st_size // HISTORY_OFFSET.size
+        except FileNotFoundError:
+            return 0
+    
+    def _read_history_range(self, first: int, end: int) -> List[Dict]:
+        """Decode history records first..end-1 using the offset index"""
+        if first >= end:
+            return []
+        
+        # One extra offset marks where record end-1 stops, if it exists
+        with open(self.history_index, 'rb') as f:
+            f.seek(first * HISTORY_OFFSET.size)
+            raw = f.read((end - first + 1) * HISTORY_OFFSET.size)
+        offsets = [o for (o,) in HISTORY_OFFSET.iter_unpack(raw)]
+        
+        with open(self.history_log, 'rb') as f:
+            f.seek(offsets[0])
+            if len(offsets) > end - first:
+                data = f.read(offsets[end - first] - offsets[0])
+            else:
+                data = f.read()
+        
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+    
+    def _read_history_log(self, start: int = 0) -> List[Dict]:
+        """Decode history records from byte offset start to the end of the log"""
+        try:
+            with open(self.history_log, 'rb') as f:
+                f.seek(start)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        
+        records = []
+        for line in data.splitlines():
+            if line.strip():
+                records.append(json.loads(line))
+        return records
+    
+    def _load_legacy_history(self) -> List[Dict]:
+        """Read history from the old single-file history.json format"""
+        history = self._load_json(self.history_file)
+        return history if isinstance(history, list) else []
+    
+    def _migrate_legacy_history(self):
+        """Create the history log, importing records from history.json"""
+        self.clear_history()
+        legacy = self._load_legacy_history()
+        if legacy:
+            self._append_history(legacy)
+    
+    def _history_index_valid(self) -> bool:
+        """Cheap consistency check between history log and index"""
+        try:
+            index_size = self.history_index.stat().st_size
+            log_size = self.history_log.stat().st_size
+        except FileNotFoundError:
+            return False
+        
+        if index_size % HISTORY_OFFSET.size:
+            return False
+        if index_size == 0:
+            return log_size == 0
+        
+        with open(self.history_index, 'rb') as f:
+            f.seek(index_size - HISTORY_OFFSET.size)
+            last = HISTORY_OFFSET.unpack(f.read(HISTORY_OFFSET.size))[0]
+        
+        with open(self.history_log, 'rb') as f:
+            f.seek(log_size - 1)
+            ends_with_newline = f.read(1) == b'\n'
+            if not ends_with_newline or last >= log_size:
+                return False
+            # The last indexed record must be the last line in the log
+            f.seek(last)
+            return f.read().count(b'\n') == 1
+    
+    def _rebuild_history_index(self):
+        """Rescan the history log, dropping a torn trailing record"""
+        offsets = []
+        good_end = 0
+        with open(self.history_log, 'rb') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                    offsets.append(HISTORY_OFFSET.pack(offset))
+                offset += len(line)
+                good_end = offset
+        
+        with open(self.history_log, 'r+b') as f:
+            f.truncate(good_end)
+        with open(self.history_index, 'wb') as f:
+            f.write(b''.join(offsets))
     
     # Helper Methods
-    def _generate_schedule_id(self, existing_schedules: List[Dict]) -> str:
+    def _generate_schedule_id(self, existing_schedules: List[Schedule]) -> str:
         """Generate unique schedule ID"""
-        if not existing_schedules:
-            return "SCH_001"
+        # Series rules (SERIES_...) share the list but not the numbering
+        for schedule in reversed(existing_schedules):
+            if schedule.id and schedule.id.startswith('SCH_'):
+                return self._next_schedule_id(schedule.id, len(existing_schedules))
         
+        return "SCH_001"
+    
+    def _next_schedule_id(self, last_id: str, count: int) -> str:
+        """Generate the ID following last_id (count is used as fallback)"""
         # Extract numeric part of last ID
-        last_id = existing_schedules[-1].get('id', 'SCH_000')
         try:
             num = int(last_id.split('_')[1]) + 1
             return f"SCH_{num:03d}"
         except (IndexError, ValueError):
-            return f"SCH_{len(existing_schedules) + 1:03d}"
+            return f"SCH_{count + 1:03d}"
     
     def get_schedules_by_date(self, date_str: str) -> List[Dict]:
         """Get all schedules for a specific date"""
-        schedules = self.get_active_schedules()
-        return [s for s in schedules if s['date'] == date_str]
+        schedules = self._read_view()[0]
+        return [s.to_dict() for s in schedules if s.date == date_str and s.is_active]
     
     def export_data(self, export_path: str):
         """Export all data to a single JSON file"""
         data = {
             'schedules': self.get_all_schedules(),
             'history': self.get_history(),
-            'exported_at': datetime.now().isoformat()
+            'exported_at': self.clock.now().isoformat()
         }
         
         with open(export_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
 
+# Storage backend used by get_data_store(): "json" or "sqlite"
+STORAGE_BACKEND = "json"
+
 # Global data store instance
 _data_store_instance = None
 
@@ -169,5 +1156,9 @@ def get_data_store():
     """Get global data store instance"""
     global _data_store_instance
     if _data_store_instance is None:
-        _data_store_instance = DataStore()
+        if STORAGE_BACKEND == "sqlite":
+            from core.sqlite_store import SQLiteDataStore
+            _data_store_instance = SQLiteDataStore()
+        else:
+            _data_store_instance = DataStore()
     return _data_store_instance
@@ -0,0 +1,85 @@
+# intervals.py
+# Per-relay index of spray time slots for conflict detection
+
+import bisect
+from typing import Iterable, List, Optional, Tuple
+from core.models import Schedule, relay_for
+
+
+class SprayIntervalIndex:
+    """
+    Spray slots [start, start + duration) of active schedules, per relay
+    
+    Each relay keeps its slots sorted by start time. A slot that overlaps
+    [start, end) must begin before end and no earlier than start minus the
+    relay's longest slot, so a query is two bisections plus a scan of the
+    slots in between.
+    """
+    
+    # Seconds assumed for schedules without a duration (as the scheduler does)
+    DEFAULT_DURATION = 30
+    
+    def __init__(self, schedules: Iterable[Schedule] = ()):
+        # relay -> sorted [(start, schedule id)]
+        self._starts = {}
+        # schedule id -> (relay, start, end)
+        self._slots = {}
+        # relay -> longest slot ever added; only ever grows
+        self._longest = {}
+        
+        for schedule in schedules:
+            self.update(schedule)
+    
+    @classmethod
+    def slot_of(cls, schedule: Schedule) -> Optional[Tuple[int, float, float]]:
+        """(relay, start, end) of an active schedule, None otherwise"""
+        if not schedule.is_active or schedule.timestamp is None:
+            return None
+        duration = float(schedule.duration or cls.DEFAULT_DURATION)
+        return relay_for(schedule.container), schedule.timestamp, schedule.timestamp + duration
+    
+    def update(self, schedule: Schedule):
+        """Add, move or drop a schedule's slot to match its current state"""
+        self.remove(schedule.id)
+        
+        slot = self.slot_of(schedule)
+        if slot is None:
+            return
+        
+        relay_num, start, end = slot
+        bisect.insort(self._starts.setdefault(relay_num, []), (start, schedule.id))
+        self._slots[schedule.id] = slot
+        self._longest[relay_num] = max(self._longest.get(relay_num, 0.0), end - start)
+    
+    def remove(self, schedule_id: str):
+        """Drop a schedule's slot, if indexed"""
+        slot = self._slots.pop(schedule_id, None)
+        if slot is None:
+            return
+        
+        starts = self._starts[slot[0]]
+        del starts[bisect.bisect_left(starts, (slot[1], schedule_id))]
+    
+    def clear(self):
+        self._starts.clear()
+        self._slots.clear()
+        self._longest.clear()
+    
+    def overlapping(self, relay_num: int, start: float, end: float,
+                    exclude: Iterable[str] = ()) -> List[str]:
+        """IDs of schedules whose slot on relay_num overlaps [start, end), by start time"""
+        starts = self._starts.get(relay_num)
+        if not starts:
+            return []
+        
+        exclude = set(exclude)
+        lo = bisect.bisect_left(starts, (start - self._longest[relay_num],))
+        hi = bisect.bisect_left(starts, (end,), lo)
+        
+        return [
+            schedule_id for _, schedule_id in starts[lo:hi]
+            if self._slots[schedule_id][2] > start and schedule_id not in exclude
+        ]
+    
+    def __len__(self):
+        return len(self._slots)
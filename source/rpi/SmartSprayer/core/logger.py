@@ -1,29 +1,709 @@
 # logger.py
 # Comprehensive logging system for Smart Sprayer
 
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import re
+import shutil
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Passes records through a bounded queue to a writer thread that runs
+    the file and console handlers, so logging never waits on disk
+    
+    When the queue is full the overflow policy decides:
+    'drop_newest' drops the new record, 'drop_oldest' drops the oldest
+    queued one to make room, and 'block' waits up to BLOCK_TIMEOUT
+    seconds before dropping. Drops are counted and reported in the log
+    once the queue has room again. After close() records are written
+    synchronously.
+    """
+    
+    POLICIES = ('drop_newest', 'drop_oldest', 'block')
+    BLOCK_TIMEOUT = 1.0
+    
+    # Tells the writer thread to stop
+    _STOP = None
+    
+    def __init__(self, targets: Iterable[logging.Handler], max_queue: int = 10000,
+                 policy: str = 'drop_newest'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        
+        super().__init__(queue.Queue(max_queue))
+        self.targets = list(targets)
+        self.policy = policy
+        
+        self._stats_lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+        self.high_water = 0
+        self._unreported = 0
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._write_loop, name="LogWriter", daemon=True)
+        self._thread.start()
+    
+    def enqueue(self, record: logging.LogRecord):
+        if self._closed:
+            self._write(record)
+            return
+        
+        if self._unreported:
+            self._report_drops()
+        
+        if not self._put(record):
+            self._count_drop()
+            return
+        
+        with self._stats_lock:
+            self.queued += 1
+            self.high_water = max(self.high_water, self.queue.qsize())
+    
+    def _report_drops(self):
+        """Queue a notice of dropped records, only if that needs no further drops"""
+        with self._stats_lock:
+            unreported, self._unreported = self._unreported, 0
+        try:
+            self.queue.put_nowait(self._drop_notice(unreported))
+        except queue.Full:
+            with self._stats_lock:
+                self._unreported += unreported
+    
+    def _put(self, record: logging.LogRecord) -> bool:
+        """Queue a record according to the overflow policy; False if it was dropped"""
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.BLOCK_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            if self.policy != 'drop_oldest':
+                return False
+        
+        try:
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self._count_drop()
+        except queue.Empty:
+            pass
+        
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            return False
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Queue records unformatted, so messages are built on the writer
+        thread; tracebacks are rendered now, while they still exist
+        """
+        if record.exc_info or record.stack_info:
+            return super().prepare(record)
+        return record
+    
+    def _count_drop(self):
+        with self._stats_lock:
+            self.dropped += 1
+            self._unreported += 1
+    
+    def _drop_notice(self, count: int) -> logging.LogRecord:
+        return self.prepare(logging.makeLogRecord({
+            'name': "SmartSprayer",
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': f"Log queue full: {count} record(s) dropped",
+        }))
+    
+    def _write(self, record: logging.LogRecord):
+        """Hand a record to the targets that accept its level"""
+        for handler in self.targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+    
+    def _write_loop(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is self._STOP:
+                    return
+                self._write(record)
+            except Exception:
+                self.handleError(record)
+            finally:
+                self.queue.task_done()
+    
+    def flush(self):
+        """Wait until the writer thread has written every queued record"""
+        if (not self._closed and self._thread.is_alive()
+                and self._thread is not threading.current_thread()):
+            self.queue.join()
+        for handler in self.targets:
+            handler.flush()
+    
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'policy': self.policy,
+                'queued': self.queued,
+                'dropped': self.dropped,
+                'pending': self.queue.qsize(),
+                'high_water': self.high_water,
+                'capacity': self.queue.maxsize,
+            }
+    
+    def close(self):
+        """Write every queued record, stop the writer thread and close the targets"""
+        with self._close_lock:
+            if self._closed:
+                return
+            
+            # Waits for room if the queue is full; the writer is draining it
+            self.queue.put(self._STOP)
+            if self._thread is not threading.current_thread():
+                self._thread.join(timeout=5)
+            self._closed = True
+            
+            # Records queued after the stop marker
+            while True:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is not self._STOP:
+                    self._write(record)
+            
+            with self._stats_lock:
+                unreported, self._unreported = self._unreported, 0
+            if unreported:
+                self._write(self._drop_notice(unreported))
+            
+            for handler in self.targets:
+                handler.flush()
+                handler.close()
+            super().close()
+
+
+class CompressedRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    File handler that starts a new file when the current one would grow
+    past max_bytes, or on the first record of a new day when daily is set
+    
+    A rotated file is gzipped next to the log as <name>.<YYYYmmdd-HHMMSS>.gz.
+    The oldest rotated files are deleted while they take more than
+    retention_bytes together (0 keeps them all).
+    """
+    
+    def __init__(self, filename, max_bytes: int = 0, daily: bool = False,
+                 retention_bytes: int = 0, encoding: str = 'utf-8'):
+        super().__init__(filename, 'a', encoding=encoding)
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.retention_bytes = retention_bytes
+        
+        name = re.escape(os.path.basename(self.baseFilename))
+        self._rotated_re = re.compile(rf'^{name}\.(\d{{8}}-\d{{6}})(?:-(\d+))?(\.gz)?$')
+        # Day of the records in the current file, and of the record being written
+        self._day = self._file_day()
+        self._record_day = self._day
+    
+    @staticmethod
+    def _today() -> str:
+        return time.strftime('%Y-%m-%d')
+    
+    def _file_day(self) -> str:
+        """Day the current file was last written, today if it is empty"""
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return self._today()
+        if stat.st_size == 0:
+            return self._today()
+        return time.strftime('%Y-%m-%d', time.localtime(stat.st_mtime))
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)
+        size = self.stream.tell()
+        self._record_day = time.strftime('%Y-%m-%d', time.localtime(record.created))
+        if size == 0:
+            self._day = self._record_day
+            return False
+        
+        if self.daily and self._record_day != self._day:
+            return True
+        return self.max_bytes > 0 and size + len(self.format(record)) + 1 > self.max_bytes
+    
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            rotated = self._rotated_name()
+            os.replace(self.baseFilename, rotated)
+            self._compress(rotated)
+            self._apply_retention()
+        
+        self._day = self._record_day
+        self.stream = self._open()
+    
+    def _rotated_name(self) -> str:
+        """Name for the next rotated file; sorts after every existing one"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        taken = [
+            int(match.group(2) or 0)
+            for match in (self._rotated_re.match(p.name) for p in self.rotated_files())
+            if match.group(1) == stamp
+        ]
+        if not taken:
+            return f"{self.baseFilename}.{stamp}"
+        return f"{self.baseFilename}.{stamp}-{max(taken) + 1}"
+    
+    @staticmethod
+    def _compress(path: str):
+        """Replace path with path.gz"""
+        temp_path = path + '.gz.tmp'
+        with open(path, 'rb') as src, gzip.open(temp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(temp_path, path + '.gz')
+        os.remove(path)
+    
+    def rotated_files(self) -> List[Path]:
+        """Rotated files, oldest first"""
+        directory = Path(self.baseFilename).parent
+        found = []
+        for path in directory.iterdir():
+            match = self._rotated_re.match(path.name)
+            if match:
+                found.append(((match.group(1), int(match.group(2) or 0)), path))
+        return [path for _, path in sorted(found)]
+    
+    def _apply_retention(self):
+        if self.retention_bytes <= 0:
+            return
+        
+        rotated = [(path, path.stat().st_size) for path in self.rotated_files()]
+        total = sum(size for _, size in rotated)
+        for path, size in rotated:
+            if total <= self.retention_bytes:
+                break
+            path.unlink()
+            total -= size
+    
+    def clear(self):
+        """Delete the rotated files and empty the current one"""
+        self.acquire()
+        try:
+            if self.stream:
+                self.stream.close()
+            for path in self.rotated_files():
+                path.unlink()
+            self.stream = open(self.baseFilename, 'w', encoding=self.encoding)
+            self._day = self._today()
+        finally:
+            self.release()
+
+
+class EventLogHandler(logging.Handler):
+    """
+    Writes records that carry an event type as JSON lines, with a sparse
+    index for queries
+    
+    Each line has ts (epoch seconds), time, level, event, message,
+    schedule_id and container, plus a 'data' dict for other fields.
+    Every BLOCK_EVENTS lines the index file gets one entry for that block:
+    its byte range, lowest and highest timestamp (the clock may step back
+    within a block), and the event types and containers in it. Queries
+    read only the blocks that can match, plus the block still being filled.
+    
+    With max_bytes, once the file grows past it the oldest blocks are
+    dropped until at most half of it is left, so the file stays within
+    about max_bytes.
+    
+    Several processes may share the files (the daemon and the GUI both
+    log to logs/). Every append, trim and query holds an flock on the
+    lock file next to the index and first catches up with what the
+    others wrote; the lock file also counts trims and clears, after
+    which the blocks are reloaded from disk.
+    """
+    
+    BLOCK_EVENTS = 256
+    
+    def __init__(self, filename, index_filename, max_bytes=0):
+        super().__init__()
+        self.path = Path(filename)
+        self.index_path = Path(index_filename)
+        self.max_bytes = max_bytes
+        self._stream = None
+        self._blocks = []
+        self._block = None
+        self._generation = None
+        # Left open for the life of the handler; records may still come after close()
+        self._lock_fd = os.open(self.index_path.with_suffix('.lock'),
+                                os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock_files()
+        try:
+            self._sync()
+        finally:
+            self._unlock_files()
+    
+    @staticmethod
+    def _new_block(offset: int) -> Dict:
+        return {'offset': offset, 'end': offset, 'min_ts': None, 'max_ts': None,
+                'count': 0, 'events': set(), 'containers': set()}
+    
+    @staticmethod
+    def _add_to_block(block: Dict, entry: Dict, size: int):
+        block['end'] += size
+        block['count'] += 1
+        ts = entry['ts']
+        if ts is not None:
+            block['min_ts'] = ts if block['min_ts'] is None else min(block['min_ts'], ts)
+            block['max_ts'] = ts if block['max_ts'] is None else max(block['max_ts'], ts)
+        block['events'].add(entry['event'])
+        if entry.get('container') is not None:
+            block['containers'].add(entry['container'])
+    
+    @staticmethod
+    def _index_line(block: Dict) -> str:
+        return json.dumps({
+            'offset': block['offset'], 'end': block['end'], 'count': block['count'],
+            'min_ts': block['min_ts'], 'max_ts': block['max_ts'],
+            'events': sorted(block['events']), 'containers': sorted(block['containers']),
+        }) + '\n'
+    
+    def _lock_files(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+    
+    def _unlock_files(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+    
+    def _read_generation(self) -> int:
+        """Trims and clears so far, by any process (callers hold the file lock)"""
+        try:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            return int(os.read(self._lock_fd, 32) or 0)
+        except ValueError:
+            return -1
+    
+    def _bump_generation(self):
+        self._generation = self._read_generation() + 1
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, b'%20d\n' % self._generation)
+    
+    def _sync(self):
+        """Reload the blocks if another process changed the files (callers hold the file lock)"""
+        generation = self._read_generation()
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = -1
+        if self._block is None or generation != self._generation or size != self._block['end']:
+            if self._stream:
+                self._stream.close()
+                self._stream = None
+            self._load()
+            self._generation = generation
+    
+    def _load(self):
+        """Read the index, rebuilding it if it does not match the event file"""
+        self.path.touch()
+        
+        # Drop a line left half-written by a crash
+        with open(self.path, 'rb+') as f:
+            data_end = f.seek(0, 2)
+            if data_end:
+                f.seek(max(0, data_end - 1))
+                if f.read(1) != b'\n':
+                    f.seek(0)
+                    data_end = f.read().rfind(b'\n') + 1
+                    f.truncate(data_end)
+        
+        blocks = []
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    block = json.loads(line)
+                    if 'min_ts' not in block:
+                        # Written before blocks kept min_ts/max_ts
+                        blocks = None
+                        break
+                    block['events'] = set(block['events'])
+                    block['containers'] = set(block['containers'])
+                    blocks.append(block)
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError):
+            blocks = None
+        
+        expected = 0
+        for block in blocks or ():
+            if block['offset'] != expected:
+                blocks = None
+                break
+            expected = block['end']
+        
+        if blocks is None or expected > data_end:
+            blocks = self._rebuild_index()
+        
+        self._blocks = blocks
+        self._block = self._new_block(blocks[-1]['end'] if blocks else 0)
+        for entry, size in self._scan(self._block['offset'], data_end):
+            self._add_to_block(self._block, entry, size)
+    
+    def _scan(self, start: int, end: int):
+        """(entry, size in bytes) of the event lines between two offsets"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        for line in data.splitlines(keepends=True):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = {'ts': None, 'event': None}
+            yield entry, len(line)
+    
+    def _rebuild_index(self) -> List[Dict]:
+        blocks = []
+        block = self._new_block(0)
+        for entry, size in self._scan(0, self.path.stat().st_size):
+            self._add_to_block(block, entry, size)
+            if block['count'] >= self.BLOCK_EVENTS:
+                blocks.append(block)
+                block = self._new_block(block['end'])
+        
+        temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(self._index_line(b) for b in blocks)
+        os.replace(temp_path, self.index_path)
+        return blocks
+    
+    def emit(self, record: logging.LogRecord):
+        event = getattr(record, 'event', None)
+        if event is None:
+            return
+        
+        try:
+            entry = {
+                'ts': round(record.created, 3),
+                'time': datetime.fromtimestamp(record.created).isoformat(timespec='seconds'),
+                'level': record.levelname,
+                'event': event,
+                'message': record.getMessage(),
+                'schedule_id': getattr(record, 'schedule_id', None),
+                'container': getattr(record, 'container', None),
+            }
+            data = getattr(record, 'event_data', None)
+            if data:
+                entry['data'] = data
+            line = (json.dumps(entry, default=str) + '\n').encode('utf-8')
+        except Exception:
+            self.handleError(record)
+            return
+        
+        self._lock_files()
+        try:
+            self._sync()
+            if self._stream is None:
+                self._stream = open(self.path, 'ab')
+            self._stream.write(line)
+            self._stream.flush()
+            
+            self._add_to_block(self._block, entry, len(line))
+            if self._block['count'] >= self.BLOCK_EVENTS:
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(self._index_line(self._block))
+                self._blocks.append(self._block)
+                self._block = self._new_block(self._block['end'])
+                if self.max_bytes and self._block['offset'] > self.max_bytes:
+                    self._trim()
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._unlock_files()
+    
+    def _trim(self):
+        """Drop the oldest blocks, keeping at most half of max_bytes (callers hold the file lock)"""
+        end = self._block['end']
+        keep = [dict(b) for b in self._blocks if end - b['offset'] <= self.max_bytes // 2]
+        current = dict(self._block)
+        cut = keep[0]['offset'] if keep else current['offset']
+        for block in keep + [current]:
+            block['offset'] -= cut
+            block['end'] -= cut
+        
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        
+        try:
+            # The events go first: should the process die before the index
+            # is replaced, the old index runs past the end of the file and
+            # _load rebuilds it
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(self.path, 'rb') as src, open(temp_path, 'wb') as dst:
+                src.seek(cut)
+                shutil.copyfileobj(src, dst)
+            os.replace(temp_path, self.path)
+            
+            temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(self._index_line(b) for b in keep)
+            os.replace(temp_path, self.index_path)
+        except Exception:
+            # Match the blocks to whatever is on disk now
+            self._load()
+            raise
+        finally:
+            # Offsets held by other processes no longer apply
+            self._bump_generation()
+        
+        self._blocks = keep
+        self._block = current
+    
+    def query(self, event: Optional[str] = None, container: Optional[str] = None,
+              schedule_id: Optional[str] = None, level: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Matching events, oldest first; with limit, only the most recent ones"""
+        def may_match(block):
+            # Blocks without a timestamp hold only unreadable lines
+            return (block['max_ts'] is not None
+                    and (since is None or block['max_ts'] >= since)
+                    and (until is None or block['min_ts'] <= until)
+                    and (event is None or event in block['events'])
+                    and (container is None or container in block['containers']))
+        
+        def matches(entry):
+            return ((event is None or entry['event'] == event)
+                    and (container is None or entry.get('container') == container)
+                    and (schedule_id is None or entry.get('schedule_id') == schedule_id)
+                    and (level is None or entry.get('level') == level)
+                    and (since is None or entry['ts'] >= since)
+                    and (until is None or entry['ts'] <= until))
+        
+        found = []
+        # Held throughout, as _trim moves the blocks
+        self.acquire()
+        self._lock_files()
+        try:
+            self._sync()
+            for block in reversed(self._blocks + [self._block]):
+                if not may_match(block):
+                    continue
+                entries = [e for e, _ in self._scan(block['offset'], block['end'])
+                           if e['event'] is not None and matches(e)]
+                found.extend(reversed(entries))
+                if limit is not None and len(found) >= limit:
+                    break
+        finally:
+            self._unlock_files()
+            self.release()
+        
+        found = found[:limit] if limit is not None else found
+        found.reverse()
+        return found
+    
+    def clear(self):
+        """Delete all events and the index"""
+        self.acquire()
+        self._lock_files()
+        try:
+            if self._stream:
+                self._stream.close()
+                self._stream = None
+            self.path.write_bytes(b'')
+            self.index_path.write_text('', encoding='utf-8')
+            self._blocks = []
+            self._block = self._new_block(0)
+            self._bump_generation()
+        finally:
+            self._unlock_files()
+            self.release()
+    
+    def close(self):
+        self.acquire()
+        try:
+            if self._stream:
+                self._stream.close()
+                self._stream = None
+        finally:
+            self.release()
+        super().close()
+
 
 class SmartSprayerLogger:
     """Custom logger for Smart Sprayer system"""
     
-    def __init__(self, log_dir="logs", log_file="smartsprayer.log"):
+    # Records waiting for the writer thread, and what to do when it falls behind
+    QUEUE_SIZE = 10000
+    OVERFLOW_POLICY = 'drop_newest'
+    
+    # Log rotation: size and/or day, and the total size rotated files may use
+    MAX_LOG_BYTES = 1024 * 1024
+    ROTATE_DAILY = True
+    RETENTION_BYTES = 20 * 1024 * 1024
+    
+    # Size logs/events.jsonl may grow to before its oldest events are dropped
+    EVENT_LOG_BYTES = 5 * 1024 * 1024
+    
+    # Bytes read per step when reading the log backwards from its end
+    TAIL_BLOCK = 8192
+    
+    # Leading bytes of the log that tell read_since it is still the same file
+    FINGERPRINT_BYTES = 64
+    
+    # Lowest level logged; messages below it are never built (see set_level)
+    LOG_LEVEL = logging.DEBUG
+    
+    # Lowest level also written to the event log; with INFO, DEBUG helpers
+    # (hardware actions, tank levels, per-schedule adjust lines) go to the
+    # text log only
+    EVENT_LOG_LEVEL = logging.INFO
+    
+    def __init__(self, log_dir="logs", log_file="smartsprayer.log", event_file="events.jsonl"):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
         
         self.log_file = self.log_dir / log_file
+        self.event_file = self.log_dir / event_file
         
         # Configure logging
         self.logger = logging.getLogger("SmartSprayer")
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(self.LOG_LEVEL)
         
         # Clear existing handlers
+        for handler in self.logger.handlers:
+            handler.close()
         self.logger.handlers.clear()
         
         # File handler
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        self.file_handler = file_handler = CompressedRotatingFileHandler(
+            self.log_file, self.MAX_LOG_BYTES, self.ROTATE_DAILY, self.RETENTION_BYTES
+        )
         file_handler.setLevel(logging.DEBUG)
         
         # Console handler
@@ -38,93 +718,307 @@ class SmartSprayerLogger:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        # Structured events (see log_event), next to the text log
+        self.event_handler = EventLogHandler(
+            self.event_file, self.event_file.with_suffix('.idx'), self.EVENT_LOG_BYTES
+        )
+        self.event_handler.setLevel(self.EVENT_LOG_LEVEL)
+        
+        # Callers only queue records; a writer thread runs the handlers
+        self.queue_handler = LogQueueHandler(
+            [file_handler, console_handler, self.event_handler],
+            self.QUEUE_SIZE, self.OVERFLOW_POLICY
+        )
+        self.queue_handler.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.queue_handler)
+        atexit.register(self.close)
         
         self.log_info("Smart Sprayer Logger initialized")
     
-    def log_info(self, message):
+    def get_stats(self):
+        """Queued, dropped and pending record counts of the log queue"""
+        return self.queue_handler.get_stats()
+    
+    def flush(self):
+        """Wait until queued records are written"""
+        self.queue_handler.flush()
+    
+    def close(self):
+        """Write out queued records and stop the writer thread"""
+        self.queue_handler.close()
+    
+    def set_level(self, level):
+        """Log only messages at level and above, e.g. logging.INFO"""
+        self.logger.setLevel(level)
+    
+    def is_enabled(self, level):
+        """Whether a message at level would be logged"""
+        return self.logger.isEnabledFor(level)
+    
+    # message may use %-style placeholders for args; it is only formatted
+    # if the record is logged, on the writer thread
+    
+    def log_info(self, message, *args):
         """Log info level message"""
-        self.logger.info(message)
+        self.logger.info(message, *args)
     
-    def log_warning(self, message):
+    def log_warning(self, message, *args):
         """Log warning level message"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
     
-    def log_error(self, message):
+    def log_error(self, message, *args):
         """Log error level message"""
-        self.logger.error(message)
+        self.logger.error(message, *args)
     
-    def log_debug(self, message):
+    def log_debug(self, message, *args):
         """Log debug level message"""
-        self.logger.debug(message)
+        self.logger.debug(message, *args)
+    
+    def log_event(self, level, event, message, *args, schedule_id=None, container=None, **data):
+        """Log a message that also goes to the event log as `event` (e.g. 'SPRAY_COMPLETED')"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < self.event_handler.level:
+            # Text log only; skip building the event fields
+            self.logger.log(level, message, *args)
+            return
+        self.logger.log(level, message, *args, extra={
+            'event': event,
+            'schedule_id': schedule_id,
+            'container': container,
+            'event_data': data,
+        })
+    
+    def query_events(self, event=None, container=None, schedule_id=None, level=None,
+                     since=None, until=None, limit=None):
+        """
+        Events from the event log, oldest first
+        
+        since/until are datetimes or epoch seconds; with limit, only the
+        most recent matches are returned. Example, sprays completed on
+        Container 2 in the last 30 days:
+            query_events('SPRAY_COMPLETED', 'Container 2',
+                         since=datetime.now() - timedelta(days=30))
+        """
+        if isinstance(since, datetime):
+            since = since.timestamp()
+        if isinstance(until, datetime):
+            until = until.timestamp()
+        
+        # Include events still waiting in the queue
+        self.flush()
+        return self.event_handler.query(event, container, schedule_id, level,
+                                        since, until, limit)
     
     def log_schedule_created(self, schedule_data):
         """Log schedule creation"""
-        msg = (f"SCHEDULE CREATED - Date: {schedule_data['date']}, "
-               f"Time: {schedule_data['time']}, Type: {schedule_data['spray_type']}, "
-               f"Container: {schedule_data['container']}")
-        self.log_info(msg)
+        self.log_event(
+            logging.INFO, 'SCHEDULE_CREATED',
+            "SCHEDULE CREATED - Date: %s, Time: %s, Type: %s, Container: %s",
+            schedule_data['date'], schedule_data['time'],
+            schedule_data['spray_type'], schedule_data['container'],
+            schedule_id=schedule_data.get('id'), container=schedule_data['container'],
+            date=schedule_data['date'], time=schedule_data['time'],
+            spray_type=schedule_data['spray_type']
+        )
     
-    def log_schedule_rescheduled(self, old_date, new_date, reschedule_count):
+    def log_schedule_rescheduled(self, old_date, new_date, reschedule_count,
+                                 schedule_id=None, container=None):
         """Log schedule reschedule"""
-        msg = (f"SCHEDULE RESCHEDULED - Old date: {old_date}, "
-               f"New date: {new_date}, Reschedule count: {reschedule_count}")
-        self.log_warning(msg)
+        self.log_event(
+            logging.WARNING, 'SCHEDULE_RESCHEDULED',
+            "SCHEDULE RESCHEDULED - Old date: %s, New date: %s, Reschedule count: %s",
+            old_date, new_date, reschedule_count,
+            schedule_id=schedule_id, container=container,
+            old_date=old_date, new_date=new_date, reschedule_count=reschedule_count
+        )
     
-    def log_schedule_cancelled(self, schedule_id, reason="User cancelled"):
+    def log_schedule_cancelled(self, schedule_id, reason="User cancelled", container=None):
         """Log schedule cancellation"""
-        msg = f"SCHEDULE CANCELLED - ID: {schedule_id}, Reason: {reason}"
-        self.log_warning(msg)
+        self.log_event(
+            logging.WARNING, 'SCHEDULE_CANCELLED',
+            "SCHEDULE CANCELLED - ID: %s, Reason: %s", schedule_id, reason,
+            schedule_id=schedule_id, container=container, reason=reason
+        )
     
     def log_auto_adjust(self, affected_schedules):
         """Log auto-adjustment of schedules"""
-        msg = f"AUTO-ADJUST triggered - {len(affected_schedules)} schedule(s) adjusted"
-        self.log_info(msg)
+        self.log_event(
+            logging.INFO, 'AUTO_ADJUST',
+            "AUTO-ADJUST triggered - %s schedule(s) adjusted", len(affected_schedules),
+            count=len(affected_schedules)
+        )
+        
+        # One line per schedule, only when DEBUG is logged
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         for sched in affected_schedules:
-            self.log_debug(f"  - Schedule {sched['id']} moved from {sched['old_date']} to {sched['new_date']}")
+            self.log_event(
+                logging.DEBUG, 'SCHEDULE_ADJUSTED',
+                "  - Schedule %s moved from %s to %s",
+                sched['id'], sched['old_date'], sched['new_date'],
+                schedule_id=sched['id'], old_date=sched['old_date'], new_date=sched['new_date']
+            )
     
     def log_spray_executed(self, schedule_data):
         """Log spray execution"""
-        msg = (f"SPRAY EXECUTED - Date: {schedule_data['date']}, "
-               f"Time: {schedule_data['time']}, Type: {schedule_data['spray_type']}, "
-               f"Container: {schedule_data['container']}")
-        self.log_info(msg)
+        self.log_event(
+            logging.INFO, 'SPRAY_EXECUTED',
+            "SPRAY EXECUTED - Date: %s, Time: %s, Type: %s, Container: %s",
+            schedule_data['date'], schedule_data['time'],
+            schedule_data['spray_type'], schedule_data['container'],
+            schedule_id=schedule_data.get('id'), container=schedule_data['container'],
+            spray_type=schedule_data['spray_type']
+        )
     
-    def log_spray_completed(self, schedule_id, duration):
+    def log_spray_completed(self, schedule_id, duration, container=None):
         """Log spray completion"""
-        msg = f"SPRAY COMPLETED - ID: {schedule_id}, Duration: {duration}s"
-        self.log_info(msg)
+        self.log_event(
+            logging.INFO, 'SPRAY_COMPLETED',
+            "SPRAY COMPLETED - ID: %s, Duration: %ss", schedule_id, duration,
+            schedule_id=schedule_id, container=container, duration=duration
+        )
+    
+    def log_spray_aborted(self, schedule_id, duration, requested, container=None):
+        """Log a spray stopped before its full duration"""
+        self.log_event(
+            logging.WARNING, 'SPRAY_ABORTED',
+            "SPRAY ABORTED - ID: %s, Sprayed: %ss of %ss", schedule_id, duration, requested,
+            schedule_id=schedule_id, container=container,
+            duration=duration, requested=requested
+        )
     
     def log_system_status(self, status):
         """Log system status change"""
-        msg = f"SYSTEM STATUS: {status}"
-        self.log_info(msg)
+        self.log_event(logging.INFO, 'SYSTEM_STATUS', "SYSTEM STATUS: %s", status,
+                       status=status)
     
     def log_tank_level(self, container_num, level_percent):
         """Log tank level"""
-        msg = f"TANK {container_num} LEVEL: {level_percent}%"
-        self.log_debug(msg)
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.log_event(logging.DEBUG, 'TANK_LEVEL', "TANK %s LEVEL: %s%%",
+                       container_num, level_percent,
+                       container=f"Container {container_num}", level_percent=level_percent)
     
     def log_hardware_action(self, action, component):
         """Log hardware action"""
-        msg = f"HARDWARE ACTION - {component}: {action}"
-        self.log_debug(msg)
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.log_event(logging.DEBUG, 'HARDWARE_ACTION', "HARDWARE ACTION - %s: %s",
+                       component, action, component=component, action=action)
+    
+    def log_segments(self):
+        """Rotated log files then the current one, oldest first"""
+        return self.file_handler.rotated_files() + [self.log_file]
+    
+    @staticmethod
+    def _decode(data):
+        return data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    
+    @classmethod
+    def _tail_lines(cls, path, num_lines):
+        """Last num_lines lines of a plain file, read backwards from the end in blocks"""
+        with open(path, 'rb') as f:
+            position = f.seek(0, 2)
+            blocks = []
+            newlines = 0
+            # One newline more than needed: the first block may start mid-line
+            while position > 0 and newlines <= num_lines:
+                size = min(cls.TAIL_BLOCK, position)
+                position -= size
+                f.seek(position)
+                block = f.read(size)
+                blocks.append(block)
+                newlines += block.count(b'\n')
+        
+        lines = cls._decode(b''.join(reversed(blocks)))
+        if position > 0:
+            lines = lines[1:]
+        return lines[-num_lines:]
+    
+    @classmethod
+    def _segment_lines(cls, path, num_lines):
+        """Last num_lines lines of a log file; rotated files are gzipped and read whole"""
+        if path.suffix != '.gz':
+            return cls._tail_lines(path, num_lines)
+        with gzip.open(path, 'rb') as f:
+            return cls._decode(f.read())[-num_lines:]
     
     def read_logs(self, num_lines=100):
-        """Read recent log entries"""
+        """Read recent log entries, continuing into rotated files as needed"""
+        if num_lines <= 0:
+            return []
+        
+        lines = []
+        for path in reversed(self.log_segments()):
+            try:
+                lines = self._segment_lines(path, num_lines - len(lines)) + lines
+            except FileNotFoundError:
+                # Removed by rotation or retention meanwhile
+                continue
+            if len(lines) >= num_lines:
+                break
+        return lines
+    
+    def read_since(self, offset=None):
+        """
+        Log lines added since `offset`, and the offset to pass next time
+        
+        offset is what the previous call returned; None starts at the
+        current end of the log. Only complete lines are returned. If the
+        log was rotated in between, the rest of the rotated file comes
+        first; if it was cleared, reading starts over from its beginning.
+        
+        The file is recognised by its first FINGERPRINT_BYTES rather than
+        its inode, which the new file often reuses after a rotation.
+        """
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                return lines[-num_lines:] if len(lines) > num_lines else lines
+            f = open(self.log_file, 'rb')
         except FileNotFoundError:
-            return []
+            return [], None
+        
+        with f:
+            head = f.read(self.FINGERPRINT_BYTES)
+            size = os.fstat(f.fileno()).st_size
+            if offset is None:
+                return [], (head, size)
+            
+            fingerprint, position = offset
+            data = b''
+            if not head.startswith(fingerprint) or size < position:
+                data = self._rotated_remainder(position)
+                position = 0
+            
+            f.seek(position)
+            appended = f.read()
+        
+        # Hold back a line still being written
+        complete = appended[:appended.rfind(b'\n') + 1]
+        return self._decode(data + complete), (head, position + len(complete))
+    
+    def _rotated_remainder(self, position):
+        """Bytes of the newest rotated file from position on"""
+        # Under the handler lock, so a rotation cannot rename it meanwhile
+        self.file_handler.acquire()
+        try:
+            rotated = self.file_handler.rotated_files()
+            if not rotated:
+                return b''
+            opener = gzip.open if rotated[-1].suffix == '.gz' else open
+            with opener(rotated[-1], 'rb') as f:
+                f.seek(position)
+                return f.read()
+        finally:
+            self.file_handler.release()
     
     def clear_logs(self):
-        """Clear log file"""
+        """Clear log file, rotated logs and the event log"""
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                f.write("")
+            # Queued records belong to the history being cleared
+            self.flush()
+            self.file_handler.clear()
+            self.event_handler.clear()
             self.log_info("Log file cleared")
         except Exception as e:
             self.log_error(f"Failed to clear logs: {e}")
@@ -0,0 +1,305 @@
+# models.py
+# Compact typed records for schedules and spray history
+
+import sys
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class ScheduleStatus(str, Enum):
+    """Schedule states; members compare equal to their stored strings"""
+    SCHEDULED = 'scheduled'
+    RESCHEDULED = 'rescheduled'
+    EXECUTING = 'executing'
+    COMPLETED = 'completed'
+    ABORTED = 'aborted'
+    MISSED = 'missed'
+    SERIES = 'series'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+
+# Statuses of schedules that are still waiting to run
+ACTIVE_STATUSES = frozenset({ScheduleStatus.SCHEDULED, ScheduleStatus.RESCHEDULED})
+
+
+def parse_status(value):
+    """Status enum member, or the interned string for unknown statuses"""
+    try:
+        return ScheduleStatus(value)
+    except ValueError:
+        return sys.intern(str(value))
+
+
+def _intern(value):
+    """Intern strings so repeated values (spray types, containers) share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def relay_for(container: str) -> int:
+    """Relay number that drives the given container"""
+    return 1 if container == "Container 1" else 2
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(date: str, time: str) -> Optional[float]:
+    """Epoch seconds for a local 'YYYY-MM-DD' date and 'HH:MM' time, or None"""
+    try:
+        return datetime(
+            int(date[0:4]), int(date[5:7]), int(date[8:10]),
+            int(time[0:2]), int(time[3:5])
+        ).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class Schedule:
+    """
+    A spray schedule with its due time parsed once
+    
+    Fields the code relies on are slots; any other keys of the stored
+    record are kept in `extra` so to_dict() returns the record unchanged.
+    Models handed out by the DataStore are shared between readers and
+    must be treated as read-only.
+    """
+    
+    __slots__ = ('id', 'date', 'time', 'timestamp', 'status', 'spray_type',
+                 'container', 'duration', 'series_id', 'series_index',
+                 'reschedule_count', 'created_at', 'updated_at',
+                 'original_date', 'original_time', 'extra')
+    
+    # Slots that mirror a key of the stored dict, in to_dict() order;
+    # None values are left out of the dict
+    FIELDS = ('id', 'date', 'time', 'spray_type', 'container', 'duration',
+              'series_id', 'series_index', 'status', 'reschedule_count',
+              'created_at', 'updated_at', 'original_date', 'original_time')
+    
+    def __init__(self, id: str, date: str, time: str, status='scheduled',
+                 spray_type: str = None, container: str = None,
+                 duration: int = None, series_id: str = None,
+                 series_index: int = None,
+                 reschedule_count: int = None, created_at: str = None,
+                 updated_at: str = None, original_date: str = None,
+                 original_time: str = None, extra: Dict = None):
+        self.id = id
+        self.date = date
+        self.time = time
+        self.timestamp = parse_timestamp(date, time)
+        self.status = parse_status(status)
+        self.spray_type = _intern(spray_type)
+        self.container = _intern(container)
+        self.duration = duration
+        self.series_id = series_id
+        self.series_index = series_index
+        self.reschedule_count = reschedule_count
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.original_date = original_date
+        self.original_time = original_time
+        self.extra = extra or None
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Schedule':
+        """Build a model from a stored schedule dict"""
+        fields = {}
+        extra = {}
+        for key, value in data.items():
+            if key in _SCHEDULE_FIELDS:
+                fields[key] = value
+            else:
+                extra[key] = value
+        return cls(fields.pop('id', None), fields.pop('date', None),
+                   fields.pop('time', None), extra=extra, **fields)
+    
+    def to_dict(self) -> Dict:
+        """The schedule as the plain dict used for storage and the UI"""
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        if isinstance(self.status, ScheduleStatus):
+            data['status'] = self.status.value
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    @property
+    def datetime(self) -> Optional[datetime]:
+        """Due time as a local datetime"""
+        if self.timestamp is None:
+            return None
+        return datetime.fromtimestamp(self.timestamp)
+    
+    @property
+    def is_active(self) -> bool:
+        """True while the schedule is still waiting to run"""
+        return self.status in ACTIVE_STATUSES
+    
+    def __eq__(self, other):
+        if not isinstance(other, Schedule):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Schedule({self.id!r}, {self.date!r}, {self.time!r}, {self.status!r})"
+
+
+_SCHEDULE_FIELDS = frozenset(Schedule.FIELDS)
+
+
+class SeriesRule:
+    """
+    Recurrence rule of a series
+    
+    A series is stored as one schedule record with status 'series': its
+    date/time are those of the first occurrence and the rule is kept under
+    the 'rule' key. Occurrence k falls k * interval days after the start,
+    moved by every tail shift (from_index, days) with from_index <= k;
+    overrides move single occurrences and exceptions drop them. Occurrence
+    records are created only shortly before they are due; `next` is the
+    first index not created yet.
+    """
+    
+    __slots__ = ('schedule', 'interval', 'count', 'until', 'shifts',
+                 'overrides', 'exceptions', 'next_index', '_start')
+    
+    def __init__(self, schedule: Schedule):
+        rule = (schedule.extra or {}).get('rule') or {}
+        self.schedule = schedule
+        self.interval = int(rule.get('interval', 1))
+        self.count = rule.get('count')
+        self.until = rule.get('until')
+        self.shifts = [tuple(shift) for shift in rule.get('shifts', [])]
+        self.overrides = {int(k): dict(v) for k, v in rule.get('overrides', {}).items()}
+        self.exceptions = set(rule.get('exceptions', []))
+        self.next_index = int(rule.get('next', 0))
+        self._start = datetime.strptime(schedule.date, '%Y-%m-%d')
+    
+    @property
+    def id(self) -> str:
+        return self.schedule.id
+    
+    def base_date(self, index: int) -> str:
+        """Date of occurrence `index` from the interval and tail shifts alone"""
+        days = index * self.interval + sum(d for i, d in self.shifts if i <= index)
+        return (self._start + timedelta(days=days)).strftime('%Y-%m-%d')
+    
+    def has_occurrence(self, index: int) -> bool:
+        """True if `index` is within the series' count and end date"""
+        if index < 0 or (self.count is not None and index >= self.count):
+            return False
+        return self.until is None or self.base_date(index) <= self.until
+    
+    def occurrence(self, index: int) -> Optional[Tuple[str, str]]:
+        """(date, time) of an occurrence, or None if it was dropped or is out of range"""
+        if index in self.exceptions or not self.has_occurrence(index):
+            return None
+        override = self.overrides.get(index)
+        if override:
+            return override['date'], override['time']
+        return self.base_date(index), self.schedule.time
+    
+    def occurrences(self, start_index: int, until_date: str) -> Iterator[Tuple[int, str, str]]:
+        """(index, date, time) from start_index while the base date is <= until_date"""
+        index = start_index
+        while self.has_occurrence(index) and self.base_date(index) <= until_date:
+            occurrence = self.occurrence(index)
+            if occurrence is not None:
+                yield (index,) + occurrence
+            index += 1
+    
+    def first_index_from(self, date: str) -> int:
+        """First index whose base date is on or after `date`"""
+        index = 0
+        while self.has_occurrence(index) and self.base_date(index) < date:
+            index += 1
+        return index
+    
+    @property
+    def exhausted(self) -> bool:
+        """True once every occurrence has been created"""
+        return not self.has_occurrence(self.next_index)
+    
+    def to_dict(self) -> Dict:
+        """The stored 'rule' value"""
+        return {
+            'interval': self.interval,
+            'count': self.count,
+            'until': self.until,
+            'shifts': [list(shift) for shift in self.shifts],
+            'overrides': {str(k): v for k, v in sorted(self.overrides.items())},
+            'exceptions': sorted(self.exceptions),
+            'next': self.next_index,
+        }
+
+
+class HistoryRecord:
+    """
+    A completed spray with its completion time parsed once
+    
+    Like Schedule, unknown keys are kept in `extra` for to_dict().
+    """
+    
+    __slots__ = ('date', 'time', 'spray_type', 'container', 'duration',
+                 'actual_duration', 'aborted', 'schedule_id', 'completed_at',
+                 'timestamp', 'extra')
+    
+    # `duration` is the requested spray time, `actual_duration` how long the
+    # relay was really on (less when paused and aborted)
+    FIELDS = ('date', 'time', 'spray_type', 'container', 'duration',
+              'actual_duration', 'aborted', 'schedule_id', 'completed_at')
+    
+    def __init__(self, date: str = None, time: str = None, spray_type: str = None,
+                 container: str = None, duration: int = None,
+                 actual_duration: float = None, aborted: bool = None,
+                 schedule_id: str = None, completed_at: str = None,
+                 extra: Dict = None):
+        self.date = date
+        self.time = time
+        self.spray_type = _intern(spray_type)
+        self.container = _intern(container)
+        self.duration = duration
+        self.actual_duration = actual_duration
+        self.aborted = aborted
+        self.schedule_id = schedule_id
+        self.completed_at = completed_at
+        self.extra = extra or None
+        
+        try:
+            self.timestamp = datetime.fromisoformat(completed_at).timestamp()
+        except (TypeError, ValueError):
+            self.timestamp = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HistoryRecord':
+        """Build a model from a stored history record"""
+        fields = {}
+        extra = {}
+        for key, value in data.items():
+            if key in _HISTORY_FIELDS:
+                fields[key] = value
+            else:
+                extra[key] = value
+        return cls(extra=extra, **fields)
+    
+    def to_dict(self) -> Dict:
+        """The record as the plain dict used for storage and the UI"""
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def __repr__(self):
+        return f"HistoryRecord({self.schedule_id!r}, {self.completed_at!r})"
+
+
+_HISTORY_FIELDS = frozenset(HistoryRecord.FIELDS)
@@ -1,19 +1,32 @@
 # reschedule_logic.py
 # Implements complex reschedule and auto-adjust logic
 
+import heapq
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from core.data_store import get_data_store
+from core.intervals import SprayIntervalIndex
 from core.logger import get_logger
+from core.models import ACTIVE_STATUSES, Schedule, SeriesRule
+from core.series import SeriesManager
+
+
+class RescheduleConflictError(Exception):
+    """A reschedule would displace a spray that has nowhere to go"""
+
 
 class RescheduleManager:
     """Manages reschedule logic with auto-adjustment"""
     
     MAX_RESCHEDULES = 3
     
-    def __init__(self):
-        self.data_store = get_data_store()
+    # How many days forward a displaced spray may be pushed to find a free slot
+    CONFLICT_SEARCH_DAYS = 30
+    
+    def __init__(self, data_store=None, clock=None):
+        self.data_store = data_store or get_data_store()
         self.logger = get_logger()
+        self.series_mgr = SeriesManager(self.data_store, clock)
     
     def reschedule(self, schedule_id: str, new_date: str, new_time: str) -> Tuple[bool, str, List[Dict]]:
         """
@@ -22,11 +35,56 @@ class RescheduleManager:
         Returns:
             (success: bool, message: str, affected_schedules: List[Dict])
         """
-        schedule = self.data_store.get_schedule_by_id(schedule_id)
+        # The read, the checks and the whole cascade run in one transaction.
+        # If another process commits first, run_transaction runs this again
+        # on fresh data, so nothing here may be computed outside it.
+        def apply_reschedule():
+            schedule = self.data_store.get_schedule_by_id(schedule_id)
+            if (not schedule or schedule['status'] not in ACTIVE_STATUSES
+                    or schedule.get('reschedule_count', 0) >= self.MAX_RESCHEDULES):
+                return schedule, []
+            
+            plan = self._plan_reschedule(schedule, new_date, new_time)
+            
+            # Update the main schedule
+            self.data_store.update_schedule(schedule_id, {
+                'date': new_date,
+                'time': new_time,
+                'reschedule_count': schedule.get('reschedule_count', 0) + 1,
+                'status': 'rescheduled',
+                'original_date': schedule.get('original_date', schedule['date']),
+                'original_time': schedule.get('original_time', schedule['time'])
+            })
+            
+            if schedule.get('series_index') is not None:
+                self.series_mgr.record_override(
+                    schedule['series_id'], schedule['series_index'], new_date, new_time
+                )
+            
+            # Auto-adjust dependent schedules
+            for series_id, from_index, days in plan['rule_shifts']:
+                self.series_mgr.shift_tail(series_id, from_index, days)
+            if plan['updates']:
+                self.data_store.update_schedules(plan['updates'])
+            
+            return schedule, plan['affected']
+        
+        try:
+            schedule, affected_schedules = self.data_store.run_transaction(apply_reschedule)
+        except RescheduleConflictError as e:
+            self.logger.log_warning(f"Reschedule of {schedule_id} refused: {e}")
+            return False, f"Cannot reschedule: {e}", []
         
         if not schedule:
             return False, "Schedule not found", []
         
+        # Sprays that ran, are running or were cancelled stay where they are
+        if schedule['status'] not in ACTIVE_STATUSES:
+            self.logger.log_warning(
+                f"Reschedule of {schedule_id} refused: schedule is {schedule['status']}"
+            )
+            return False, f"Cannot reschedule: schedule is {schedule['status']}", []
+        
         # Check reschedule count
         reschedule_count = schedule.get('reschedule_count', 0)
         
@@ -39,37 +97,80 @@ class RescheduleManager:
             )
             return False, f"Maximum {self.MAX_RESCHEDULES} reschedules reached. All schedules cancelled.", []
         
-        old_date = schedule['date']
-        old_time = schedule['time']
+        self.logger.log_schedule_rescheduled(
+            schedule['date'], new_date, reschedule_count + 1, schedule_id, schedule['container']
+        )
         
-        # Calculate date shift
-        date_shift = self._calculate_date_shift(old_date, new_date)
+        for sched in affected_schedules:
+            self.logger.log_info(
+                f"Auto-adjusted schedule {sched['id']} from {sched['old_date']} "
+                f"to {sched['new_date']} ({sched['reason']})"
+            )
+        if affected_schedules:
+            self.logger.log_auto_adjust(affected_schedules)
         
-        # Update the main schedule
-        updates = {
-            'date': new_date,
-            'time': new_time,
-            'reschedule_count': reschedule_count + 1,
-            'status': 'rescheduled',
-            'original_date': schedule.get('original_date', old_date),
-            'original_time': schedule.get('original_time', old_time)
+        return True, "Schedule rescheduled successfully", affected_schedules
+    
+    def preview(self, schedule_id: str, new_date: str, new_time: str) -> Dict:
+        """
+        What reschedule() would do, without changing anything
+        
+        Returns {'allowed', 'message', 'affected', 'conflicts', 'cancelled'}:
+        whether the reschedule would go through, the message reschedule()
+        would give, the schedules it would auto-adjust (same format as
+        reschedule()), IDs of sprays overlapping the new slot, and IDs it
+        would cancel because MAX_RESCHEDULES was reached. Works on a
+        snapshot of the schedules, so it is cheap enough to call on every
+        change in the reschedule dialog.
+        """
+        result = {
+            'allowed': False,
+            'message': "",
+            'affected': [],
+            'conflicts': [],
+            'cancelled': []
         }
         
-        self.data_store.update_schedule(schedule_id, updates)
-        self.logger.log_schedule_rescheduled(old_date, new_date, reschedule_count + 1)
+        schedule = self.data_store.get_schedule_by_id(schedule_id)
+        if not schedule:
+            result['message'] = "Schedule not found"
+            return result
+        
+        if schedule['status'] not in ACTIVE_STATUSES:
+            result['message'] = f"Cannot reschedule: schedule is {schedule['status']}"
+            return result
         
-        # Auto-adjust dependent schedules
-        affected_schedules = self._auto_adjust_schedules(
-            schedule, 
-            old_date, 
-            new_date, 
-            date_shift
-        )
+        if schedule.get('reschedule_count', 0) >= self.MAX_RESCHEDULES:
+            result['cancelled'] = self._related_schedule_ids(schedule)
+            result['message'] = (
+                f"Maximum {self.MAX_RESCHEDULES} reschedules reached. "
+                f"Rescheduling would cancel {len(result['cancelled'])} schedule(s)."
+            )
+            return result
         
-        if affected_schedules:
-            self.logger.log_auto_adjust(affected_schedules)
+        moved = Schedule.from_dict(dict(schedule, date=new_date, time=new_time))
+        result['conflicts'] = [s.id for s in self.find_conflicts(moved)]
         
-        return True, "Schedule rescheduled successfully", affected_schedules
+        try:
+            plan = self._plan_reschedule(schedule, new_date, new_time)
+        except RescheduleConflictError as e:
+            result['message'] = f"Cannot reschedule: {e}"
+            return result
+        
+        result['allowed'] = True
+        result['affected'] = plan['affected']
+        result['message'] = (
+            f"{len(plan['affected'])} other schedule(s) will be auto-adjusted"
+            if plan['affected'] else "No other schedules affected"
+        )
+        return result
+    
+    def find_conflicts(self, schedule: Schedule, exclude=()) -> List[Schedule]:
+        """Active schedules on the same relay whose spray overlaps this one's"""
+        slot = SprayIntervalIndex.slot_of(schedule)
+        if slot is None:
+            return []
+        return self.data_store.find_overlapping(*slot, exclude=set(exclude) | {schedule.id})
     
     def _calculate_date_shift(self, old_date_str: str, new_date_str: str) -> int:
         """Calculate number of days shifted"""
@@ -78,104 +179,221 @@ class RescheduleManager:
         delta = new_date - old_date
         return delta.days
     
-    def _auto_adjust_schedules(self, changed_schedule: Dict, old_date: str, 
-                               new_date: str, date_shift: int) -> List[Dict]:
+    @staticmethod
+    def _shifted(schedule: Schedule, days: int) -> Schedule:
+        """Copy of a schedule model moved by whole days"""
+        new_date = (schedule.datetime + timedelta(days=days)).strftime('%Y-%m-%d')
+        return Schedule.from_dict(dict(schedule.to_dict(), date=new_date))
+    
+    def _plan_reschedule(self, schedule: Dict, new_date: str, new_time: str) -> Dict:
         """
-        Auto-adjust all schedules that are affected by the reschedule
+        Work out what rescheduling `schedule` changes, without writing
         
         Rules:
-        1. If rescheduled date conflicts with another schedule, move that schedule forward
-        2. If part of an interval-based series, adjust all future schedules by same shift
+        1. If part of an interval-based series, adjust all future schedules by same shift
+        2. Sprays on the same relay that overlap the rescheduled spray or its
+           shifted series move forward by whole days to the first free slot;
+           a series moves from that spray on, keeping its interval
+        
+        Returns {'affected', 'updates', 'rule_shifts'}: the affected list
+        reschedule() returns, row updates for the other schedules, and
+        (series_id, from_index, days) tail shifts for SeriesManager, which
+        update their rows themselves. Raises RescheduleConflictError if a
+        conflict can't be resolved.
         """
-        affected = []
-        all_schedules = self.data_store.get_active_schedules()
+        # Snapshot of active schedules with the reschedule applied
+        schedules = {s.id: s for s in self.data_store.get_schedule_models(active_only=True)}
+        schedules[schedule['id']] = Schedule.from_dict(dict(
+            schedule, date=new_date, time=new_time, status='rescheduled'
+        ))
         
-        # Check for conflicts on the new date
-        conflicting_schedules = [
-            s for s in all_schedules 
-            if s['date'] == new_date and s['id'] != changed_schedule['id']
+        plan = {'affected': [], 'updates': {}, 'rule_shifts': []}
+        date_shift = self._calculate_date_shift(schedule['date'], new_date)
+        self._plan_series_shift(schedule, date_shift, schedules, plan)
+        
+        # The user's choice and its series keep their slots; others make way
+        pinned = {schedule['id']} | {a['id'] for a in plan['affected']}
+        self._plan_conflict_moves(pinned, schedules, plan)
+        
+        return plan
+    
+    def _plan_series_shift(self, changed_schedule: Dict, date_shift: int,
+                           schedules: Dict[str, Schedule], plan: Dict):
+        """Move the rest of the rescheduled schedule's series by date_shift days"""
+        series_id = changed_schedule.get('series_id')
+        index = changed_schedule.get('series_index')
+        if not series_id or not date_shift:
+            return
+        
+        # One rule edit moves the rest of the series, including
+        # occurrences that don't exist as schedules yet
+        by_rule = index is not None and self.series_mgr.get_rule(series_id) is not None
+        if by_rule:
+            plan['rule_shifts'].append((series_id, index + 1, date_shift))
+        
+        def later(s):
+            if by_rule:
+                return s.series_index is not None and s.series_index > index
+            # ISO dates compare correctly as strings
+            return s.date > changed_schedule['date']
+        
+        series_schedules = [
+            s for s in schedules.values()
+            if s.series_id == series_id and s.id != changed_schedule['id'] and later(s)
         ]
         
-        for conflict in conflicting_schedules:
-            # Move conflicting schedule forward by 1 day
-            conflict_date = datetime.strptime(conflict['date'], '%Y-%m-%d')
-            new_conflict_date = conflict_date + timedelta(days=1)
-            new_conflict_date_str = new_conflict_date.strftime('%Y-%m-%d')
+        for sched in sorted(series_schedules, key=lambda x: x.timestamp):
+            new_sched = self._shifted(sched, date_shift)
+            schedules[sched.id] = new_sched
             
-            self.data_store.update_schedule(conflict['id'], {
-                'date': new_conflict_date_str,
-                'status': 'rescheduled'
+            if not by_rule:
+                plan['updates'][sched.id] = {'date': new_sched.date, 'status': 'rescheduled'}
+            plan['affected'].append({
+                'id': sched.id,
+                'old_date': sched.date,
+                'new_date': new_sched.date,
+                'reason': 'Series interval preservation'
             })
-            
-            affected.append({
-                'id': conflict['id'],
-                'old_date': conflict['date'],
-                'new_date': new_conflict_date_str,
-                'reason': 'Conflict resolution'
-            })
-            
-            self.logger.log_info(
-                f"Auto-adjusted schedule {conflict['id']} from {conflict['date']} "
-                f"to {new_conflict_date_str} due to conflict"
+    
+    def _plan_conflict_moves(self, pinned: Set[str], schedules: Dict[str, Schedule],
+                             plan: Dict):
+        """
+        Move sprays overlapping the pinned schedules out of the way
+        
+        One sorted occupancy index of all active sprays is built up front.
+        Displaced sprays are handled earliest first: each is tried 1, 2, ...
+        CONFLICT_SEARCH_DAYS days later until it (with the rest of its
+        series) overlaps nothing, so a move never lands on another spray and
+        never displaces anything in turn. Schedules that used up
+        MAX_RESCHEDULES are never moved.
+        """
+        occupancy = SprayIntervalIndex(schedules.values())
+        
+        by_series = {}
+        for sched in schedules.values():
+            if sched.series_id:
+                by_series.setdefault(sched.series_id, []).append(sched)
+        
+        displaced = []
+        for sched_id in pinned:
+            slot = SprayIntervalIndex.slot_of(schedules[sched_id]) if sched_id in schedules else None
+            if slot is None:
+                continue
+            displaced.extend(
+                (schedules[other].timestamp, other)
+                for other in occupancy.overlapping(*slot, exclude=pinned)
             )
+        heapq.heapify(displaced)
         
-        # Check if part of an interval-based series
-        if 'series_id' in changed_schedule:
-            series_id = changed_schedule['series_id']
-            series_schedules = [
-                s for s in all_schedules 
-                if s.get('series_id') == series_id and s['id'] != changed_schedule['id']
-            ]
+        moved = set()
+        
+        while displaced:
+            _, sched_id = heapq.heappop(displaced)
+            if sched_id in moved:
+                continue
             
-            # Sort by date
-            series_schedules.sort(key=lambda x: x['date'])
+            conflict = schedules[sched_id]
+            if (conflict.reschedule_count or 0) >= self.MAX_RESCHEDULES:
+                raise RescheduleConflictError(
+                    f"Conflicts with {conflict.id}, which can't be rescheduled again"
+                )
             
-            # Find schedules after the changed one
-            changed_date = datetime.strptime(old_date, '%Y-%m-%d')
+            group, whole_series = self._series_tail(conflict, by_series, pinned)
+            for sched in group:
+                occupancy.remove(sched.id)
             
-            for sched in series_schedules:
-                sched_date = datetime.strptime(sched['date'], '%Y-%m-%d')
-                
-                if sched_date > changed_date:
-                    # Apply the same date shift
-                    new_sched_date = sched_date + timedelta(days=date_shift)
-                    new_sched_date_str = new_sched_date.strftime('%Y-%m-%d')
-                    
-                    self.data_store.update_schedule(sched['id'], {
-                        'date': new_sched_date_str,
-                        'status': 'rescheduled'
-                    })
-                    
-                    affected.append({
-                        'id': sched['id'],
-                        'old_date': sched['date'],
-                        'new_date': new_sched_date_str,
-                        'reason': 'Series interval preservation'
-                    })
-                    
-                    self.logger.log_info(
-                        f"Auto-adjusted schedule {sched['id']} from {sched['date']} "
-                        f"to {new_sched_date_str} to preserve series interval"
-                    )
+            days, shifted = self._first_free_shift(group, occupancy)
+            
+            # The rule also moves occurrences not created yet
+            by_rule = (whole_series and conflict.series_index is not None
+                       and self.series_mgr.get_rule(conflict.series_id) is not None)
+            if by_rule:
+                plan['rule_shifts'].append((conflict.series_id, conflict.series_index, days))
+            
+            for sched, new_sched in zip(group, shifted):
+                occupancy.update(new_sched)
+                moved.add(sched.id)
+                if not by_rule:
+                    plan['updates'][sched.id] = {'date': new_sched.date, 'status': 'rescheduled'}
+                plan['affected'].append({
+                    'id': sched.id,
+                    'old_date': sched.date,
+                    'new_date': new_sched.date,
+                    'reason': 'Conflict resolution' if sched is conflict
+                              else 'Series interval preservation'
+                })
+    
+    def _series_tail(self, schedule: Schedule, by_series: Dict[str, List[Schedule]],
+                     pinned: Set[str]) -> Tuple[List[Schedule], bool]:
+        """
+        The schedule and the later schedules of its series, which move with it
+        
+        Returns (schedules, whole_series). Just the schedule is returned,
+        with whole_series False, if it is not in a series or if moving the
+        rest of its series would move a pinned schedule.
+        """
+        if not schedule.series_id:
+            return [schedule], False
+        
+        def later(s):
+            if schedule.series_index is not None:
+                return s.series_index is not None and s.series_index > schedule.series_index
+            return s.timestamp > schedule.timestamp
         
-        return affected
+        tail = [s for s in by_series[schedule.series_id] if s.id != schedule.id and later(s)]
+        if any(s.id in pinned for s in tail):
+            return [schedule], False
+        return [schedule] + sorted(tail, key=lambda s: s.timestamp), True
+    
+    def _first_free_shift(self, group: List[Schedule],
+                          occupancy: SprayIntervalIndex) -> Tuple[int, List[Schedule]]:
+        """Smallest whole-day shift putting every schedule of group in a free slot"""
+        for days in range(1, self.CONFLICT_SEARCH_DAYS + 1):
+            shifted = [self._shifted(s, days) for s in group]
+            if not any(
+                occupancy.overlapping(*SprayIntervalIndex.slot_of(s)) for s in shifted
+            ):
+                return days, shifted
+        
+        raise RescheduleConflictError(
+            f"No free slot for {group[0].id} within {self.CONFLICT_SEARCH_DAYS} days"
+        )
+    
+    def _related_schedule_ids(self, schedule: Dict) -> List[str]:
+        """Active schedules of the schedule's series, or just the schedule"""
+        if 'series_id' not in schedule:
+            return [schedule['id']]
+        return [
+            s.id for s in self.data_store.get_schedule_models(active_only=True)
+            if s.series_id == schedule['series_id']
+        ]
     
     def _cancel_all_related_schedules(self, schedule: Dict):
         """Cancel all schedules in the same series"""
         if 'series_id' in schedule:
             series_id = schedule['series_id']
-            all_schedules = self.data_store.get_active_schedules()
             
-            for sched in all_schedules:
-                if sched.get('series_id') == series_id:
-                    self.data_store.update_schedule(sched['id'], {
+            # Ending the rule and cancelling its occurrences commit together
+            def cancel():
+                self.series_mgr.end_series(series_id, 'Max reschedules exceeded')
+                
+                related = self._related_schedule_ids(schedule)
+                self.data_store.update_schedules({
+                    sched_id: {
                         'status': 'cancelled',
                         'cancel_reason': 'Max reschedules exceeded'
-                    })
-                    self.logger.log_schedule_cancelled(
-                        sched['id'], 
-                        "Max reschedules exceeded in series"
-                    )
+                    }
+                    for sched_id in related
+                })
+                return related
+            
+            series_ids = self.data_store.run_transaction(cancel)
+            
+            for sched_id in series_ids:
+                self.logger.log_schedule_cancelled(
+                    sched_id, 
+                    "Max reschedules exceeded in series"
+                )
         else:
             # Just cancel this single schedule
             self.data_store.update_schedule(schedule['id'], {
@@ -184,7 +402,8 @@ class RescheduleManager:
             })
             self.logger.log_schedule_cancelled(
                 schedule['id'], 
-                "Max reschedules exceeded"
+                "Max reschedules exceeded",
+                schedule['container']
             )
     
     def cancel_schedule(self, schedule_id: str, reason: str = "User cancelled") -> bool:
@@ -199,17 +418,184 @@ class RescheduleManager:
             'cancel_reason': reason
         })
         
-        self.logger.log_schedule_cancelled(schedule_id, reason)
+        self.logger.log_schedule_cancelled(schedule_id, reason, schedule['container'])
         return True
     
+    def cancel_series(self, series_id: str, reason: str = "User cancelled series") -> int:
+        """Cancel a series: its pending schedules and the occurrences still to come"""
+        return len(self.bulk_cancel(series_id=series_id, reason=reason)['cancelled'])
+    
     def cancel_all_schedules(self):
         """Cancel all active schedules"""
-        all_schedules = self.data_store.get_active_schedules()
+        summary = self.bulk_cancel(reason="User cancelled all")
+        self.logger.log_info(f"Cancelled all {len(summary['cancelled'])} active schedules")
+    
+    # Bulk operations
+    #
+    # Select active schedules by inclusive date range ('YYYY-MM-DD'),
+    # container, spray type and series; filters left as None match
+    # everything. Each call reads the store once and commits once.
+    # Occurrences of series rules that fall in the range but are not
+    # schedules yet are changed through the rule.
+    @staticmethod
+    def _matches(schedule: Schedule, start_date=None, end_date=None, container=None,
+                 spray_type=None, series_id=None) -> bool:
+        """True if a schedule passes every given filter"""
+        return ((start_date is None or schedule.date >= start_date)
+                and (end_date is None or schedule.date <= end_date)
+                and (container is None or schedule.container == container)
+                and (spray_type is None or schedule.spray_type == spray_type)
+                and (series_id is None or schedule.series_id == series_id))
+    
+    def _matching_rules(self, container=None, spray_type=None, series_id=None) -> List[SeriesRule]:
+        """Live series rules passing the non-date filters"""
+        return [
+            rule for rule in self.series_mgr.get_live_rules()
+            if self._matches(rule.schedule, container=container,
+                             spray_type=spray_type, series_id=series_id)
+        ]
+    
+    def bulk_shift(self, days: int, start_date: str = None, end_date: str = None,
+                   container: str = None, spray_type: str = None,
+                   series_id: str = None) -> Dict:
+        """
+        Move every matching schedule by `days` days in one commit
+        
+        Without end_date, matching series move as a whole from start_date
+        on (one rule edit each); with it, only their occurrences in the
+        range move. Sprays the moved ones would overlap make way as in
+        reschedule(). Moves don't count towards MAX_RESCHEDULES.
         
-        for sched in all_schedules:
-            self.cancel_schedule(sched['id'], "User cancelled all")
+        Returns {'success', 'message', 'shifted', 'adjusted', 'series'}:
+        moved schedules and those auto-adjusted around them (as
+        {'id', 'old_date', 'new_date', ...}), and IDs of series whose
+        rule changed.
+        """
+        filters = dict(start_date=start_date, end_date=end_date, container=container,
+                       spray_type=spray_type, series_id=series_id)
+        
+        def shift():
+            schedules = {s.id: s for s in self.data_store.get_schedule_models(active_only=True)}
+            plan = {'affected': [], 'updates': {}, 'rule_shifts': []}
+            overrides = {}
+            
+            for rule in self._matching_rules(container, spray_type, series_id):
+                if end_date is None:
+                    plan['rule_shifts'].append(
+                        (rule.id, rule.first_index_from(start_date) if start_date else 0, days)
+                    )
+                else:
+                    overrides[rule.id] = {
+                        index: (self._shift_date(date, days), time)
+                        for index, date, time in self.series_mgr.pending_occurrences(
+                            rule, start_date, end_date
+                        )
+                    }
+            by_rule = {series for series, _, _ in plan['rule_shifts']}
+            
+            shifted = []
+            for sched in sorted(schedules.values(), key=lambda s: s.timestamp or 0):
+                if sched.timestamp is None or not self._matches(sched, **filters):
+                    continue
+                
+                new_sched = self._shifted(sched, days)
+                schedules[sched.id] = new_sched
+                shifted.append({'id': sched.id, 'old_date': sched.date, 'new_date': new_sched.date})
+                
+                if sched.series_id not in by_rule:
+                    plan['updates'][sched.id] = {
+                        'date': new_sched.date,
+                        'status': 'rescheduled',
+                        'original_date': sched.original_date or sched.date,
+                        'original_time': sched.original_time or sched.time
+                    }
+            
+            self._plan_conflict_moves({s['id'] for s in shifted}, schedules, plan)
+            
+            for series, from_index, shift_days in plan['rule_shifts']:
+                self.series_mgr.shift_tail(series, from_index, shift_days, record_original=True)
+            for series, series_overrides in overrides.items():
+                self.series_mgr.set_overrides(series, series_overrides)
+            if plan['updates']:
+                self.data_store.update_schedules(plan['updates'])
+            
+            changed_series = sorted(
+                {series for series, _, _ in plan['rule_shifts']}
+                | {series for series, moved in overrides.items() if moved}
+            )
+            return shifted, plan['affected'], changed_series
         
-        self.logger.log_info(f"Cancelled all {len(all_schedules)} active schedules")
+        try:
+            shifted, adjusted, changed_series = self.data_store.run_transaction(shift)
+        except RescheduleConflictError as e:
+            self.logger.log_warning(f"Bulk shift by {days} days refused: {e}")
+            return {'success': False, 'message': f"Cannot shift: {e}",
+                    'shifted': [], 'adjusted': [], 'series': []}
+        
+        message = f"Shifted {len(shifted)} schedule(s) by {days} day(s)"
+        if adjusted:
+            message += f", auto-adjusted {len(adjusted)}"
+        self.logger.log_info(message)
+        if adjusted:
+            self.logger.log_auto_adjust(adjusted)
+        
+        return {'success': True, 'message': message, 'shifted': shifted,
+                'adjusted': adjusted, 'series': changed_series}
+    
+    def bulk_cancel(self, start_date: str = None, end_date: str = None,
+                    container: str = None, spray_type: str = None,
+                    series_id: str = None, reason: str = "User cancelled") -> Dict:
+        """
+        Cancel every matching schedule in one commit
+        
+        Without end_date, matching series are ended from start_date on;
+        with it, only their occurrences in the range are dropped.
+        
+        Returns {'cancelled', 'series', 'skipped'}: IDs of cancelled
+        schedules, IDs of series ended or cut short, and how many
+        occurrences not created yet were dropped.
+        """
+        filters = dict(start_date=start_date, end_date=end_date, container=container,
+                       spray_type=spray_type, series_id=series_id)
+        
+        def cancel():
+            cancelled = [
+                s.id for s in self.data_store.get_schedule_models(active_only=True)
+                if self._matches(s, **filters)
+            ]
+            
+            ended = []
+            skipped = 0
+            for rule in self._matching_rules(container, spray_type, series_id):
+                if end_date is None:
+                    # Series must not bring new occurrences back
+                    if self.series_mgr.end_series(rule.id, reason, from_date=start_date):
+                        ended.append(rule.id)
+                else:
+                    skipped += self.series_mgr.skip_occurrences(rule.id, [
+                        index for index, _, _ in self.series_mgr.pending_occurrences(
+                            rule, start_date, end_date
+                        )
+                    ])
+            
+            self.data_store.update_schedules({
+                sched_id: {'status': 'cancelled', 'cancel_reason': reason}
+                for sched_id in cancelled
+            })
+            return cancelled, ended, skipped
+        
+        cancelled, ended, skipped = self.data_store.run_transaction(cancel)
+        
+        for sched_id in cancelled:
+            self.logger.log_schedule_cancelled(sched_id, reason)
+        for series in ended:
+            self.logger.log_info(f"Ended series {series} ({reason})")
+        
+        return {'cancelled': cancelled, 'series': ended, 'skipped': skipped}
+    
+    @staticmethod
+    def _shift_date(date: str, days: int) -> str:
+        return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
 
 
 # Global reschedule manager instance
@@ -1,26 +1,78 @@
 # scheduler.py
 # Main scheduler logic with background execution
 
+import heapq
+import queue
 import threading
-import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable
+from datetime import timedelta
+from typing import List, Dict, Optional, Callable, Tuple
+from core.clock import get_clock
 from core.data_store import get_data_store
 from core.logger import get_logger
-from core.reschedule_logic import get_reschedule_manager
+from core.models import Schedule, relay_for
+from core.reschedule_logic import RescheduleManager, get_reschedule_manager
+from core.spray_engine import SprayEngine, SprayRun
 
 class Scheduler:
     """Main scheduler for spray operations"""
     
-    def __init__(self, hardware_interface=None):
-        self.data_store = get_data_store()
+    # Schedules are started while within this many seconds of their due time
+    DUE_WINDOW = 60
+    
+    # Longest single sleep, so wall-clock changes (e.g. NTP sync at boot)
+    # are noticed even with nothing due
+    MAX_WAIT = 60
+    
+    # What to do with a schedule found more than DUE_WINDOW past its time
+    # (Pi was off, clock was adjusted across the slot, ...):
+    #   'run_late'    - run it if at most LATE_GRACE seconds late, else mark missed
+    #   'mark_missed' - mark it missed
+    #   'reschedule'  - move it to the same time on the next day via RescheduleManager
+    MISSED_POLICY = 'run_late'
+    LATE_GRACE = 30 * 60
+    
+    def __init__(self, hardware_interface=None, data_store=None, clock=None):
         self.logger = get_logger()
-        self.reschedule_mgr = get_reschedule_manager()
         self.hardware = hardware_interface
+        self.clock = clock or get_clock()
+        
+        # A private store (e.g. for simulation) gets its own reschedule manager
+        if data_store is None:
+            self.data_store = get_data_store()
+            self.reschedule_mgr = get_reschedule_manager()
+        else:
+            self.data_store = data_store
+            self.reschedule_mgr = RescheduleManager(data_store, self.clock)
+        
+        # Recurring series create their upcoming occurrences once a day
+        self.series_mgr = self.reschedule_mgr.series_mgr
+        self._series_day = None
+        
+        # Times sprays and handles pause/resume/abort from the UI and buttons
+        self.spray_engine = SprayEngine(hardware_interface, self.clock)
         
         self.running = False
         self.scheduler_thread = None
         
+        # Min-heap of (due timestamp, schedule id); entries for schedules that
+        # were since moved, cancelled or completed are skipped when popped
+        self._queue = []
+        self._queue_planned = 0
+        self._wakeup = threading.Condition()
+        self._subscription = None
+        
+        # One worker thread and job queue per relay, so a relay only ever runs
+        # one spray at a time while different relays spray in parallel
+        self._relay_workers = {}
+        self._relay_queues = {}
+        self._dispatched = set()
+        self._dispatch_lock = threading.Lock()
+        
+        # Buzzer and status LED are shared by all relays
+        self._hardware_lock = threading.Lock()
+        self._buzzer_lock = threading.Lock()
+        self._active_sprays = 0
+        
         # Callbacks for UI updates
         self.on_schedule_due_callback = None
         self.on_schedule_completed_callback = None
@@ -32,6 +84,9 @@ class Scheduler:
         """Start scheduler background thread"""
         if not self.running:
             self.running = True
+            self._subscription = self.data_store.subscribe(
+                self._on_schedules_changed, kinds={'schedule'}
+            )
             self.scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
             self.scheduler_thread.start()
             self.logger.log_info("Scheduler started")
@@ -39,47 +94,295 @@ class Scheduler:
     def stop(self):
         """Stop scheduler"""
         if self.running:
-            self.running = False
+            with self._wakeup:
+                self.running = False
+                self._wakeup.notify_all()
+            
+            if self._subscription is not None:
+                self.data_store.unsubscribe(self._subscription)
+                self._subscription = None
+            
             if self.scheduler_thread:
                 self.scheduler_thread.join(timeout=2)
+            
+            # Sprays in progress are cut short so the workers can exit
+            self.spray_engine.abort()
+            self._stop_relay_workers()
             self.logger.log_info("Scheduler stopped")
     
     def _scheduler_loop(self):
-        """Main scheduler loop - runs in background"""
+        """Main scheduler loop - sleeps until the next schedule is due"""
+        # Schedules that fell due while the scheduler was not running are
+        # already overdue in the fresh queue, so the first pass catches them up
+        self._extend_series()
+        self._plan_all()
+        
         while self.running:
             try:
-                self._check_due_schedules()
-                time.sleep(10)  # Check every 10 seconds
+                self._extend_series()
+                due, overdue = self._wait_for_due()
+                
+                for schedule in overdue:
+                    if not self.running:
+                        break
+                    self._catch_up(schedule)
+                
+                for schedule in due:
+                    if not self.running:
+                        break
+                    # Schedule is due!
+                    self._dispatch(schedule)
             except Exception as e:
                 self.logger.log_error(f"Scheduler error: {e}")
     
-    def _check_due_schedules(self):
-        """Check for schedules that are due"""
-        now = datetime.now()
-        current_date = now.strftime('%Y-%m-%d')
-        current_time = now.strftime('%H:%M')
-        
-        active_schedules = self.data_store.get_active_schedules()
-        
-        for schedule in active_schedules:
-            if schedule['date'] == current_date:
-                # Check if time matches (within 1 minute window)
-                schedule_time = datetime.strptime(schedule['time'], '%H:%M')
-                current_datetime = datetime.strptime(current_time, '%H:%M')
+    def _plan_all(self):
+        """Rebuild the due-time queue from all active schedules"""
+        with self._wakeup:
+            self._queue = [
+                (s.timestamp, s.id)
+                for s in self.data_store.get_schedule_models(active_only=True)
+                if s.timestamp is not None
+            ]
+            heapq.heapify(self._queue)
+            self._queue_planned = len(self._queue)
+            self._wakeup.notify_all()
+    
+    def _on_schedules_changed(self, changes: List[Dict]):
+        """Data store callback: queue new due times and wake the loop to re-plan"""
+        with self._wakeup:
+            for change in changes:
+                if change['action'] == 'removed':
+                    continue
+                for schedule_id in change['ids']:
+                    schedule = self.data_store.get_schedule_model(schedule_id)
+                    if schedule and schedule.is_active and schedule.timestamp is not None:
+                        heapq.heappush(self._queue, (schedule.timestamp, schedule.id))
+            
+            self._wakeup.notify_all()
+        
+        # Drop skipped entries once they outnumber the live ones
+        if len(self._queue) > 2 * self._queue_planned + 100:
+            self._plan_all()
+    
+    def _wait_for_due(self) -> Tuple[List[Schedule], List[Schedule]]:
+        """
+        Sleep until the earliest queued schedule is due
+        
+        Returns (due, overdue): schedules within DUE_WINDOW of their time,
+        and schedules already further past it. Only expired queue entries
+        are looked at, so no full reload is needed to find overdue ones.
+        """
+        with self._wakeup:
+            while self.running:
+                now = self.clock.time()
+                due, overdue = self._collect_due(now)
                 
-                time_diff = abs((schedule_time - current_datetime).total_seconds())
+                if due or overdue:
+                    return due, overdue
                 
-                if time_diff < 60 and schedule.get('status') != 'executing':
-                    # Schedule is due!
-                    self._execute_schedule(schedule)
+                if self.clock.now().date() != self._series_day:
+                    # New day: let the loop extend the series first
+                    return [], []
+                
+                timeout = self.MAX_WAIT
+                if self._queue:
+                    timeout = min(timeout, self._queue[0][0] - now)
+                self.clock.wait(self._wakeup, timeout)
+        
+        return [], []
+    
+    def _extend_series(self):
+        """Create series occurrences that came within the horizon (once a day)"""
+        today = self.clock.now().date()
+        if today == self._series_day:
+            return
+        self._series_day = today
+        
+        try:
+            created = self.series_mgr.materialize()
+        except Exception as e:
+            self.logger.log_error(f"Failed to extend recurring series: {e}")
+            return
+        
+        for schedule in created:
+            self.logger.log_schedule_created(schedule)
+    
+    def _collect_due(self, now: float) -> Tuple[List[Schedule], List[Schedule]]:
+        """Pop queue entries due by `now` into (due, overdue) lists"""
+        due = {}
+        overdue = {}
+        
+        with self._wakeup:
+            while self._queue and self._queue[0][0] <= now:
+                timestamp, schedule_id = heapq.heappop(self._queue)
+                schedule = self.data_store.get_schedule_model(schedule_id)
+                
+                if (schedule is None or not schedule.is_active
+                        or schedule.timestamp != timestamp):
+                    # Cancelled, completed or moved since it was queued
+                    continue
+                
+                if schedule_id in self._dispatched:
+                    # Already waiting for or running on its relay
+                    continue
+                
+                if now - timestamp < self.DUE_WINDOW:
+                    due[schedule_id] = schedule
+                else:
+                    overdue[schedule_id] = schedule
+        
+        return list(due.values()), list(overdue.values())
+    
+    def next_due_time(self) -> Optional[float]:
+        """Timestamp of the earliest queued entry (possibly a stale one)"""
+        with self._wakeup:
+            return self._queue[0][0] if self._queue else None
+    
+    def _catch_up(self, schedule: Schedule):
+        """Apply MISSED_POLICY to a schedule found past its due window"""
+        late = self.clock.time() - schedule.timestamp
+        late_text = f"{late / 60:.0f} min late" if late < 86400 else f"{late / 86400:.1f} days late"
+        
+        if self.MISSED_POLICY == 'run_late' and late <= self.LATE_GRACE:
+            self.logger.log_warning(
+                f"Schedule {schedule.id} ({schedule.date} {schedule.time}) "
+                f"running {late_text}"
+            )
+            self._dispatch(schedule)
+            return
+        
+        if self.MISSED_POLICY == 'reschedule':
+            # Same time of day, on the first day that slot is still ahead
+            new_time = schedule.datetime
+            while new_time.timestamp() <= self.clock.time():
+                new_time += timedelta(days=1)
+            new_date = new_time.strftime('%Y-%m-%d')
+            
+            success, message, _ = self.reschedule_mgr.reschedule(
+                schedule.id, new_date, schedule.time
+            )
+            if success:
+                self.logger.log_warning(
+                    f"Schedule {schedule.id} missed ({late_text}), "
+                    f"moved to {new_date} {schedule.time}"
+                )
+                return
+            
+            self.logger.log_warning(
+                f"Schedule {schedule.id} could not be rescheduled: {message}"
+            )
+            current = self.data_store.get_schedule_model(schedule.id)
+            if current is None or not current.is_active:
+                # e.g. its series was cancelled for too many reschedules
+                return
+        
+        self.data_store.update_schedule(schedule.id, {'status': 'missed'})
+        self.logger.log_warning(
+            f"Schedule {schedule.id} ({schedule.date} {schedule.time}) "
+            f"missed, {late_text}"
+        )
+    
+    @staticmethod
+    def _relay_for(container: str) -> int:
+        """Relay number that drives the given container"""
+        return relay_for(container)
+    
+    def _dispatch(self, schedule: Schedule):
+        """Hand a due schedule to its relay's worker without waiting for it"""
+        relay_num = self._relay_for(schedule.container)
+        
+        with self._dispatch_lock:
+            if not self.running or schedule.id in self._dispatched:
+                return
+            self._dispatched.add(schedule.id)
+            
+            jobs = self._relay_queues.get(relay_num)
+            if jobs is None:
+                jobs = self._relay_queues[relay_num] = queue.Queue()
+                worker = threading.Thread(
+                    target=self._relay_worker, args=(relay_num, jobs),
+                    name=f"SprayRelay{relay_num}", daemon=True
+                )
+                self._relay_workers[relay_num] = worker
+                worker.start()
+        
+        jobs.put(schedule.to_dict())
+    
+    def _relay_worker(self, relay_num: int, jobs: queue.Queue):
+        """Run the sprays queued for one relay, one after another"""
+        while True:
+            schedule = jobs.get()
+            if schedule is None:
+                break
+            
+            try:
+                # Skip jobs cancelled or moved while queued behind another spray
+                if self.running:
+                    claimed = self._claim(schedule['id'], Schedule.from_dict(schedule).timestamp)
+                    if claimed is not None:
+                        self._execute_schedule(claimed)
+            except Exception as e:
+                self.logger.log_error(f"Relay {relay_num} worker error: {e}")
+            finally:
+                with self._dispatch_lock:
+                    self._dispatched.discard(schedule['id'])
+    
+    def _stop_relay_workers(self):
+        """Drop queued sprays and let each relay worker finish its current one"""
+        with self._dispatch_lock:
+            workers = list(self._relay_workers.values())
+            for jobs in self._relay_queues.values():
+                try:
+                    while True:
+                        jobs.get_nowait()
+                except queue.Empty:
+                    pass
+                jobs.put(None)
+            self._relay_workers = {}
+            self._relay_queues = {}
+            self._dispatched = set()
+        
+        for worker in workers:
+            worker.join(timeout=2)
+    
+    def _spray_started(self):
+        """Beep and light the status LED for a starting spray"""
+        with self._hardware_lock:
+            self._active_sprays += 1
+            self.hardware.set_led('status', 1)
+        
+        # buzzer_beep blocks for its duration, so keep it outside the LED lock
+        # and let only one relay beep at a time
+        with self._buzzer_lock:
+            self.hardware.buzzer_beep(0.5)
+    
+    def _spray_finished(self):
+        """Turn the status LED off once no relay is spraying"""
+        with self._hardware_lock:
+            self._active_sprays = max(0, self._active_sprays - 1)
+            if self._active_sprays == 0:
+                self.hardware.set_led('status', 0)
+    
+    def _claim(self, schedule_id: str, due_timestamp: float) -> Optional[Dict]:
+        """
+        Mark a due schedule executing, if it is still active and due at
+        due_timestamp; returns it, or None if it was cancelled or moved
+        
+        The check and the status change are one transaction, so a
+        reschedule or cancel committed meanwhile is never overwritten.
+        """
+        def claim():
+            current = self.data_store.get_schedule_model(schedule_id)
+            if current is None or not current.is_active or current.timestamp != due_timestamp:
+                return None
+            return self.data_store.update_schedule(schedule_id, {'status': 'executing'})
+        
+        return self.data_store.run_transaction(claim)
     
     def _execute_schedule(self, schedule: Dict):
-        """Execute a spray schedule"""
+        """Execute a spray schedule already marked executing (see _claim)"""
         self.logger.log_spray_executed(schedule)
         
-        # Update status to executing
-        self.data_store.update_schedule(schedule['id'], {'status': 'executing'})
-        
         if self.on_schedule_due_callback:
             self.on_schedule_due_callback(schedule)
         
@@ -93,37 +396,49 @@ class Scheduler:
             )
             
             # Determine which relay to activate based on container
-            relay_num = 1 if container == "Container 1" else 2
+            relay_num = self._relay_for(container)
             
-            # Turn on relay
-            if self.hardware:
-                self.hardware.relay_on(relay_num)
-                self.hardware.buzzer_beep(0.5)
-                self.hardware.set_led('status', 1)
-            
-            # Spray for configured duration (e.g., 30 seconds)
+            # Spray for configured duration (e.g., 30 seconds); this runs on
+            # the relay's worker thread, not the scheduler loop
             spray_duration = schedule.get('duration', 30)
-            time.sleep(spray_duration)
+            try:
+                if self.hardware:
+                    self._spray_started()
+                spray = self.spray_engine.run(schedule['id'], relay_num, spray_duration)
+            finally:
+                if self.hardware:
+                    self._spray_finished()
             
-            # Turn off relay
-            if self.hardware:
-                self.hardware.relay_off(relay_num)
-                self.hardware.set_led('status', 0)
+            aborted = spray.state == SprayRun.ABORTED
+            actual_duration = round(spray.actual, 1)
             
-            # Mark as completed
-            self.data_store.update_schedule(schedule['id'], {'status': 'completed'})
+            # Mark as completed (or aborted) and add to history in one commit
+            def record_completion():
+                self.data_store.update_schedule(schedule['id'], {
+                    'status': 'aborted' if aborted else 'completed'
+                })
+                
+                record = {
+                    'date': schedule['date'],
+                    'time': schedule['time'],
+                    'spray_type': spray_type,
+                    'container': container,
+                    'duration': spray_duration,
+                    'actual_duration': actual_duration,
+                    'schedule_id': schedule['id']
+                }
+                if aborted:
+                    record['aborted'] = True
+                self.data_store.add_to_history(record)
             
-            # Add to history
-            self.data_store.add_to_history({
-                'date': schedule['date'],
-                'time': schedule['time'],
-                'spray_type': spray_type,
-                'container': container,
-                'duration': spray_duration,
-                'schedule_id': schedule['id']
-            })
+            self.data_store.run_transaction(record_completion)
             
-            self.logger.log_spray_completed(schedule['id'], spray_duration)
+            if aborted:
+                self.logger.log_spray_aborted(
+                    schedule['id'], actual_duration, spray_duration, container
+                )
+            else:
+                self.logger.log_spray_completed(schedule['id'], actual_duration, container)
             
             if self.on_schedule_completed_callback:
                 self.on_schedule_completed_callback(schedule)
@@ -137,17 +452,30 @@ class Scheduler:
     
     def create_schedule(self, date: str, time: str, spray_type: str, 
                        container: str, duration: int = 30) -> Dict:
-        """Create a single schedule"""
-        schedule = {
-            'date': date,
-            'time': time,
-            'spray_type': spray_type,
-            'container': container,
-            'duration': duration,
-            'status': 'scheduled'
-        }
-        
-        schedule = self.data_store.add_schedule(schedule)
+        """
+        Create a single schedule
+        
+        Raises ValueError if the container's relay already sprays in that slot.
+        """
+        # The record is built afresh on every attempt of the transaction
+        def add():
+            schedule = {
+                'date': date,
+                'time': time,
+                'spray_type': spray_type,
+                'container': container,
+                'duration': duration,
+                'status': 'scheduled'
+            }
+            conflicts = self.reschedule_mgr.find_conflicts(Schedule.from_dict(schedule))
+            if conflicts:
+                raise ValueError(
+                    f"{container} already has a spray at {conflicts[0].time} "
+                    f"on {conflicts[0].date} ({conflicts[0].id})"
+                )
+            return self.data_store.add_schedule(schedule)
+        
+        schedule = self.data_store.run_transaction(add)
         self.logger.log_schedule_created(schedule)
         
         return schedule
@@ -155,83 +483,63 @@ class Scheduler:
     def create_recurring_schedules(self, start_date: str, interval_days: int, 
                                   count: int, time: str, spray_type: str, 
                                   container: str, duration: int = 30) -> List[Dict]:
-        """Create multiple schedules with fixed interval"""
-        schedules = []
-        series_id = f"SERIES_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        """
+        Create a series with fixed interval
         
-        current_date = datetime.strptime(start_date, '%Y-%m-%d')
+        The series is stored as one rule; only occurrences within
+        SeriesManager.HORIZON_DAYS are created as schedules now (and
+        returned), the rest as the horizon reaches them.
         
-        for i in range(count):
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            schedule = {
-                'date': date_str,
-                'time': time,
-                'spray_type': spray_type,
-                'container': container,
-                'duration': duration,
-                'status': 'scheduled',
-                'series_id': series_id,
-                'series_interval': interval_days
-            }
-            
-            schedule = self.data_store.add_schedule(schedule)
+        Raises ValueError if an occurrence would overlap a spray already on
+        the container's relay.
+        """
+        result = self.series_mgr.create_series(
+            start_date, interval_days, count, time, spray_type, container, duration
+        )
+        schedules = result['schedules']
+        
+        for schedule in schedules:
             self.logger.log_schedule_created(schedule)
-            schedules.append(schedule)
-            
-            # Move to next date
-            current_date += timedelta(days=interval_days)
         
         self.logger.log_info(
-            f"Created recurring series: {count} schedules with {interval_days}-day interval"
+            f"Created recurring series {result['series']['id']}: {count} schedules "
+            f"with {interval_days}-day interval ({len(schedules)} scheduled now)"
         )
         
         return schedules
     
     def get_next_schedule(self) -> Optional[Dict]:
         """Get the next upcoming schedule"""
-        active_schedules = self.data_store.get_active_schedules()
-        
-        if not active_schedules:
-            return None
-        
-        # Sort by date and time
-        sorted_schedules = sorted(
-            active_schedules,
-            key=lambda x: f"{x['date']} {x['time']}"
-        )
-        
-        now = datetime.now()
-        
-        for schedule in sorted_schedules:
-            schedule_dt = datetime.strptime(
-                f"{schedule['date']} {schedule['time']}",
-                '%Y-%m-%d %H:%M'
-            )
-            
-            if schedule_dt > now:
-                return schedule
-        
-        return None
+        schedule = self._next_schedule_model()
+        return schedule.to_dict() if schedule else None
+    
+    def _next_schedule_model(self) -> Optional[Schedule]:
+        """Earliest active schedule that is still in the future"""
+        now = self.clock.time()
+        upcoming = [
+            s for s in self.data_store.get_schedule_models(active_only=True)
+            if s.timestamp is not None and s.timestamp > now
+        ]
+        return min(upcoming, key=lambda s: s.timestamp, default=None)
     
-    def get_time_until_next_spray(self) -> Optional[str]:
-        """Get countdown to next spray"""
-        next_schedule = self.get_next_schedule()
+    def get_time_until_next_spray(self, next_schedule: Optional[Dict] = None) -> Optional[str]:
+        """Get countdown to next spray (pass next_schedule if already known)"""
+        if next_schedule is None:
+            schedule = self._next_schedule_model()
+        else:
+            schedule = (self.data_store.get_schedule_model(next_schedule['id'])
+                        or Schedule.from_dict(next_schedule))
         
-        if not next_schedule:
+        if not schedule or schedule.timestamp is None:
             return None
         
-        schedule_dt = datetime.strptime(
-            f"{next_schedule['date']} {next_schedule['time']}",
-            '%Y-%m-%d %H:%M'
-        )
-        
-        now = datetime.now()
-        delta = schedule_dt - now
+        seconds = schedule.timestamp - self.clock.time()
         
-        if delta.total_seconds() < 0:
+        if seconds < 0:
             return "Overdue"
         
+        delta = timedelta(seconds=seconds)
+        
         days = delta.days
         hours, remainder = divmod(delta.seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
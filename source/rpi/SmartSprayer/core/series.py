@@ -0,0 +1,334 @@
+# series.py
+# Recurring series stored as one rule, with occurrences created on demand
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.clock import get_clock
+from core.data_store import get_data_store
+from core.intervals import SprayIntervalIndex
+from core.logger import get_logger
+from core.models import Schedule, SeriesRule, ScheduleStatus
+
+
+class SeriesManager:
+    """Creates series rules and turns upcoming occurrences into schedules"""
+    
+    # Occurrences are created as schedules once they are this many days away
+    HORIZON_DAYS = 14
+    
+    def __init__(self, data_store=None, clock=None):
+        self.data_store = data_store or get_data_store()
+        self.clock = clock or get_clock()
+        self.logger = get_logger()
+    
+    def get_rule(self, series_id: str) -> Optional[SeriesRule]:
+        """Rule of a series, or None for series stored the old way (one row per occurrence)"""
+        schedule = self.data_store.get_schedule_model(series_id)
+        if schedule is None or not (schedule.extra and 'rule' in schedule.extra):
+            return None
+        return SeriesRule(schedule)
+    
+    def get_live_rules(self) -> List[SeriesRule]:
+        """Rules that still have occurrences to create"""
+        return [
+            SeriesRule(s) for s in self.data_store.get_schedule_models()
+            if s.status == ScheduleStatus.SERIES
+        ]
+    
+    def _horizon(self) -> str:
+        """Last date whose occurrences should exist as schedules"""
+        return (self.clock.now() + timedelta(days=self.HORIZON_DAYS)).strftime('%Y-%m-%d')
+    
+    def create_series(self, start_date: str, interval_days: int, count: Optional[int],
+                      time: str, spray_type: str, container: str,
+                      duration: int = 30, until: Optional[str] = None) -> Dict:
+        """
+        Store a new series rule and create its occurrences within the horizon
+        
+        Returns {'series': rule record, 'schedules': occurrences created now}.
+        Raises ValueError if an occurrence would overlap a spray already on
+        the container's relay.
+        """
+        def create():
+            series_id = f"SERIES_{self.clock.now().strftime('%Y%m%d%H%M%S')}"
+            suffix = 1
+            while self.data_store.get_schedule_model(series_id) is not None:
+                suffix += 1
+                series_id = f"SERIES_{self.clock.now().strftime('%Y%m%d%H%M%S')}_{suffix}"
+            
+            record = {
+                'id': series_id,
+                'date': start_date,
+                'time': time,
+                'spray_type': spray_type,
+                'container': container,
+                'duration': duration,
+                'series_id': series_id,
+                'status': ScheduleStatus.SERIES.value,
+                'rule': {
+                    'interval': interval_days,
+                    'count': count,
+                    'until': until,
+                    'shifts': [],
+                    'overrides': {},
+                    'exceptions': [],
+                    'next': 0,
+                },
+            }
+            record = self.data_store.add_schedule(record)
+            rule = self.get_rule(series_id)
+            
+            # Occurrences after the last stored spray cannot overlap one
+            latest = max(
+                (s.date for s in self.data_store.get_schedule_models(active_only=True)),
+                default=start_date
+            )
+            for index, date, time_str in rule.occurrences(0, max(latest, self._horizon())):
+                occurrence = Schedule.from_dict(self._occurrence(rule, index, date, time_str))
+                conflict = self._find_conflict(occurrence)
+                if conflict:
+                    raise ValueError(
+                        f"{container} already has a spray at {conflict.time} "
+                        f"on {conflict.date} ({conflict.id})"
+                    )
+            
+            return {
+                'series': record,
+                'schedules': self._materialize([rule], self._horizon()),
+            }
+        
+        return self.data_store.run_transaction(create)
+    
+    def materialize(self, until: Optional[str] = None) -> List[Dict]:
+        """Create schedules for all series occurrences up to `until` (default: the horizon)"""
+        if not self.get_live_rules():
+            return []
+        
+        until = until or self._horizon()
+        return self.data_store.run_transaction(
+            lambda: self._materialize(self.get_live_rules(), until)
+        )
+    
+    def _materialize(self, rules: List[SeriesRule], until: str) -> List[Dict]:
+        """
+        Create due occurrences of `rules` and advance them (inside a transaction)
+        
+        An occurrence that would overlap a spray on the same relay, stored or
+        created in this call, is skipped and recorded as an exception.
+        """
+        new_schedules = []
+        rule_updates = {}
+        # Slots of the occurrences created in this call, keyed "<series> occurrence <index>"
+        batch = SprayIntervalIndex()
+        batch_models = {}
+        
+        for rule in rules:
+            for index, date, time in rule.occurrences(rule.next_index, until):
+                schedule = self._occurrence(rule, index, date, time)
+                model = Schedule.from_dict(dict(schedule, id=f"{rule.id} occurrence {index}"))
+                
+                conflict = self._find_conflict(model, batch, batch_models)
+                if conflict:
+                    rule.exceptions.add(index)
+                    self.logger.log_warning(
+                        f"Skipped {rule.id} occurrence {index} on {date} at {time}: "
+                        f"{model.container} already has a spray at {conflict.time} "
+                        f"on {conflict.date} ({conflict.id})"
+                    )
+                    continue
+                
+                new_schedules.append(schedule)
+                batch.update(model)
+                batch_models[model.id] = model
+            
+            # Skipped exceptions count as done too
+            next_index = rule.next_index
+            while rule.has_occurrence(next_index) and rule.base_date(next_index) <= until:
+                next_index += 1
+            
+            if next_index != rule.next_index:
+                rule.next_index = next_index
+                updates = {'rule': rule.to_dict()}
+                if rule.exhausted:
+                    updates['status'] = ScheduleStatus.COMPLETED.value
+                rule_updates[rule.id] = updates
+        
+        if new_schedules:
+            new_schedules = self.data_store.add_schedules(new_schedules)
+        if rule_updates:
+            self.data_store.update_schedules(rule_updates)
+        
+        return new_schedules
+    
+    @staticmethod
+    def _occurrence(rule: SeriesRule, index: int, date: str, time: str) -> Dict:
+        """Schedule record for one occurrence of a rule"""
+        template = rule.schedule
+        return {
+            'date': date,
+            'time': time,
+            'spray_type': template.spray_type,
+            'container': template.container,
+            'duration': template.duration,
+            'status': 'scheduled',
+            'series_id': rule.id,
+            'series_index': index,
+            'series_interval': rule.interval,
+        }
+    
+    def _find_conflict(self, schedule: Schedule, batch: Optional[SprayIntervalIndex] = None,
+                       batch_models: Optional[Dict[str, Schedule]] = None) -> Optional[Schedule]:
+        """First active spray on the schedule's relay, stored or in `batch`, that it would overlap"""
+        slot = SprayIntervalIndex.slot_of(schedule)
+        if slot is None:
+            return None
+        
+        stored = self.data_store.find_overlapping(*slot)
+        if stored:
+            return stored[0]
+        if batch is not None:
+            for schedule_id in batch.overlapping(*slot):
+                return batch_models[schedule_id]
+        return None
+    
+    def upcoming(self, series_id: str, until: str) -> List[Dict]:
+        """
+        Occurrences of a series up to `until`: created schedules plus the
+        ones the rule will still produce (those have no 'id')
+        """
+        rule = self.get_rule(series_id)
+        occurrences = [
+            s.to_dict() for s in self.data_store.get_schedule_models(active_only=True)
+            if s.series_id == series_id and s.date <= until
+        ]
+        
+        if rule is not None and rule.schedule.status == ScheduleStatus.SERIES:
+            for index, date, time in rule.occurrences(rule.next_index, until):
+                occurrences.append({
+                    'date': date,
+                    'time': time,
+                    'spray_type': rule.schedule.spray_type,
+                    'container': rule.schedule.container,
+                    'duration': rule.schedule.duration,
+                    'status': 'scheduled',
+                    'series_id': series_id,
+                    'series_index': index,
+                })
+        
+        occurrences.sort(key=lambda s: (s['date'], s['time']))
+        return occurrences
+    
+    def shift_tail(self, series_id: str, from_index: int, days: int,
+                   record_original: bool = False) -> List[Dict]:
+        """
+        Move occurrences from `from_index` on by `days`
+        
+        The rule gets one tail shift; only occurrences already created as
+        schedules are updated one by one, and with record_original they keep
+        their first date and time in original_date/original_time. Returns
+        the updated schedules' {'id', 'old_date', 'new_date'}. Call inside a
+        transaction to combine it with other changes.
+        """
+        def shift():
+            rule = self.get_rule(series_id)
+            if rule is None:
+                return []
+            
+            if rule.schedule.status == ScheduleStatus.SERIES:
+                rule.shifts.append((from_index, days))
+                self.data_store.update_schedule(series_id, {'rule': rule.to_dict()})
+            
+            affected = []
+            updates = {}
+            for s in self.data_store.get_schedule_models(active_only=True):
+                if (s.series_id == series_id and s.series_index is not None
+                        and s.series_index >= from_index):
+                    new_date = (s.datetime + timedelta(days=days)).strftime('%Y-%m-%d')
+                    updates[s.id] = {'date': new_date, 'status': 'rescheduled'}
+                    if record_original:
+                        updates[s.id]['original_date'] = s.original_date or s.date
+                        updates[s.id]['original_time'] = s.original_time or s.time
+                    affected.append({'id': s.id, 'old_date': s.date, 'new_date': new_date})
+            
+            if updates:
+                self.data_store.update_schedules(updates)
+            return affected
+        
+        return self.data_store.run_transaction(shift)
+    
+    def pending_occurrences(self, rule: SeriesRule, start_date: Optional[str],
+                            end_date: str) -> List[Tuple[int, str, str]]:
+        """(index, date, time) of occurrences not created yet, dated start_date..end_date"""
+        return [
+            occurrence for occurrence in rule.occurrences(rule.next_index, end_date)
+            if start_date is None or occurrence[1] >= start_date
+        ]
+    
+    def record_override(self, series_id: str, index: int, date: str, time: str):
+        """Remember that one occurrence was moved to `date` `time`"""
+        self.set_overrides(series_id, {index: (date, time)})
+    
+    def set_overrides(self, series_id: str, overrides: Dict[int, Tuple[str, str]]):
+        """Move several occurrences, {index: (date, time)}, with one rule edit"""
+        rule = self.get_rule(series_id)
+        if rule is None or not overrides:
+            return
+        
+        for index, (date, time) in overrides.items():
+            rule.overrides[index] = {'date': date, 'time': time}
+        self.data_store.update_schedule(series_id, {'rule': rule.to_dict()})
+    
+    def skip_occurrences(self, series_id: str, indexes: Iterable[int]) -> int:
+        """Drop occurrences not created as schedules yet; returns how many were dropped"""
+        rule = self.get_rule(series_id)
+        if rule is None:
+            return 0
+        
+        skipped = {
+            index for index in indexes
+            if index >= rule.next_index and rule.occurrence(index) is not None
+        }
+        if skipped:
+            rule.exceptions |= skipped
+            self.data_store.update_schedule(series_id, {'rule': rule.to_dict()})
+        return len(skipped)
+    
+    def cancel_occurrence(self, series_id: str, index: int) -> bool:
+        """Drop one occurrence that has not been created as a schedule yet"""
+        return self.data_store.run_transaction(
+            lambda: self.skip_occurrences(series_id, [index]) > 0
+        )
+    
+    def end_series(self, series_id: str, reason: str, from_date: Optional[str] = None) -> bool:
+        """
+        Stop a series from creating further occurrences
+        
+        With from_date, occurrences before that date that are still to be
+        created are kept by ending the series the day before instead.
+        """
+        rule = self.get_rule(series_id)
+        if rule is None or rule.schedule.status != ScheduleStatus.SERIES:
+            return False
+        
+        if from_date is not None and rule.first_index_from(from_date) > rule.next_index:
+            day_before = datetime.strptime(from_date, '%Y-%m-%d') - timedelta(days=1)
+            rule.until = min(filter(None, (rule.until, day_before.strftime('%Y-%m-%d'))))
+            self.data_store.update_schedule(series_id, {'rule': rule.to_dict()})
+            return True
+        
+        self.data_store.update_schedule(series_id, {
+            'status': ScheduleStatus.CANCELLED.value,
+            'cancel_reason': reason
+        })
+        return True
+
+
+# Global series manager instance
+_series_manager_instance = None
+
+def get_series_manager():
+    """Get global series manager instance"""
+    global _series_manager_instance
+    if _series_manager_instance is None:
+        _series_manager_instance = SeriesManager()
+    return _series_manager_instance
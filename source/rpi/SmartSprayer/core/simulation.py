@@ -0,0 +1,347 @@
+# simulation.py
+# Replays schedules on a virtual clock with mock hardware
+
+import contextlib
+import heapq
+import io
+import logging
+import shutil
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from core.clock import VirtualClock
+from core.data_store import DataStore
+from core.models import Schedule
+from core.scheduler import Scheduler
+from hardware.mock_hardware import MockHardware
+
+
+def _to_timestamp(when) -> float:
+    """Epoch seconds from a datetime or a number"""
+    if isinstance(when, datetime):
+        return when.timestamp()
+    return float(when)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+class SimulatedHardware(MockHardware):
+    """MockHardware on a virtual clock that totals relay on-time"""
+    
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        # No real-time tank drift in a simulation
+        self.running = False
+        
+        self.clock = clock
+        self.relay_on_time = {1: 0.0, 2: 0.0}
+        self._relay_since = {}
+    
+    def relay_on(self, relay_num=1):
+        super().relay_on(relay_num)
+        self._relay_since.setdefault(relay_num, self.clock.monotonic())
+    
+    def relay_off(self, relay_num=1):
+        super().relay_off(relay_num)
+        since = self._relay_since.pop(relay_num, None)
+        if since is not None:
+            self.relay_on_time[relay_num] = (
+                self.relay_on_time.get(relay_num, 0.0) + self.clock.monotonic() - since
+            )
+    
+    def buzzer_beep(self, duration=0.5):
+        self.buzzer_on()
+        self.clock.sleep(duration)
+        self.buzzer_off()
+
+
+class _SimulatedScheduler(Scheduler):
+    """Scheduler whose relay workers are replaced by the simulation's job queues"""
+    
+    def __init__(self, simulation: 'Simulation', *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._simulation = simulation
+    
+    def _dispatch(self, schedule: Schedule):
+        self._simulation._enqueue(schedule)
+
+
+class Simulation:
+    """
+    Runs the real Scheduler, RescheduleManager and DataStore on a
+    VirtualClock against SimulatedHardware, so months of schedules replay
+    in seconds
+    
+    Events (queued due times, scripted actions, relay jobs) are processed
+    in time order on one thread. A relay runs one spray at a time and
+    different relays overlap, as with the relay workers; the clock steps
+    back to a spray's start time when another relay's spray ran past it.
+    
+    Usage:
+        sim = Simulation(start=datetime(2025, 3, 1))
+        sim.scheduler.create_recurring_schedules('2025-03-01', 7, 12, '06:00',
+                                                 'Fertilizer', 'Container 1')
+        sim.at(datetime(2025, 3, 20), sim.reschedule_mgr.cancel_schedule, 'SCH_003')
+        report = sim.run(until=datetime(2025, 6, 1))
+    """
+    
+    def __init__(self, start=None, data_dir: Optional[str] = None,
+                 missed_policy: Optional[str] = None):
+        self.clock = VirtualClock(start)
+        
+        self._temp_dir = None
+        if data_dir is None:
+            data_dir = self._temp_dir = tempfile.mkdtemp(prefix="smartsprayer-sim-")
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.data_store = DataStore(data_dir, clock=self.clock)
+            self.hardware = SimulatedHardware(self.clock)
+            self.scheduler = _SimulatedScheduler(
+                self, self.hardware, data_store=self.data_store, clock=self.clock
+            )
+        self.reschedule_mgr = self.scheduler.reschedule_mgr
+        
+        if missed_policy is not None:
+            self.scheduler.MISSED_POLICY = missed_policy
+        
+        # Scripted actions: heap of (timestamp, seq, description, func, args, kwargs)
+        self._actions = []
+        self._action_seq = 0
+        
+        # Periods with the controller switched off: [(start, end)]
+        self._outages = []
+        
+        # Dispatched schedules per relay and when each relay is next free
+        self._jobs = {}
+        self._relay_free = {}
+        
+        # Next midnight at which series get new occurrences, while any are live
+        self._series_check = None
+        
+        self.timeline = []
+        self._event_time = self.clock.time()
+    
+    def at(self, when, func: Callable, *args, **kwargs):
+        """Call func(*args, **kwargs) at a simulated time"""
+        description = getattr(func, '__name__', str(func))
+        heapq.heappush(self._actions, (
+            _to_timestamp(when), self._action_seq, description, func, args, kwargs
+        ))
+        self._action_seq += 1
+    
+    def outage(self, start, end):
+        """Keep the controller switched off from start to end"""
+        self._outages.append((_to_timestamp(start), _to_timestamp(end)))
+        self._outages.sort()
+    
+    def _enqueue(self, schedule: Schedule):
+        """Scheduler dispatch: queue a schedule on its relay"""
+        relay_num = self.scheduler._relay_for(schedule.container)
+        self.scheduler._dispatched.add(schedule.id)
+        self._jobs.setdefault(relay_num, deque()).append(
+            (self.clock.time(), schedule.id, schedule.timestamp)
+        )
+    
+    def _next_job(self):
+        """(start time, relay) of the earliest relay job that can start, or None"""
+        best = None
+        for relay_num, jobs in self._jobs.items():
+            if jobs:
+                start = max(jobs[0][0], self._relay_free.get(relay_num, 0.0))
+                if best is None or start < best[0]:
+                    best = (start, relay_num)
+        return best
+    
+    def _outage_at(self, timestamp: float):
+        """The outage covering timestamp, or None"""
+        for start, end in self._outages:
+            if start <= timestamp < end:
+                return start, end
+        return None
+    
+    def run(self, until) -> Dict:
+        """Replay everything up to `until` and return the report"""
+        end = _to_timestamp(until)
+        logger = logging.getLogger("SmartSprayer")
+        was_disabled = logger.disabled
+        logger.disabled = True
+        
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._run(end)
+        finally:
+            logger.disabled = was_disabled
+        
+        return self.report()
+    
+    def _run(self, end: float):
+        self._extend_series()
+        
+        while True:
+            job = self._next_job()
+            candidates = [t for t in (
+                self.scheduler.next_due_time(),
+                self._actions[0][0] if self._actions else None,
+                job[0] if job else None,
+                self._series_check,
+            ) if t is not None]
+            
+            if not candidates:
+                break
+            # Actions scripted for a time already passed run now
+            now = max(min(candidates), self._event_time)
+            if now > end:
+                break
+            self._event_time = now
+            
+            outage = self._outage_at(now)
+            if outage:
+                self._power_cycle(outage)
+                continue
+            
+            self.clock.set(now)
+            
+            if self._actions and self._actions[0][0] <= now:
+                self._run_action()
+            elif self._series_check is not None and self._series_check <= now:
+                self._extend_series()
+            elif job and job[0] <= now:
+                self._run_job(job[1], now)
+            else:
+                self._run_due(now)
+        
+        self.clock.set(max(self.clock.time(), end))
+    
+    def _power_cycle(self, outage):
+        """Skip an outage: queued sprays are lost and the scheduler restarts"""
+        start, end = outage
+        self._outages.remove(outage)
+        
+        for jobs in self._jobs.values():
+            jobs.clear()
+        self._relay_free = {}
+        self.scheduler._dispatched.clear()
+        
+        # Scripted actions that fell inside the outage run at power-on
+        self._event_time = end
+        self.clock.set(end)
+        self.timeline.append({'event': 'outage', 'start': _iso(start), 'end': _iso(end)})
+        self._extend_series()
+    
+    def _run_action(self):
+        timestamp, _, description, func, args, kwargs = heapq.heappop(self._actions)
+        result = func(*args, **kwargs)
+        self.timeline.append({
+            'event': 'action', 'time': _iso(timestamp),
+            'action': description, 'args': list(args), 'result': result
+        })
+        # Changes are not fed to the scheduler here; re-plan from the store
+        self.scheduler._plan_all()
+        if self._series_check is None:
+            # The action may have created the first live series
+            self._plan_series_check()
+    
+    def _extend_series(self):
+        """The scheduler's daily series extension, then re-plan"""
+        self.scheduler._extend_series()
+        self.scheduler._plan_all()
+        self._plan_series_check()
+    
+    def _plan_series_check(self):
+        self._series_check = None
+        if self.scheduler.series_mgr.get_live_rules():
+            midnight = self.clock.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            self._series_check = (midnight + timedelta(days=1)).timestamp()
+    
+    def _run_due(self, now: float):
+        due, overdue = self.scheduler._collect_due(now)
+        
+        for schedule in overdue:
+            self.scheduler._catch_up(schedule)
+            current = self.data_store.get_schedule_model(schedule.id)
+            if current is not None and current.status == 'missed':
+                self.timeline.append({
+                    'event': 'missed', 'schedule_id': schedule.id,
+                    'due': _iso(schedule.timestamp), 'time': _iso(now)
+                })
+            elif current is not None and current.timestamp != schedule.timestamp:
+                self.timeline.append({
+                    'event': 'rescheduled', 'schedule_id': schedule.id,
+                    'due': _iso(schedule.timestamp), 'time': _iso(now),
+                    'new_due': _iso(current.timestamp)
+                })
+        
+        for schedule in due:
+            self.scheduler._dispatch(schedule)
+        
+        if overdue:
+            self.scheduler._plan_all()
+    
+    def _run_job(self, relay_num: int, start: float):
+        dispatched_at, schedule_id, due_timestamp = self._jobs[relay_num].popleft()
+        self.scheduler._dispatched.discard(schedule_id)
+        
+        # As a relay worker does: skip jobs cancelled or moved while queued
+        self.clock.set(start)
+        claimed = self.scheduler._claim(schedule_id, due_timestamp)
+        if claimed is None:
+            self.timeline.append({'event': 'skipped', 'schedule_id': schedule_id,
+                                  'time': _iso(start)})
+            return
+        
+        self.scheduler._execute_schedule(claimed)
+        finish = self.clock.time()
+        self._relay_free[relay_num] = finish
+        
+        result = self.data_store.get_schedule_model(schedule_id)
+        last = self.data_store.get_history(limit=1)
+        self.timeline.append({
+            'event': 'spray',
+            'schedule_id': schedule_id,
+            'relay': relay_num,
+            'spray_type': claimed['spray_type'],
+            'due': _iso(due_timestamp),
+            'start': _iso(start),
+            'end': _iso(finish),
+            'late': start - due_timestamp,
+            'requested': claimed.get('duration'),
+            'actual': last[-1].get('actual_duration') if last else None,
+            'status': result.to_dict().get('status') if result is not None else None,
+        })
+    
+    def report(self) -> Dict:
+        """Counts, lateness stats and relay on-time for the run so far"""
+        sprays = [e for e in self.timeline if e['event'] == 'spray']
+        lateness = sorted(e['late'] for e in sprays)
+        
+        def percentile(p):
+            if not lateness:
+                return None
+            return lateness[min(len(lateness) - 1, int(p * len(lateness)))]
+        
+        return {
+            'sprays': len(sprays),
+            'completed': sum(1 for e in sprays if e['status'] == 'completed'),
+            'aborted': sum(1 for e in sprays if e['status'] == 'aborted'),
+            'failed': sum(1 for e in sprays if e['status'] == 'failed'),
+            'missed': sum(1 for e in self.timeline if e['event'] == 'missed'),
+            'rescheduled': sum(1 for e in self.timeline if e['event'] == 'rescheduled'),
+            'skipped': sum(1 for e in self.timeline if e['event'] == 'skipped'),
+            'lateness': {
+                'mean': sum(lateness) / len(lateness) if lateness else None,
+                'p95': percentile(0.95),
+                'max': lateness[-1] if lateness else None,
+            },
+            'relay_on_time': dict(self.hardware.relay_on_time),
+            'timeline': list(self.timeline),
+        }
+    
+    def close(self):
+        """Close the store and remove the temporary data directory"""
+        self.data_store.close()
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
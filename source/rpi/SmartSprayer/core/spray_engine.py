@@ -0,0 +1,221 @@
+# spray_engine.py
+# Interruptible spray timing against monotonic deadlines
+
+import threading
+from typing import Dict, List, Optional
+from core.clock import get_clock
+from core.logger import get_logger
+
+
+class SprayRun:
+    """One spray on one relay and how much of it has been delivered"""
+    
+    RUNNING = 'running'
+    PAUSED = 'paused'
+    ABORTED = 'aborted'
+    COMPLETED = 'completed'
+    
+    def __init__(self, schedule_id: str, relay_num: int, requested: float, clock=None):
+        self.clock = clock or get_clock()
+        self.schedule_id = schedule_id
+        self.relay_num = relay_num
+        self.requested = requested
+        self.state = self.RUNNING
+        
+        # Seconds sprayed in earlier (pre-pause) segments, and the monotonic
+        # start of the current segment while running
+        self.sprayed = 0.0
+        self.segment_start = None
+    
+    @property
+    def actual(self) -> float:
+        """Seconds the relay has been on so far"""
+        if self.segment_start is None:
+            return self.sprayed
+        return self.sprayed + (self.clock.monotonic() - self.segment_start)
+    
+    @property
+    def remaining(self) -> float:
+        """Seconds of spraying still to go"""
+        return max(0.0, self.requested - self.actual)
+    
+    @property
+    def finished(self) -> bool:
+        return self.state in (self.ABORTED, self.COMPLETED)
+    
+    def to_dict(self) -> Dict:
+        """Snapshot for the UI"""
+        return {
+            'schedule_id': self.schedule_id,
+            'relay': self.relay_num,
+            'state': self.state,
+            'requested_duration': self.requested,
+            'actual_duration': round(self.actual, 1),
+            'remaining': round(self.remaining, 1)
+        }
+
+
+class SprayEngine:
+    """
+    Runs sprays with pause, resume and abort
+    
+    Spray time is measured with the clock's monotonic(), so it neither drifts
+    with thread scheduling nor jumps when NTP or the RTC corrects the wall
+    clock. run() blocks the calling relay worker; pause(), resume() and
+    abort() may be called from any thread (UI, hardware buttons).
+    """
+    
+    # Hardware buttons that control running sprays (names in BUTTON_CONFIG.BUTTON_PINS)
+    PAUSE_BUTTON = 'select'
+    ABORT_BUTTON = 'reset'
+    
+    # How often the buttons are read while a spray is running or paused
+    BUTTON_POLL = 0.1
+    
+    def __init__(self, hardware=None, clock=None):
+        self.hardware = hardware
+        self.clock = clock or get_clock()
+        self.logger = get_logger()
+        
+        self._runs = {}
+        self._cond = threading.Condition()
+        self._buttons = {}
+    
+    def run(self, schedule_id: str, relay_num: int, duration: float) -> SprayRun:
+        """Spray on a relay until `duration` seconds are delivered or aborted"""
+        spray = SprayRun(schedule_id, relay_num, float(duration), self.clock)
+        
+        with self._cond:
+            if relay_num in self._runs:
+                raise RuntimeError(f"Relay {relay_num} is already spraying")
+            self._runs[relay_num] = spray
+            self._cond.notify_all()
+        
+        relay_on = False
+        try:
+            with self._cond:
+                while not spray.finished:
+                    self._poll_buttons()
+                    
+                    if spray.state == SprayRun.PAUSED:
+                        if relay_on:
+                            spray.sprayed += self.clock.monotonic() - spray.segment_start
+                            spray.segment_start = None
+                            self._set_relay(relay_num, False)
+                            relay_on = False
+                        self.clock.wait(self._cond, self._poll_timeout(None))
+                        continue
+                    
+                    if not relay_on:
+                        self._set_relay(relay_num, True)
+                        relay_on = True
+                        spray.segment_start = self.clock.monotonic()
+                    
+                    remaining = spray.remaining
+                    if remaining <= 0:
+                        spray.state = SprayRun.COMPLETED
+                        break
+                    self.clock.wait(self._cond, self._poll_timeout(remaining))
+        finally:
+            with self._cond:
+                if spray.segment_start is not None:
+                    spray.sprayed += self.clock.monotonic() - spray.segment_start
+                    spray.segment_start = None
+                if not spray.finished:
+                    spray.state = SprayRun.ABORTED
+                self._runs.pop(relay_num, None)
+                self._cond.notify_all()
+            
+            if relay_on:
+                self._set_relay(relay_num, False)
+        
+        return spray
+    
+    def _poll_timeout(self, remaining: Optional[float]) -> Optional[float]:
+        """Wait timeout that also leaves time to read the buttons"""
+        if self.hardware is None:
+            return remaining
+        if remaining is None:
+            return self.BUTTON_POLL
+        return min(remaining, self.BUTTON_POLL)
+    
+    def _poll_buttons(self):
+        """Apply newly pressed hardware buttons to all runs (lock held)"""
+        if self.hardware is None:
+            return
+        
+        for name in (self.PAUSE_BUTTON, self.ABORT_BUTTON):
+            try:
+                pressed = bool(self.hardware.read_button(name))
+            except Exception:
+                pressed = False
+            
+            was_pressed = self._buttons.get(name, False)
+            self._buttons[name] = pressed
+            if not pressed or was_pressed:
+                continue
+            
+            if name == self.ABORT_BUTTON:
+                self._set_state(None, SprayRun.ABORTED, "button")
+            elif any(s.state == SprayRun.RUNNING for s in self._runs.values()):
+                self._set_state(None, SprayRun.PAUSED, "button")
+            else:
+                self._set_state(None, SprayRun.RUNNING, "button")
+    
+    def _set_relay(self, relay_num: int, on: bool):
+        """Switch a relay on or off"""
+        if self.hardware is None:
+            return
+        if on:
+            self.hardware.relay_on(relay_num)
+        else:
+            self.hardware.relay_off(relay_num)
+    
+    def _set_state(self, relay_num: Optional[int], state: str, source: str) -> bool:
+        """Move matching runs to `state` (lock held); True if any changed"""
+        allowed = {
+            SprayRun.PAUSED: (SprayRun.RUNNING,),
+            SprayRun.RUNNING: (SprayRun.PAUSED,),
+            SprayRun.ABORTED: (SprayRun.RUNNING, SprayRun.PAUSED),
+        }[state]
+        
+        changed = False
+        for spray in self._runs.values():
+            if relay_num is not None and spray.relay_num != relay_num:
+                continue
+            if spray.state in allowed:
+                spray.state = state
+                changed = True
+                self.logger.log_info(
+                    f"Spray {spray.schedule_id} on relay {spray.relay_num} "
+                    f"{state} ({source})"
+                )
+        
+        if changed:
+            self._cond.notify_all()
+        return changed
+    
+    def pause(self, relay_num: Optional[int] = None) -> bool:
+        """Pause the spray on a relay, or all sprays; the relay is switched off"""
+        with self._cond:
+            return self._set_state(relay_num, SprayRun.PAUSED, "user")
+    
+    def resume(self, relay_num: Optional[int] = None) -> bool:
+        """Resume a paused spray for the time it still had left"""
+        with self._cond:
+            return self._set_state(relay_num, SprayRun.RUNNING, "user")
+    
+    def abort(self, relay_num: Optional[int] = None) -> bool:
+        """Stop the spray on a relay, or all sprays, for good"""
+        with self._cond:
+            return self._set_state(relay_num, SprayRun.ABORTED, "user")
+    
+    def get_active(self) -> List[Dict]:
+        """Running and paused sprays, by relay"""
+        with self._cond:
+            return [self._runs[relay].to_dict() for relay in sorted(self._runs)]
+    
+    def is_paused(self) -> bool:
+        """True if any spray is paused"""
+        with self._cond:
+            return any(s.state == SprayRun.PAUSED for s in self._runs.values())
@@ -0,0 +1,405 @@
+# sqlite_store.py
+# SQLite-backed data persistence with indexed schedule lookups
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+from core.data_store import DataStore
+from core.intervals import SprayIntervalIndex
+from core.models import Schedule
+
+ACTIVE_STATUSES = ('scheduled', 'rescheduled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    date TEXT,
+    time TEXT,
+    status TEXT,
+    series_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_schedules_date_status ON schedules (date, status);
+CREATE INDEX IF NOT EXISTS idx_schedules_status ON schedules (status, date, time);
+CREATE INDEX IF NOT EXISTS idx_schedules_series ON schedules (series_id);
+
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteDataStore(DataStore):
+    """DataStore backed by an SQLite database instead of JSON files
+
+    Schedules keep their full record as JSON in the `data` column; the
+    fields used for lookups (id, date, status, series_id) are mirrored
+    into indexed columns.
+    """
+
+    def __init__(self, data_dir="data", db_name="smartsprayer.db", clock=None):
+        self.db_name = db_name
+        self._conn = None
+        self._readers = threading.local()
+
+        # {schedule id: (row data, Schedule)}; models are rebuilt only when a row changes
+        self._models = {}
+        
+        # Last state seen by the change feed (see _poll_changes)
+        self._poll_lock = threading.Lock()
+        self._seen_version = None
+        self._seen_schedules = {}
+        self._seen_history = (0, 0)
+        
+        super().__init__(data_dir, clock=clock)
+
+    def _init_files(self):
+        """Open the database, create the schema and migrate JSON data once"""
+        self.db_file = self.data_dir / self.db_name
+        # Autocommit mode; transactions are managed explicitly in transaction()
+        self._conn = sqlite3.connect(
+            str(self.db_file), check_same_thread=False, isolation_level=None
+        )
+
+        with self._lock:
+            # WAL lets per-thread readers see the last commit while a write is open
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+        self._migrate_from_json()
+
+    # Transactions
+    @contextmanager
+    def transaction(self):
+        """
+        Group mutations into one SQLite transaction, rolled back on error
+
+        Nested blocks become savepoints. BEGIN IMMEDIATE takes SQLite's
+        write lock up front, so reads inside the transaction are never
+        stale and the commit can't conflict with another process.
+        """
+        with self._lock:
+            depth = self._txn_depth
+            if depth:
+                self._conn.execute(f"SAVEPOINT sp{depth}")
+            else:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._txn_owner = threading.get_ident()
+
+            changes = self._conn.total_changes
+            self._txn_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if depth:
+                    self._conn.execute(f"ROLLBACK TO sp{depth}")
+                    self._conn.execute(f"RELEASE sp{depth}")
+                else:
+                    self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._txn_depth -= 1
+                if not self._txn_depth:
+                    self._txn_owner = None
+
+            if depth:
+                self._conn.execute(f"RELEASE sp{depth}")
+            else:
+                if self._conn.total_changes != changes:
+                    self._conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('version', 1) "
+                        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+                    )
+                self._conn.execute("COMMIT")
+                # SQLite commits go straight to disk; there is nothing to coalesce
+                self.logical_writes += 1
+                self.physical_writes += 1
+                
+                if self._subscribers:
+                    # Wake the dispatcher to report the change now
+                    self._change_queue.put(None)
+
+    def _migrate_from_json(self):
+        """Import schedules.json and the JSON history into an empty database"""
+        with self.transaction():
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+            if done:
+                return
+
+            for schedule in self._load_json(self.schedules_file):
+                if 'id' in schedule:
+                    self._upsert(schedule)
+
+            if self.history_log.exists():
+                history = self._read_history_log()
+            else:
+                history = self._load_legacy_history()
+
+            for record in history:
+                self._conn.execute(
+                    "INSERT INTO history (data) VALUES (?)",
+                    (json.dumps(record, ensure_ascii=False),)
+                )
+
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (self.clock.now().isoformat(),)
+            )
+
+    # Row helpers (callers are inside transaction())
+    def _upsert(self, schedule: Dict):
+        """Insert or replace a schedule row, keeping its position"""
+        self._conn.execute(
+            "INSERT INTO schedules (id, date, time, status, series_id, data) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET date = excluded.date, "
+            "time = excluded.time, status = excluded.status, "
+            "series_id = excluded.series_id, data = excluded.data",
+            (
+                schedule['id'],
+                schedule.get('date'),
+                schedule.get('time'),
+                schedule.get('status'),
+                schedule.get('series_id'),
+                json.dumps(schedule, ensure_ascii=False)
+            )
+        )
+
+    def get_version(self) -> int:
+        """Store version; increases with every write by any process"""
+        row = self._reader().execute(
+            "SELECT value FROM meta WHERE key = 'version'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _poll_changes(self) -> List[Dict]:
+        """
+        Deltas since the last poll, for the change feed
+
+        Local and other processes' commits are both found by diffing the
+        tables against the last poll whenever the store version moves.
+        """
+        with self._poll_lock:
+            version = self.get_version()
+            if version == self._seen_version:
+                return []
+
+            reader = self._reader()
+            schedules = dict(reader.execute("SELECT id, data FROM schedules"))
+            # sqlite_sequence keeps the highest seq ever used, even after a clear
+            history = reader.execute(
+                "SELECT (SELECT COUNT(*) FROM history), COALESCE("
+                "(SELECT seq FROM sqlite_sequence WHERE name = 'history'), 0)"
+            ).fetchone()
+
+            changes = self._diff_schedules(self._seen_schedules, schedules)
+
+            # seq only grows, so fewer rows than were added means a clear
+            old_count, old_seq = self._seen_history
+            added = history[1] - old_seq
+            if history[0] < old_count + added:
+                changes.append({'kind': 'history', 'action': 'cleared'})
+                added = history[0]
+            if added > 0:
+                changes.append({'kind': 'history', 'action': 'added', 'count': added})
+
+            self._seen_version = version
+            self._seen_schedules = schedules
+            self._seen_history = history
+            return changes
+
+    def _start_writer_thread(self):
+        """SQLite serializes its own writes; no writer thread is needed"""
+
+    def _refresh_from_disk(self):
+        """Reads always go to the database; there is no JSON cache to reload"""
+
+    def _reader(self):
+        """Connection for reads: the writer's inside its own transaction, else one per thread"""
+        if self._txn_depth and self._txn_owner == threading.get_ident():
+            return self._conn
+
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), isolation_level=None)
+            self._readers.conn = conn
+        return conn
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        """Run a SELECT returning the data column and decode each row"""
+        rows = self._reader().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _query_models(self, sql: str, params=()) -> List[Schedule]:
+        """Run a SELECT returning id and data, reusing models of unchanged rows"""
+        models = []
+        for schedule_id, data in self._reader().execute(sql, params):
+            cached = self._models.get(schedule_id)
+            if cached is None or cached[0] != data:
+                cached = (data, Schedule.from_dict(json.loads(data)))
+                self._models[schedule_id] = cached
+            models.append(cached[1])
+        return models
+
+    # Schedule Management
+    def get_all_schedules(self) -> List[Dict]:
+        """Get all schedules"""
+        return self._query("SELECT data FROM schedules ORDER BY seq")
+
+    def get_schedule_models(self, active_only: bool = False) -> List[Schedule]:
+        """Schedules as shared, read-only Schedule models"""
+        if active_only:
+            return self._query_models(
+                "SELECT id, data FROM schedules WHERE status IN (?, ?) ORDER BY seq",
+                ACTIVE_STATUSES
+            )
+        return self._query_models("SELECT id, data FROM schedules ORDER BY seq")
+
+    def get_schedule_model(self, schedule_id: str) -> Optional[Schedule]:
+        """Shared, read-only Schedule model by ID"""
+        models = self._query_models(
+            "SELECT id, data FROM schedules WHERE id = ?", (schedule_id,)
+        )
+        return models[0] if models else None
+
+    def add_schedules(self, new_schedules: List[Dict]) -> List[Dict]:
+        """Add several schedules in one transaction; returns the stored copies"""
+        added = []
+        with self.transaction():
+            # Series rules (SERIES_...) share the table but not the numbering
+            row = self._conn.execute(
+                "SELECT id, (SELECT COUNT(*) FROM schedules) FROM schedules "
+                "WHERE id LIKE 'SCH!_%' ESCAPE '!' ORDER BY seq DESC LIMIT 1"
+            ).fetchone()
+            last_id, count = row if row else (None, 0)
+
+            for schedule in new_schedules:
+                schedule = dict(schedule)
+                if 'id' not in schedule:
+                    if last_id is None:
+                        schedule['id'] = "SCH_001"
+                    else:
+                        schedule['id'] = self._next_schedule_id(last_id, count)
+
+                # Add metadata
+                schedule['created_at'] = self.clock.now().isoformat()
+                schedule['reschedule_count'] = schedule.get('reschedule_count', 0)
+                schedule['status'] = schedule.get('status', 'scheduled')
+
+                self._upsert(schedule)
+                added.append(schedule)
+                last_id = schedule['id']
+                count += 1
+
+        return added
+
+    def update_schedules(self, updates_by_id: Dict[str, Dict]) -> List[Dict]:
+        """Apply {schedule_id: updates} in one transaction; returns updated schedules"""
+        updated = []
+        now = self.clock.now().isoformat()
+
+        with self.transaction():
+            for schedule_id, updates in updates_by_id.items():
+                row = self._conn.execute(
+                    "SELECT data FROM schedules WHERE id = ?", (schedule_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+
+                schedule = json.loads(row[0])
+                schedule.update(updates)
+                schedule['updated_at'] = now
+                self._upsert(schedule)
+                updated.append(schedule)
+
+        return updated
+
+    def delete_schedule(self, schedule_id: str) -> bool:
+        """Delete schedule"""
+        with self.transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM schedules WHERE id = ?", (schedule_id,)
+            )
+        self._models.pop(schedule_id, None)
+        return cursor.rowcount > 0
+
+    def get_schedule_by_id(self, schedule_id: str) -> Optional[Dict]:
+        """Get schedule by ID"""
+        rows = self._query("SELECT data FROM schedules WHERE id = ?", (schedule_id,))
+        return rows[0] if rows else None
+
+    def find_overlapping(self, relay_num: int, start: float, end: float,
+                         exclude=()) -> List[Schedule]:
+        """Active schedules whose spray on relay_num overlaps [start, end) (epoch seconds)"""
+        # Sprays last seconds to minutes, so only schedules starting between
+        # the day before `start` and the day of `end` can overlap; the
+        # (status, date, time) index finds those without a table scan
+        first = (datetime.fromtimestamp(start) - timedelta(days=1)).strftime('%Y-%m-%d')
+        last = datetime.fromtimestamp(end).strftime('%Y-%m-%d')
+        candidates = self._query_models(
+            "SELECT id, data FROM schedules WHERE status IN (?, ?) AND date BETWEEN ? AND ?",
+            ACTIVE_STATUSES + (first, last)
+        )
+        
+        by_id = {s.id: s for s in candidates}
+        index = SprayIntervalIndex(candidates)
+        return [by_id[i] for i in index.overlapping(relay_num, start, end, exclude)]
+
+    def get_active_schedules(self) -> List[Dict]:
+        """Get all active (not completed/cancelled) schedules"""
+        return self._query(
+            "SELECT data FROM schedules WHERE status IN (?, ?) ORDER BY seq",
+            ACTIVE_STATUSES
+        )
+
+    def get_schedules_by_date(self, date_str: str) -> List[Dict]:
+        """Get all schedules for a specific date"""
+        return self._query(
+            "SELECT data FROM schedules WHERE date = ? AND status IN (?, ?) ORDER BY seq",
+            (date_str,) + ACTIVE_STATUSES
+        )
+
+    def clear_all_schedules(self):
+        """Clear all schedules"""
+        with self.transaction():
+            self._conn.execute("DELETE FROM schedules")
+        self._models.clear()
+
+    # History Management
+    def get_history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get spray history"""
+        if limit:
+            history = self._query(
+                "SELECT data FROM history ORDER BY seq DESC LIMIT ?", (limit,)
+            )
+            history.reverse()
+            return history
+        return self._query("SELECT data FROM history ORDER BY seq")
+
+    def add_to_history(self, spray_data: Dict):
+        """Add completed spray to history"""
+        spray_data['completed_at'] = self.clock.now().isoformat()
+
+        with self.transaction():
+            self._conn.execute(
+                "INSERT INTO history (data) VALUES (?)",
+                (json.dumps(spray_data, ensure_ascii=False),)
+            )
+
+    def clear_history(self):
+        """Clear history"""
+        with self.transaction():
+            self._conn.execute("DELETE FROM history")
@@ -0,0 +1,303 @@
+# fault_injection.py
+# Crash-recovery check for DataStore: cut commits at random byte offsets and
+# kill processes mid-commit, then verify that the store recovers intact
+
+import argparse
+import builtins
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add current directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core import data_store as data_store_module
+from core.clock import VirtualClock
+from core.data_store import DataStore
+
+START = datetime(2025, 3, 1)
+
+# Exit code of a process killed by a cut
+CUT_EXIT = 86
+
+
+def _open_store(data_dir):
+    """Store that writes every commit through, on a fixed clock"""
+    # Recovery warnings are expected here; the report below covers them
+    logging.getLogger("SmartSprayer").disabled = True
+    return DataStore(data_dir, flush_interval=0, clock=VirtualClock(START))
+
+
+def _seed(data_dir, count):
+    store = _open_store(data_dir)
+    store.add_schedules([{
+        'date': f"2025-03-{day % 28 + 1:02d}",
+        'time': '06:00',
+        'spray_type': 'Fertilizer',
+        'container': f"Container {day % 2 + 1}",
+        'duration': 30,
+        'status': 'scheduled'
+    } for day in range(count)])
+    store.add_to_history({'date': '2025-02-28', 'time': '06:00', 'spray_type': 'Fertilizer',
+                          'container': 'Container 1', 'duration': 30, 'actual_duration': 30})
+    store.close()
+
+
+def _commit(store):
+    """One transaction that touches every file: updates, a new schedule and history"""
+    def change():
+        schedules = store.get_schedule_models(active_only=True)
+        store.update_schedules({
+            s.id: {'status': 'rescheduled', 'time': '07:00'} for s in schedules[:5]
+        })
+        store.add_schedule({'date': '2025-04-01', 'time': '06:00', 'spray_type': 'Pesticide',
+                            'container': 'Container 2', 'duration': 45, 'status': 'scheduled'})
+        store.add_to_history({'date': '2025-03-01', 'time': '06:00', 'spray_type': 'Fertilizer',
+                              'container': 'Container 1', 'duration': 30, 'actual_duration': 30,
+                              'schedule_id': schedules[0].id})
+    
+    store.run_transaction(change)
+
+
+def _state(data_dir):
+    """What a restarted process sees: (schedules, history)"""
+    store = _open_store(data_dir)
+    try:
+        schedules = sorted(
+            (s['id'], s['date'], s['time'], s['status'], s.get('duration'))
+            for s in store.get_all_schedules()
+        )
+        return schedules, store.get_history()
+    finally:
+        store.close()
+
+
+class _WriteCutter:
+    """
+    Stands in for open() and os.replace in core.data_store, and kills the
+    process once `budget` bytes have been written; a rename or truncation
+    counts as one byte. With no budget it only counts.
+    """
+    
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.spent = 0
+        self._replace = os.replace
+    
+    def spend(self, amount):
+        """Allow `amount` more bytes; returns how many may still be written"""
+        if self.budget is None or self.spent + amount <= self.budget:
+            self.spent += amount
+            return amount
+        allowed = self.budget - self.spent
+        self.spent = self.budget
+        return allowed
+    
+    def die(self):
+        os._exit(CUT_EXIT)
+    
+    def open(self, file, mode='r', *args, **kwargs):
+        if 'w' in mode and self.spend(1) < 1:
+            self.die()
+        f = builtins.open(file, mode, *args, **kwargs)
+        if not any(flag in mode for flag in 'wa+'):
+            return f
+        return _CutFile(f, self)
+    
+    def replace(self, src, dst):
+        if self.spend(1) < 1:
+            self.die()
+        self._replace(src, dst)
+    
+    def install(self):
+        data_store_module.open = self.open
+        os.replace = self.replace
+    
+    def uninstall(self):
+        del data_store_module.open
+        os.replace = self._replace
+
+
+class _CutFile:
+    """File wrapper that writes only as much as the cutter allows"""
+    
+    def __init__(self, f, cutter):
+        self._f = f
+        self._cutter = cutter
+    
+    def write(self, data):
+        allowed = self._cutter.spend(len(data))
+        if allowed < len(data):
+            self._f.write(data[:allowed])
+            self._f.flush()
+            self._cutter.die()
+        return self._f.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def _cut_commit(data_dir, budget):
+    """Child process: run the test commit, dying after `budget` bytes"""
+    store = _open_store(data_dir)
+    _WriteCutter(budget).install()
+    _commit(store)
+    os._exit(0)
+
+
+def _commit_forever(data_dir):
+    """
+    Child process: commit forever, each time raising SCH_001's duration by
+    one and adding a history record with the new value, in one transaction
+    """
+    store = _open_store(data_dir)
+    
+    def step():
+        current = store.get_schedule_by_id('SCH_001')
+        duration = current['duration'] + 1
+        store.update_schedule('SCH_001', {'duration': duration})
+        store.add_to_history({'date': current['date'], 'time': current['time'],
+                              'spray_type': current['spray_type'],
+                              'container': current['container'],
+                              'duration': duration, 'actual_duration': duration,
+                              'schedule_id': 'SCH_001'})
+    
+    while True:
+        store.run_transaction(step)
+
+
+def run_cuts(work_dir, trials, rng, context):
+    """Cut the test commit at random points; the store must be before or after it"""
+    base = os.path.join(work_dir, 'base')
+    _seed(base, 20)
+    before = _state(base)
+    
+    # Reference run: the state after the commit and how many bytes it writes
+    reference = os.path.join(work_dir, 'reference')
+    shutil.copytree(base, reference)
+    store = _open_store(reference)
+    cutter = _WriteCutter()
+    cutter.install()
+    try:
+        _commit(store)
+    finally:
+        cutter.uninstall()
+        store.close()
+    after = _state(reference)
+    total = cutter.spent
+    
+    outcomes = {'before': 0, 'after': 0}
+    failures = []
+    for trial in range(trials):
+        budget = rng.randint(0, total)
+        trial_dir = os.path.join(work_dir, f"cut-{trial}")
+        shutil.copytree(base, trial_dir)
+        
+        child = context.Process(target=_cut_commit, args=(trial_dir, budget))
+        child.start()
+        child.join()
+        
+        try:
+            state = _state(trial_dir)
+        except Exception as e:
+            failures.append((budget, f"recovery raised {e!r}"))
+            continue
+        if state == before:
+            outcomes['before'] += 1
+        elif state == after:
+            outcomes['after'] += 1
+        else:
+            failures.append((budget, "store is neither before nor after the commit"))
+        shutil.rmtree(trial_dir, ignore_errors=True)
+    
+    return total, outcomes, failures
+
+
+def run_kills(work_dir, kills, rng, context):
+    """SIGKILL a committing process at random times; schedule and history must agree"""
+    data_dir = os.path.join(work_dir, 'kill')
+    _seed(data_dir, 5)
+    seed_duration = 30
+    seed_history = 1
+    
+    failures = []
+    commits = 0
+    for kill in range(kills):
+        child = context.Process(target=_commit_forever, args=(data_dir,))
+        child.start()
+        time.sleep(rng.uniform(0.2, 0.6))
+        child.kill()
+        child.join()
+        
+        try:
+            schedules, history = _state(data_dir)
+        except Exception as e:
+            failures.append((kill, f"recovery raised {e!r}"))
+            break
+        
+        duration = next(s[4] for s in schedules if s[0] == 'SCH_001')
+        commits = duration - seed_duration
+        if len(schedules) != 5:
+            failures.append((kill, f"{len(schedules)} schedules instead of 5"))
+        if len(history) - seed_history != commits:
+            failures.append((kill, f"{commits} schedule commits but "
+                                   f"{len(history) - seed_history} history records"))
+        if commits and history[-1].get('actual_duration') != duration:
+            failures.append((kill, "last history record does not match the schedule"))
+    
+    return commits, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataStore crash-recovery check")
+    parser.add_argument('--cuts', type=int, default=100, help="Commits cut at a random byte")
+    parser.add_argument('--kills', type=int, default=10, help="Processes killed mid-commit")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed (default: random)")
+    args = parser.parse_args()
+    
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    context = multiprocessing.get_context('spawn')
+    
+    work_dir = tempfile.mkdtemp(prefix="smartsprayer-faults-")
+    # Logs of the stores under test go to the work directory too
+    os.chdir(work_dir)
+    try:
+        total, outcomes, cut_failures = run_cuts(work_dir, args.cuts, rng, context)
+        commits, kill_failures = run_kills(work_dir, args.kills, rng, context)
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print("=" * 60)
+    print(f"FAULT INJECTION (seed {seed})")
+    print("=" * 60)
+    print(f"Cut commits:  {args.cuts} cuts in {total} bytes written per commit; "
+          f"recovered {outcomes['before']} before, {outcomes['after']} after")
+    print(f"Killed:       {args.kills} processes; {commits} commits survived, "
+          f"schedules and history consistent")
+    
+    failures = [('cut at byte', *f) for f in cut_failures] + \
+               [('kill', *f) for f in kill_failures]
+    for kind, where, reason in failures:
+        print(f"FAILED {kind} {where}: {reason}")
+    if failures:
+        sys.exit(1)
+    print("All recoveries passed")
+
+
+if __name__ == "__main__":
+    main()
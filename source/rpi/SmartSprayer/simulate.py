@@ -0,0 +1,140 @@
+# simulate.py
+# Replay a season of spray schedules on a virtual clock
+
+import argparse
+import logging
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add current directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.simulation import Simulation
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "--"
+    if seconds < 120:
+        return f"{seconds:.1f}s"
+    return f"{seconds / 60:.1f}min"
+
+
+def build_season(sim, start, days):
+    """Demo season: two recurring series, a reschedule, a cancellation and an outage"""
+    weeks = days // 7
+
+    # Later occurrences only become schedules as the season gets to them,
+    # so scripted actions look them up by series position when they run
+    def occurrence(series_id, index):
+        for schedule in sim.data_store.get_schedule_models(active_only=True):
+            if schedule.series_id == series_id and schedule.series_index == index:
+                return schedule
+        return None
+
+    def move_occurrence(series_id, index, days, new_time):
+        schedule = occurrence(series_id, index)
+        if schedule is None:
+            return False, "Occurrence not scheduled yet", []
+        new_date = (schedule.datetime + timedelta(days=days)).strftime('%Y-%m-%d')
+        return sim.reschedule_mgr.reschedule(schedule.id, new_date, new_time)
+
+    def cancel_occurrence(series_id, index, reason):
+        schedule = occurrence(series_id, index)
+        if schedule is None:
+            return sim.reschedule_mgr.series_mgr.cancel_occurrence(series_id, index)
+        return sim.reschedule_mgr.cancel_schedule(schedule.id, reason)
+
+    fertilizer = sim.scheduler.create_recurring_schedules(
+        start.strftime('%Y-%m-%d'), 7, max(1, weeks), '06:00',
+        'Fertilizer', 'Container 1', duration=30
+    )[0]['series_id']
+    pesticide = sim.scheduler.create_recurring_schedules(
+        start.strftime('%Y-%m-%d'), 10, max(1, days // 10), '06:00',
+        'Pesticide', 'Container 2', duration=45
+    )[0]['series_id']
+
+    # A farmer moves the third fertilizer spray by a day, two weeks in advance
+    if weeks > 2:
+        sim.at(start + timedelta(days=1), move_occurrence, fertilizer, 2, 1, '07:30')
+
+    # ...cancels a pesticide spray...
+    if days // 10 > 3:
+        sim.at(start + timedelta(days=20), cancel_occurrence, pesticide, 3, "Rain forecast")
+
+    # ...and the controller loses power overnight for two days in week 6
+    outage_start = start + timedelta(days=35, hours=22)
+    sim.outage(outage_start, outage_start + timedelta(days=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Sprayer season simulation")
+    parser.add_argument('--start', default=None,
+                        help="First day, YYYY-MM-DD (default: tomorrow)")
+    parser.add_argument('--days', type=int, default=120, help="Length of the season")
+    parser.add_argument('--policy', default=None,
+                        choices=['run_late', 'mark_missed', 'reschedule'],
+                        help="Missed-schedule policy (default: scheduler setting)")
+    parser.add_argument('--timeline', action='store_true', help="Print every event")
+    args = parser.parse_args()
+
+    if args.start:
+        start = datetime.strptime(args.start, '%Y-%m-%d')
+    else:
+        start = (datetime.now() + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    # Simulated events are reported below, not written to the system log
+    logging.getLogger("SmartSprayer").disabled = True
+    
+    sim = Simulation(start=start, missed_policy=args.policy)
+    try:
+        build_season(sim, start, args.days)
+
+        began = time.perf_counter()
+        report = sim.run(until=start + timedelta(days=args.days))
+        elapsed = time.perf_counter() - began
+    finally:
+        sim.close()
+
+    print("=" * 60)
+    print(f"SIMULATION: {start:%Y-%m-%d} + {args.days} days "
+          f"(policy: {sim.scheduler.MISSED_POLICY}, {elapsed:.2f}s real time)")
+    print("=" * 60)
+
+    if args.timeline:
+        for event in report['timeline']:
+            if event['event'] == 'spray':
+                print(f"{event['start']}  relay {event['relay']}  {event['schedule_id']}  "
+                      f"{event['spray_type']:<10} late {_format_seconds(event['late']):>8}  "
+                      f"{event['actual']}s/{event['requested']}s  {event['status']}")
+            elif event['event'] == 'outage':
+                print(f"{event['start']}  OUTAGE until {event['end']}")
+            elif event['event'] == 'action':
+                print(f"{event['time']}  {event['action']}{tuple(event['args'])} -> {event['result']!r:.60}")
+            elif event['event'] == 'rescheduled':
+                print(f"{event['time']}  {event['schedule_id']} missed {event['due']}, "
+                      f"moved to {event['new_due']}")
+            else:
+                print(f"{event.get('time')}  {event['schedule_id']} {event['event']} "
+                      f"(due {event.get('due', '?')})")
+        print("-" * 60)
+
+    lateness = report['lateness']
+    print(f"Sprays:      {report['sprays']} "
+          f"({report['completed']} completed, {report['aborted']} aborted, "
+          f"{report['failed']} failed)")
+    print(f"Missed:      {report['missed']}   Rescheduled: {report['rescheduled']}   "
+          f"Skipped: {report['skipped']}")
+    print(f"Lateness:    mean {_format_seconds(lateness['mean'])}, "
+          f"p95 {_format_seconds(lateness['p95'])}, max {_format_seconds(lateness['max'])}")
+    for relay_num, seconds in sorted(report['relay_on_time'].items()):
+        print(f"Relay {relay_num} on: {_format_seconds(seconds)}")
+
+
+if __name__ == "__main__":
+    main()
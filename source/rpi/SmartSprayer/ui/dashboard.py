@@ -19,6 +19,14 @@ class DashboardPanel(ctk.CTkFrame):
         # Create dashboard layout
         self._create_widgets()
         
+        # Schedule info is re-read only when the data store reports a change
+        self.next_schedule = None
+        self.schedules_changed = threading.Event()
+        self.schedules_changed.set()
+        self.subscription = self.scheduler.data_store.subscribe(
+            self._on_store_change, kinds={'schedule'}
+        )
+        
         # Start update thread
         self.running = True
         self.update_thread = threading.Thread(target=self._update_loop, daemon=True)
@@ -145,6 +153,40 @@ class DashboardPanel(ctk.CTkFrame):
         )
         self.status_label.pack(pady=20)
         
+        # Active spray progress and controls
+        self.spray_label = ctk.CTkLabel(
+            status_frame,
+            text="",
+            font=ctk.CTkFont(size=16),
+            text_color="#AAAAAA"
+        )
+        self.spray_label.pack(pady=(0, 10))
+        
+        spray_controls = ctk.CTkFrame(status_frame, fg_color="transparent")
+        spray_controls.pack(pady=(0, 15))
+        
+        self.pause_button = ctk.CTkButton(
+            spray_controls,
+            text="PAUSE",
+            width=120,
+            fg_color="#FF9800",
+            hover_color="#F57C00",
+            state="disabled",
+            command=self._toggle_pause
+        )
+        self.pause_button.pack(side="left", padx=10)
+        
+        self.abort_button = ctk.CTkButton(
+            spray_controls,
+            text="ABORT",
+            width=120,
+            fg_color="#F44336",
+            hover_color="#D32F2F",
+            state="disabled",
+            command=self._abort_spray
+        )
+        self.abort_button.pack(side="left", padx=10)
+        
         # Next Schedule Info
         next_schedule_frame = ctk.CTkFrame(self, fg_color="#1E1E1E", corner_radius=15)
         next_schedule_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -188,11 +230,26 @@ class DashboardPanel(ctk.CTkFrame):
         while self.running:
             try:
                 self._update_tank_levels()
-                self._update_next_schedule()
+                
+                if self.schedules_changed.is_set():
+                    self.schedules_changed.clear()
+                    self._update_next_schedule()
+                else:
+                    self._update_countdown()
+                
+                spraying = self._update_spray_status()
                 self._update_datetime()
-                time.sleep(2)  # Update every 2 seconds
+                
+                # Update every 2 seconds (faster while spraying), or as soon
+                # as schedules change
+                self.schedules_changed.wait(0.5 if spraying else 2)
             except Exception as e:
                 print(f"Dashboard update error: {e}")
+                time.sleep(2)
+    
+    def _on_store_change(self, changes):
+        """Data store callback: schedules were added, updated or removed"""
+        self.schedules_changed.set()
     
     def _update_tank_levels(self):
         """Update tank level displays"""
@@ -233,6 +290,7 @@ class DashboardPanel(ctk.CTkFrame):
     def _update_next_schedule(self):
         """Update next schedule information"""
         next_schedule = self.scheduler.get_next_schedule()
+        self.next_schedule = next_schedule
         
         if next_schedule:
             info_text = (
@@ -247,9 +305,7 @@ class DashboardPanel(ctk.CTkFrame):
             self.next_schedule_info.insert("1.0", info_text)
             
             # Update countdown
-            countdown = self.scheduler.get_time_until_next_spray()
-            if countdown:
-                self.countdown_label.configure(text=f"Time until spray: {countdown}")
+            self._update_countdown()
             
             # Update status
             self.status_label.configure(
@@ -262,6 +318,62 @@ class DashboardPanel(ctk.CTkFrame):
             self.countdown_label.configure(text="Time until spray: --")
             self.status_label.configure(text="● IDLE", text_color="#4CAF50")
     
+    def _update_countdown(self):
+        """Update the countdown to the known next schedule"""
+        if not self.next_schedule:
+            return
+        
+        countdown = self.scheduler.get_time_until_next_spray(self.next_schedule)
+        if countdown:
+            self.countdown_label.configure(text=f"Time until spray: {countdown}")
+        
+        if countdown == "Overdue":
+            # It's due now; look up the one after it
+            self.schedules_changed.set()
+    
+    def _update_spray_status(self):
+        """Show running/paused sprays and enable the controls; True while spraying"""
+        sprays = self.scheduler.spray_engine.get_active()
+        
+        if not sprays:
+            self.spray_label.configure(text="")
+            self.pause_button.configure(text="PAUSE", state="disabled")
+            self.abort_button.configure(state="disabled")
+            return False
+        
+        lines = []
+        for spray in sprays:
+            lines.append(
+                f"Relay {spray['relay']}: {spray['state'].upper()} - "
+                f"{spray['actual_duration']:.0f}s of {spray['requested_duration']:.0f}s, "
+                f"{spray['remaining']:.0f}s left"
+            )
+        self.spray_label.configure(text="\n".join(lines))
+        
+        paused = any(spray['state'] == 'paused' for spray in sprays)
+        self.pause_button.configure(text="RESUME" if paused else "PAUSE", state="normal")
+        self.abort_button.configure(state="normal")
+        
+        self.status_label.configure(
+            text="● PAUSED" if paused else "● SPRAYING",
+            text_color="#FF9800" if paused else "#2196F3"
+        )
+        return True
+    
+    def _toggle_pause(self):
+        """Pause all running sprays, or resume them if any is paused"""
+        engine = self.scheduler.spray_engine
+        if engine.is_paused():
+            engine.resume()
+        else:
+            engine.pause()
+        self._update_spray_status()
+    
+    def _abort_spray(self):
+        """Stop all running and paused sprays"""
+        self.scheduler.spray_engine.abort()
+        self._update_spray_status()
+    
     def _update_datetime(self):
         """Update date/time display"""
         now = datetime.now()
@@ -271,3 +383,5 @@ class DashboardPanel(ctk.CTkFrame):
     def cleanup(self):
         """Cleanup resources"""
         self.running = False
+        self.scheduler.data_store.unsubscribe(self.subscription)
+        self.schedules_changed.set()
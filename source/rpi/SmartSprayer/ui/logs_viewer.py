@@ -5,14 +5,22 @@ import customtkinter as ctk
 from tkinter import messagebox
 import threading
 import time
+from collections import deque
 
 class LogsViewerPanel(ctk.CTkFrame):
     """Logs viewer panel"""
     
+    # Log lines kept on screen
+    MAX_LINES = 200
+    
     def __init__(self, parent, logger):
         super().__init__(parent)
         self.logger = logger
         
+        # Lines shown, and where the log was read up to (see read_since)
+        self.log_lines = deque(maxlen=self.MAX_LINES)
+        self.log_offset = None
+        
         self.configure(fg_color="transparent")
         
         self._create_widgets()
@@ -72,7 +80,7 @@ class LogsViewerPanel(ctk.CTkFrame):
             variable=self.filter_var,
             font=ctk.CTkFont(size=14),
             width=120,
-            command=lambda _: self.refresh_logs()
+            command=lambda _: self._show_logs()
         )
         filter_combo.pack(side="left", padx=5)
         
@@ -145,19 +153,42 @@ class LogsViewerPanel(ctk.CTkFrame):
         """Auto-refresh loop"""
         while self.running:
             if self.auto_refresh:
-                self.refresh_logs()
+                self.load_new_logs()
             time.sleep(5)  # Refresh every 5 seconds
     
     def refresh_logs(self):
-        """Refresh log display"""
+        """Reload the most recent log lines"""
         try:
-            # Read logs
-            log_lines = self.logger.read_logs(num_lines=200)
+            # Offset first, so nothing logged meanwhile is missed (it may show twice)
+            _, self.log_offset = self.logger.read_since(None)
+            self.log_lines = deque(self.logger.read_logs(num_lines=self.MAX_LINES),
+                                   maxlen=self.MAX_LINES)
+        except Exception as e:
+            self._show_error(e)
+            return
+        self._show_logs()
+    
+    def load_new_logs(self):
+        """Add lines logged since the last read; redraws only if there are any"""
+        try:
+            new_lines, self.log_offset = self.logger.read_since(self.log_offset)
+        except Exception as e:
+            self._show_error(e)
+            return
+        
+        if new_lines:
+            self.log_lines.extend(new_lines)
+            self._show_logs()
+    
+    def _show_logs(self):
+        """Show the loaded lines"""
+        try:
+            log_lines = list(self.log_lines)
             
             # Apply filter
             filter_level = self.filter_var.get()
             if filter_level != "All":
-                log_lines = [line for line in log_lines if filter_level in line]
+                log_lines = [line for line in log_lines if self._line_level(line) == filter_level]
             
             # Clear textbox
             self.log_textbox.delete("1.0", "end")
@@ -170,13 +201,14 @@ class LogsViewerPanel(ctk.CTkFrame):
             # Insert logs with color coding
             for line in log_lines:
                 # Determine color based on log level
-                if "ERROR" in line:
+                level = self._line_level(line)
+                if level == "ERROR":
                     color = "#FF5555"
-                elif "WARNING" in line:
+                elif level == "WARNING":
                     color = "#FFB86C"
-                elif "INFO" in line:
+                elif level == "INFO":
                     color = "#50FA7B"
-                elif "DEBUG" in line:
+                elif level == "DEBUG":
                     color = "#8BE9FD"
                 else:
                     color = "#F8F8F2"
@@ -197,9 +229,18 @@ class LogsViewerPanel(ctk.CTkFrame):
             self.status_label.configure(text=f"Loaded {len(log_lines)} log entries")
         
         except Exception as e:
-            self.log_textbox.delete("1.0", "end")
-            self.log_textbox.insert("1.0", f"Error loading logs: {e}\n")
-            self.status_label.configure(text="Error")
+            self._show_error(e)
+    
+    @staticmethod
+    def _line_level(line):
+        """Level field of a "time - LEVEL - message" line, None for other lines"""
+        parts = line.split(" - ", 2)
+        return parts[1] if len(parts) == 3 else None
+    
+    def _show_error(self, error):
+        self.log_textbox.delete("1.0", "end")
+        self.log_textbox.insert("1.0", f"Error loading logs: {error}\n")
+        self.status_label.configure(text="Error")
     
     def _clear_logs(self):
         """Clear log file"""
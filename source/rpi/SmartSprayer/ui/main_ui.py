@@ -220,6 +220,9 @@ class SmartSprayerUI(ctk.CTk):
             # Stop scheduler
             self.scheduler.stop()
             
+            # Write out buffered schedule/history changes
+            self.data_store.close()
+            
             # Cleanup hardware
             if self.hardware:
                 self.hardware.cleanup()
@@ -230,6 +233,7 @@ class SmartSprayerUI(ctk.CTk):
                     panel.cleanup()
             
             self.logger.log_info("Shutdown complete")
+            self.logger.close()
             self.destroy()
 
 
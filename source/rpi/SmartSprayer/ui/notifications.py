@@ -19,6 +19,16 @@ class NotificationsPanel(ctk.CTkFrame):
         
         self._create_widgets()
         
+        # Store-backed sections are rebuilt only when the data store
+        # reports a change to what they show
+        self.next_due = None
+        self.schedules_changed = threading.Event()
+        self.history_changed = threading.Event()
+        self.wake = threading.Event()
+        self.schedules_changed.set()
+        self.history_changed.set()
+        self.subscription = self.data_store.subscribe(self._on_store_change)
+        
         # Start update thread
         self.running = True
         self.update_thread = threading.Thread(target=self._update_loop, daemon=True)
@@ -160,13 +170,36 @@ class NotificationsPanel(ctk.CTkFrame):
         """Background update loop"""
         while self.running:
             try:
-                self._update_system_status()
+                self.wake.clear()
                 self._update_tank_status()
-                self._update_upcoming_schedules()
-                self._update_recent_activity()
-                time.sleep(3)
+                
+                # The first upcoming schedule passing also changes the lists
+                if self.next_due and time.time() >= self.next_due:
+                    self.schedules_changed.set()
+                
+                if self.schedules_changed.is_set():
+                    self.schedules_changed.clear()
+                    self._update_system_status()
+                    self._update_upcoming_schedules()
+                
+                if self.history_changed.is_set():
+                    self.history_changed.clear()
+                    self._update_recent_activity()
+                
+                # Tank levels every 3 seconds; store changes right away
+                self.wake.wait(3)
             except Exception as e:
                 print(f"Notifications update error: {e}")
+                time.sleep(3)
+    
+    def _on_store_change(self, changes):
+        """Data store callback: mark the affected sections for refresh"""
+        for change in changes:
+            if change['kind'] == 'schedule':
+                self.schedules_changed.set()
+            elif change['kind'] == 'history':
+                self.history_changed.set()
+        self.wake.set()
     
     def _update_system_status(self):
         """Update system status display"""
@@ -234,14 +267,15 @@ class NotificationsPanel(ctk.CTkFrame):
             widget.destroy()
         
         # Get upcoming schedules (next 5)
-        active_schedules = self.data_store.get_active_schedules()
-        active_schedules.sort(key=lambda x: f"{x['date']} {x['time']}")
-        
-        now = datetime.now()
+        now = time.time()
         upcoming = [
-            s for s in active_schedules
-            if datetime.strptime(f"{s['date']} {s['time']}", '%Y-%m-%d %H:%M') > now
-        ][:5]
+            s for s in self.data_store.get_schedule_models(active_only=True)
+            if s.timestamp is not None and s.timestamp > now
+        ]
+        upcoming.sort(key=lambda s: s.timestamp)
+        upcoming = upcoming[:5]
+        
+        self.next_due = upcoming[0].timestamp if upcoming else None
         
         if not upcoming:
             ctk.CTkLabel(
@@ -260,7 +294,7 @@ class NotificationsPanel(ctk.CTkFrame):
             )
             schedule_item.pack(fill="x", padx=5, pady=5)
             
-            date_time_text = f"📅 {schedule['date']} at {schedule['time']}"
+            date_time_text = f"📅 {schedule.date} at {schedule.time}"
             ctk.CTkLabel(
                 schedule_item,
                 text=date_time_text,
@@ -268,7 +302,7 @@ class NotificationsPanel(ctk.CTkFrame):
                 text_color="#FFFFFF"
             ).pack(anchor="w", padx=10, pady=(8, 2))
             
-            detail_text = f"{schedule['spray_type']} - {schedule['container']}"
+            detail_text = f"{schedule.spray_type} - {schedule.container}"
             ctk.CTkLabel(
                 schedule_item,
                 text=detail_text,
@@ -283,7 +317,7 @@ class NotificationsPanel(ctk.CTkFrame):
             widget.destroy()
         
         # Get recent history (last 5)
-        history = self.data_store.get_history(limit=5)
+        history = self.data_store.get_history_records(limit=5)
         
         if not history:
             ctk.CTkLabel(
@@ -305,12 +339,10 @@ class NotificationsPanel(ctk.CTkFrame):
             )
             activity_item.pack(fill="x", padx=5, pady=5)
             
-            completed_time = item.get('completed_at', 'Unknown')
-            try:
-                dt = datetime.fromisoformat(completed_time)
-                time_str = dt.strftime('%b %d, %I:%M %p')
-            except:
-                time_str = completed_time
+            if item.timestamp is not None:
+                time_str = datetime.fromtimestamp(item.timestamp).strftime('%b %d, %I:%M %p')
+            else:
+                time_str = item.completed_at or 'Unknown'
             
             ctk.CTkLabel(
                 activity_item,
@@ -319,7 +351,7 @@ class NotificationsPanel(ctk.CTkFrame):
                 text_color="#4CAF50"
             ).pack(anchor="w", padx=10, pady=(8, 2))
             
-            detail = f"{item['spray_type']} - {item['container']}"
+            detail = f"{item.spray_type} - {item.container}"
             ctk.CTkLabel(
                 activity_item,
                 text=detail,
@@ -330,3 +362,5 @@ class NotificationsPanel(ctk.CTkFrame):
     def cleanup(self):
         """Cleanup resources"""
         self.running = False
+        self.data_store.unsubscribe(self.subscription)
+        self.wake.set()
@@ -279,9 +279,15 @@ class PreviousDataPanel(ctk.CTkFrame):
             text_color="#CCCCCC"
         ).pack(side="left", padx=5)
         
-        # Duration
+        # Duration (actual vs requested when the spray was paused or aborted)
         duration = item.get('duration', 'N/A')
-        duration_text = f"Duration: {duration}s"
+        actual = item.get('actual_duration')
+        if actual is not None and actual != duration:
+            duration_text = f"Duration: {actual}s of {duration}s"
+        else:
+            duration_text = f"Duration: {duration}s"
+        if item.get('aborted'):
+            duration_text += " (aborted)"
         ctk.CTkLabel(
             details,
             text=duration_text,
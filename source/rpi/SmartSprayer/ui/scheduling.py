@@ -374,13 +374,13 @@ class SchedulingPanel(ctk.CTkFrame):
                     messagebox.showerror("Error", "Invalid interval or count")
                     return
                 
-                schedules = self.scheduler.create_recurring_schedules(
+                self.scheduler.create_recurring_schedules(
                     date, interval, count, time, spray_type, container
                 )
                 
                 messagebox.showinfo(
                     "Success",
-                    f"Created {len(schedules)} recurring schedules with {interval}-day interval"
+                    f"Created a series of {count} sprays with {interval}-day interval"
                 )
             else:
                 # Create single schedule
@@ -509,7 +509,7 @@ class SchedulingPanel(ctk.CTkFrame):
         # Create popup
         dialog = ctk.CTkToplevel(self)
         dialog.title(f"Reschedule: {schedule['id']}")
-        dialog.geometry("400x350")
+        dialog.geometry("400x480")
         dialog.transient(self)
         dialog.grab_set()
         
@@ -544,6 +544,7 @@ class SchedulingPanel(ctk.CTkFrame):
                 new_date_entry.insert(0, selected)
                 new_date_entry.configure(state="readonly")
                 cal_win.destroy()
+                update_preview()
             
             ctk.CTkButton(cal_win, text="Select", command=select, height=40).pack(pady=10)
         
@@ -570,6 +571,40 @@ class SchedulingPanel(ctk.CTkFrame):
         new_minute.set(schedule['time'].split(':')[1])
         new_minute.pack(side="left", padx=5)
         
+        # What the reschedule would change, updated as date and time are picked
+        preview_label = ctk.CTkLabel(
+            dialog,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#CCCCCC",
+            justify="left"
+        )
+        preview_label.pack(fill="x", padx=20, pady=5)
+        
+        def update_preview(*_):
+            new_date = new_date_entry.get()
+            if not new_date:
+                preview_label.configure(text="")
+                return
+            
+            preview = self.reschedule_mgr.preview(
+                schedule['id'], new_date, f"{new_hour.get()}:{new_minute.get()}"
+            )
+            
+            text = preview['message']
+            for aff in preview['affected'][:3]:
+                text += f"\n- {aff['id']}: {aff['old_date']} → {aff['new_date']}"
+            if len(preview['affected']) > 3:
+                text += f"\n... and {len(preview['affected']) - 3} more"
+            
+            preview_label.configure(
+                text=text,
+                text_color="#CCCCCC" if preview['allowed'] else "#F44336"
+            )
+        
+        new_hour.configure(command=update_preview)
+        new_minute.configure(command=update_preview)
+        
         def confirm_reschedule():
             new_date = new_date_entry.get()
             if not new_date: